@@ -1,6 +1,7 @@
 
 from django.contrib import admin
-from .models import ClothingCategory, ClothingItem, Outfit
+from .models import ClothingCategory, ClothingItem, ImageJob, Outfit, Tombstone
+from .tasks import schedule_image_processing
 
 @admin.register(ClothingCategory)
 class ClothingCategoryAdmin(admin.ModelAdmin):
@@ -9,15 +10,31 @@ class ClothingCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(ClothingItem)
 class ClothingItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'category', 'color', 'brand', 'date_added', 'last_modified')
+    list_display = ('name', 'user', 'category', 'color', 'brand', 'image_status', 'date_added', 'last_modified')
     list_filter = ('user', 'category', 'brand', 'color')
     search_fields = ('name', 'user__username', 'brand', 'notes')
     autocomplete_fields = ['user', 'category'] # Giúp tìm kiếm user và category dễ hơn
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_image_processing(obj)
+
 @admin.register(Outfit)
 class OutfitAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'created_at', 'updated_at')
+    list_display = ('name', 'user', 'item_count', 'created_at', 'updated_at')
     list_filter = ('user',)
     search_fields = ('name', 'user__username', 'description')
     filter_horizontal = ('clothing_items',) # Giao diện tốt hơn cho ManyToManyField
-    autocomplete_fields = ['user']
\ No newline at end of file
+    autocomplete_fields = ['user']
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'item', 'status', 'attempts', 'created_at', 'updated_at')
+    list_filter = ('status',)
+    raw_id_fields = ('item',)
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'object_id', 'user', 'deleted_at')
+    list_filter = ('model',)
+    raw_id_fields = ('user',)
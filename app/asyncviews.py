@@ -0,0 +1,351 @@
+"""
+View async cho các đường đọc nóng và I/O ảnh khi chạy dưới ASGI (uvicorn), bật bằng
+settings ASYNC_VIEWS (myapp/asgi.py bật sẵn; deploy WSGI vẫn dùng thẳng các view DRF).
+
+- GET danh sách/chi tiết món đồ và bộ đồ, bản đầy đủ (phân trang số trang hoặc keyset):
+  xác thực token, ETag/304, response cache và payload (app/fastpath.py) đều dùng async
+  ORM, cùng JSON, cùng ETag và cùng key cache với ViewSet DRF.
+- Mọi trường hợp khác (ghi, `?fields=`, Browsable API, session, lỗi...) chuyển cho ViewSet
+  DRF qua sync_to_async. Body multipart được parse trước trên thread pool (hash và ghi file
+  tạm, app/uploadhandlers.py), nên các upload ảnh không phải xếp hàng trên thread sync
+  duy nhất của process.
+- /media/: kiểm tra quyền như MediaView, file được đọc từng block trên thread pool
+  (media.stream_file_async).
+- Đăng nhập/đăng ký: view DRF chạy trên executor riêng (passwords.request_executor()), chờ
+  băm mật khẩu ở đó thay vì trên thread sync dùng chung với các API khác.
+
+Dưới ASGI, server đọc body request bằng async trước khi gọi view và gửi response theo
+tốc độ của client, nên client chậm không giữ cả một worker như gunicorn sync.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import HttpResponse, QueryDict
+from django.http.multipartparser import MultiPartParserError
+from django.urls import path, re_path
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import token_cache
+from .cache import cache_settings, cache_stats, get_cache, response_cache_key
+from .catalog import category_catalog
+from .conditional import aaggregate_stamp, acategory_stamp, make_validators, set_validator_headers
+from .fastpath import (
+    ITEM_COLUMNS, OUTFIT_COLUMNS, ItemRowSerializer, assemble_outfits, can_use_fast_path,
+    outfit_items_queryset,
+)
+from .media import can_access, serve_file, stream_file_async
+from .models import ClothingItem, Outfit
+from .pagination import KeysetPagination
+from .passwords import request_executor
+from .timing import timed
+from .views import ClothingItemViewSet, CustomObtainAuthToken, MediaView, OutfitViewSet, RegisterView
+
+JSON_FORMAT = 'json'
+PAGE_PARAMS = {'page'}
+KEYSET_PARAMS = {'pagination', 'cursor', 'page_size'}
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+async def authenticate(request):
+    """
+    User của header `Authorization: Token <key>` như CachedTokenAuthentication; None nếu
+    không có hoặc không hợp lệ (view DRF sẽ trả lỗi xác thực chuẩn).
+    """
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0].lower() != 'token':
+        return None
+    key = parts[1]
+    # Tầng LRU trong process không đụng tới mạng; cache dùng chung thì chạy trên thread
+    shared = token_cache.shared_cache_alias is not None
+    token = await sync_to_async(token_cache.get)(key) if shared else token_cache.get(key)
+    if token is None:
+        token = await Token.objects.select_related('user').filter(key=key).afirst()
+        if token is None:
+            return None
+        if shared:
+            await sync_to_async(token_cache.set)(key, token)
+        else:
+            token_cache.set(key, token)
+    return token.user if token.user.is_active else None
+
+
+def wants_json(request):
+    accept = request.headers.get('Accept', '')
+    return 'format' not in request.GET and (not accept or accept.startswith(('*/*', 'application/json')))
+
+
+def parse_upload(request):
+    """
+    Parse body multipart của request (chạy trên thread pool). DRF dùng lại request.POST/FILES
+    đã parse thay vì đọc lại stream. Django chỉ tự parse với POST nên PUT/PATCH gọi thẳng
+    parse_file_upload như HttpRequest._load_post_and_files.
+    """
+    try:
+        if request.method == 'POST':
+            request.POST
+        else:
+            request._post, request._files = request.parse_file_upload(request.META, request)
+    except MultiPartParserError:
+        # Body hỏng: để serializer báo lỗi thiếu dữ liệu như một form rỗng
+        request._post, request._files = QueryDict(), MultiValueDict()
+
+
+class AsyncReadView:
+    """
+    GET danh sách/chi tiết bản đầy đủ của một ViewSet bằng async ORM. `get()` trả None khi
+    request không thuộc đường nhanh; view do `as_view()` tạo khi đó gọi ViewSet DRF.
+    """
+    viewset = None
+    basename = None
+    model = None
+    columns = ()
+    keyset_timestamp_field = None
+
+    def __init__(self, request, user, detail, kwargs):
+        self.request = request
+        self.user = user
+        self.detail = detail
+        self.kwargs = kwargs
+
+    @classmethod
+    def as_view(cls, actions, detail):
+        fallback = cls.viewset.as_view(
+            actions, basename=cls.basename, detail=detail, suffix='Instance' if detail else 'List'
+        )
+
+        async def view(request, **kwargs):
+            if request.method == 'GET' and can_use_fast_path() and wants_json(request):
+                user = await authenticate(request)
+                if user is not None:
+                    response = await cls(request, user, detail, kwargs).get()
+                    if response is not None:
+                        return response
+            if request.content_type == 'multipart/form-data':
+                await sync_to_async(parse_upload, thread_sensitive=False)(request)
+            return await sync_to_async(fallback)(request, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(user=self.user)
+        if self.detail:
+            queryset = queryset.filter(pk=self.kwargs['pk'])
+        return queryset
+
+    async def get_validator_stamps(self, queryset):
+        raise NotImplementedError
+
+    async def serialize(self, rows, serialize_item):
+        raise NotImplementedError
+
+    def use_keyset_pagination(self):
+        params = self.request.GET
+        return params.get('pagination') == 'keyset' or KeysetPagination.cursor_query_param in params
+
+    def supports_params(self):
+        params = set(self.request.GET)
+        if self.detail:
+            return not params
+        return params <= (KEYSET_PARAMS if self.use_keyset_pagination() else PAGE_PARAMS)
+
+    async def get(self):
+        if not self.supports_params():
+            return None
+        queryset = self.get_queryset()
+        stamps = await self.get_validator_stamps(queryset)
+        if self.detail and not stamps[0][1]:
+            return None  # Không có object: ViewSet trả 404 như bình thường
+        etag, last_modified = make_validators(self.user.pk, self.request.get_full_path(), JSON_FORMAT, stamps)
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                set_validator_headers(response, etag, last_modified)
+            return response
+
+        data = await self.cached_data(queryset)
+        if data is None:
+            return None
+        with timed('render'):
+            content = JSONRenderer().render(data)
+        response = HttpResponse(content, content_type='application/json')
+        actions = DETAIL_ACTIONS if self.detail else LIST_ACTIONS
+        response['Allow'] = ', '.join([method.upper() for method in actions] + ['HEAD', 'OPTIONS'])
+        patch_vary_headers(response, ['Accept'])
+        set_validator_headers(response, etag, last_modified)
+        return response
+
+    async def cached_data(self, queryset):
+        """
+        Như CachedResponseMixin: đọc/ghi response.data trong cache theo cùng key.
+        """
+        options = cache_settings()
+        if not options['ENABLED']:
+            return await self.build(queryset)
+        action = 'retrieve' if self.detail else 'list'
+        key = await sync_to_async(response_cache_key)(
+            self.user.pk, self.basename, action, self.request.build_absolute_uri(), JSON_FORMAT
+        )
+        cache = get_cache()
+        endpoint = f'{self.basename}-{action}'
+        data = await cache.aget(key)
+        if data is not None:
+            cache_stats.record(endpoint, hit=True)
+            return data
+        cache_stats.record(endpoint, hit=False)
+        data = await self.build(queryset)
+        if data is not None:
+            await cache.aset(key, data, options['TIMEOUT'])
+        return data
+
+    async def build(self, queryset):
+        serialize_item = ItemRowSerializer(self.request, (await category_catalog.aget()).names)
+        queryset = queryset.values(*self.columns)
+        if self.detail:
+            row = await queryset.afirst()
+            return (await self.serialize([row], serialize_item))[0]
+        if self.use_keyset_pagination():
+            return await self.keyset_page(queryset, serialize_item)
+        return await self.number_page(queryset, serialize_item)
+
+    async def keyset_page(self, queryset, serialize_item):
+        paginator = KeysetPagination(self.keyset_timestamp_field)
+        try:
+            queryset = paginator.seek(queryset, Request(self.request))
+        except NotFound:
+            return None
+        page = paginator.set_page([row async for row in queryset])
+        return {'next': paginator.get_next_link(), 'results': await self.serialize(page, serialize_item)}
+
+    async def number_page(self, queryset, serialize_item):
+        """
+        Như PageNumberPagination mặc định (không có `page_size` do client chọn).
+        Số trang sai hoặc vượt quá trả None để DRF trả 404 "Invalid page.".
+        """
+        page_size = api_settings.DEFAULT_PAGINATION_CLASS.page_size
+        count = await queryset.acount()
+        num_pages = max(math.ceil(count / page_size), 1)
+        number = self.request.GET.get('page', '1')
+        if number == 'last':
+            number = num_pages
+        try:
+            number = int(number)
+        except ValueError:
+            return None
+        if not 1 <= number <= num_pages:
+            return None
+        offset = (number - 1) * page_size
+        rows = [row async for row in queryset[offset:offset + page_size]]
+        url = self.request.build_absolute_uri()
+        if number == 1:
+            previous = None
+        elif number == 2:
+            previous = remove_query_param(url, 'page')
+        else:
+            previous = replace_query_param(url, 'page', number - 1)
+        return {
+            'count': count,
+            'next': replace_query_param(url, 'page', number + 1) if number < num_pages else None,
+            'previous': previous,
+            'results': await self.serialize(rows, serialize_item),
+        }
+
+
+class ClothingItemReadView(AsyncReadView):
+    viewset = ClothingItemViewSet
+    basename = 'clothingitem'
+    model = ClothingItem
+    columns = ITEM_COLUMNS
+    keyset_timestamp_field = 'last_modified'
+
+    async def get_validator_stamps(self, queryset):
+        return [await aaggregate_stamp(queryset, 'last_modified'), await acategory_stamp()]
+
+    async def serialize(self, rows, serialize_item):
+        with timed('serialize'):
+            return [serialize_item(row) for row in rows]
+
+
+class OutfitReadView(AsyncReadView):
+    viewset = OutfitViewSet
+    basename = 'outfit'
+    model = Outfit
+    columns = OUTFIT_COLUMNS
+    keyset_timestamp_field = 'updated_at'
+
+    async def get_validator_stamps(self, queryset):
+        if self.detail:
+            items = ClothingItem.objects.filter(outfits__in=queryset.values('pk'))
+        else:
+            items = ClothingItem.objects.filter(user=self.user)
+        return [
+            await aaggregate_stamp(queryset, 'updated_at'),
+            await aaggregate_stamp(items, 'last_modified'),
+            await acategory_stamp(),
+        ]
+
+    async def serialize(self, rows, serialize_item):
+        item_rows = [row async for row in outfit_items_queryset([row['id'] for row in rows])]
+        with timed('serialize'):
+            return assemble_outfits(rows, item_rows, serialize_item)
+
+
+_media_fallback = MediaView.as_view()
+
+
+async def media_view(request, path):
+    """
+    Như MediaView nhưng stat/mở/đọc file trên thread pool. Chưa xác thực được bằng token
+    hoặc không có quyền thì để MediaView trả 401/404.
+    """
+    user = await authenticate(request)
+    if user is None or not await sync_to_async(can_access)(user, path):
+        return await sync_to_async(_media_fallback)(request, path=path)
+    response = await sync_to_async(serve_file, thread_sensitive=False)(request, path)
+    return stream_file_async(response)
+
+
+media_view.csrf_exempt = True
+
+
+def _run_auth_view(view, request, kwargs):
+    try:
+        return view(request, **kwargs)
+    finally:
+        # Kết nối DB của thread này không được đóng theo request_finished như thread sync chính
+        connections.close_all()
+
+
+def offloaded(view):
+    """
+    View async chạy view DRF sync `view` trên passwords.request_executor().
+    """
+    async def wrapper(request, **kwargs):
+        return await sync_to_async(_run_auth_view, thread_sensitive=False, executor=request_executor())(
+            view, request, kwargs
+        )
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+# Đặt trước router trong app/urls.py; chỉ khớp id là số nên các action như
+# clothing-items/search/ và đuôi định dạng (.json) vẫn đi tới router.
+urlpatterns = [
+    re_path(r'^clothing-items/$', ClothingItemReadView.as_view(LIST_ACTIONS, False), name='clothingitem-list'),
+    re_path(r'^clothing-items/(?P<pk>[0-9]+)/$', ClothingItemReadView.as_view(DETAIL_ACTIONS, True),
+            name='clothingitem-detail'),
+    re_path(r'^outfits/$', OutfitReadView.as_view(LIST_ACTIONS, False), name='outfit-list'),
+    re_path(r'^outfits/(?P<pk>[0-9]+)/$', OutfitReadView.as_view(DETAIL_ACTIONS, True), name='outfit-detail'),
+    path('auth/register/', offloaded(RegisterView.as_view()), name='auth_register'),
+    path('auth/login/', offloaded(CustomObtainAuthToken.as_view()), name='auth_login'),
+]
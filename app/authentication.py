@@ -0,0 +1,200 @@
+import copy
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import bump_version
+
+
+class TokenCache:
+    """
+    Cache token -> Token (kèm user) gồm hai tầng:
+    - LRU trong process, có TTL, không cần mạng hay DB.
+    - (Tùy chọn) một cache Django dùng chung giữa các worker, ví dụ Redis/Memcached.
+
+    Việc xóa khỏi cache được gọi từ signals (app/signals.py) khi Token bị xóa/đổi
+    hoặc User bị sửa (ví dụ bị khóa). Khi có tầng dùng chung, việc xóa còn tăng số
+    phiên bản thu hồi của user trong đó; token lấy từ LRU chỉ được dùng nếu phiên bản
+    này chưa đổi kể từ lúc nạp, nên worker khác cũng thấy việc thu hồi ngay (một
+    cache.get, không unpickle token).
+
+    Không có tầng dùng chung thì worker khác không biết token đã bị thu hồi, nên LRU mặc
+    định tắt (ttl=None). Đặt ttl rõ ràng để bật nó khi chỉ chạy một process: ở nhiều worker,
+    token bị xóa hay user bị khóa vẫn xác thực được tới `ttl` giây.
+    """
+    key_prefix = 'auth_token:'
+    default_ttl = 60  # Khi có tầng dùng chung
+
+    def __init__(self, max_size=10000, ttl=None, shared_cache_alias=None, shared_ttl=300):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(max_size, ttl, shared_cache_alias, shared_ttl)
+
+    def configure(self, max_size=10000, ttl=None, shared_cache_alias=None, shared_ttl=300):
+        self.max_size = max_size
+        if ttl is None:
+            ttl = self.default_ttl if shared_cache_alias else 0
+        self.ttl = ttl
+        self.shared_cache_alias = shared_cache_alias
+        self.shared_ttl = shared_ttl
+        self.clear()
+
+    @staticmethod
+    def options_from_settings():
+        options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        return {
+            'max_size': options.get('MAX_SIZE', 10000),
+            'ttl': options.get('TTL'),
+            'shared_cache_alias': options.get('SHARED_CACHE_ALIAS'),
+            'shared_ttl': options.get('SHARED_TTL', 300),
+        }
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**cls.options_from_settings())
+
+    @property
+    def shared(self):
+        if self.shared_cache_alias:
+            return caches[self.shared_cache_alias]
+        return None
+
+    def shared_key(self, key):
+        # Không đưa token thô vào cache dùng chung
+        return self.key_prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def revision_key(self, user_id):
+        return f'{self.key_prefix}revision:{user_id}'
+
+    def _revision(self, user_id):
+        shared = self.shared
+        return shared.get(self.revision_key(user_id)) if shared is not None else None
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+        if entry is not None:
+            token, _, revision = entry
+            if self._revision(token.user_id) == revision:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                return self._copy(token)
+            with self._lock:  # Đã bị thu hồi ở worker khác
+                self._entries.pop(key, None)
+
+        if self.shared is not None:
+            token = self.shared.get(self.shared_key(key))
+            if token is not None:
+                self._set_local(key, token)
+                return self._copy(token)
+        return None
+
+    @staticmethod
+    def _copy(token):
+        # Mỗi request nhận bản sao riêng, tránh chia sẻ instance User giữa các thread
+        cached = copy.copy(token)
+        cached.user = copy.copy(token.user)
+        return cached
+
+    def set(self, key, token):
+        self._set_local(key, token)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), token, self.shared_ttl)
+
+    def _set_local(self, key, token):
+        if self.ttl <= 0:
+            return
+        revision = self._revision(token.user_id)
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl, revision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key, user_id=None):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.shared_key(key))
+            if user_id is not None:
+                bump_version(self.revision_key(user_id), self.shared)
+
+    def delete_user(self, user_id, keys=()):
+        """
+        Xóa mọi token của một user. `keys` là các token key lấy từ DB,
+        cần cho tầng dùng chung vì không thể quét key trong cache.
+        """
+        with self._lock:
+            stale = [key for key, (token, _, _) in self._entries.items() if token.user_id == user_id]
+            for key in stale:
+                del self._entries[key]
+        for key in keys:
+            self.delete(key)
+        if self.shared is not None:
+            bump_version(self.revision_key(user_id), self.shared)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache.from_settings()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Thay thế trực tiếp cho TokenAuthentication của DRF.
+    Lần đầu vẫn tra Token + User trong DB; các request sau với cùng token
+    lấy từ token_cache nên không tốn query xác thực nào.
+    """
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return (token.user, token)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return (user, token)
+
+
+def supports_upsert_returning():
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 35)
+
+
+def get_or_create_token(user):
+    """
+    (Token, created) của user trong một query INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    (PostgreSQL, SQLite >= 3.35) thay vì SELECT rồi INSERT trong savepoint như get_or_create.
+    Không phát signal post_save của Token (token mới không thể đang nằm trong token_cache).
+    """
+    if not supports_upsert_returning():
+        return Token.objects.get_or_create(user=user)
+    quote = connection.ops.quote_name
+    table, key_column, user_column, created_column = (
+        quote(name) for name in (Token._meta.db_table, 'key', 'user_id', 'created')
+    )
+    new_key = Token.generate_key()
+    # raw() chuyển giá trị cột (ví dụ `created` trên SQLite) như khi đọc Token bằng ORM
+    token = next(iter(Token.objects.raw(
+        f'INSERT INTO {table} ({key_column}, {user_column}, {created_column}) VALUES (%s, %s, %s) '
+        f'ON CONFLICT ({user_column}) DO UPDATE SET {user_column} = EXCLUDED.{user_column} '
+        f'RETURNING {key_column}, {user_column}, {created_column}',
+        [new_key, user.pk, connection.ops.adapt_datetimefield_value(timezone.now())],
+    )))
+    token.user = user
+    return token, token.key == new_key
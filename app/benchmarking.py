@@ -0,0 +1,40 @@
+"""
+Tiện ích chung cho các lệnh benchmark (app/management/commands/bench_*.py).
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Chạy benchmark trong một transaction rồi rollback, để dữ liệu giả không ở lại DB.
+    Request giả của APIRequestFactory dùng host 'testserver' nên cho phép host này.
+    """
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def timed_call(func, *args, **kwargs):
+    """
+    Gọi `func` (thường là view) và trả về (kết quả, số ms, số query).
+    Response được render luôn để tính cả thời gian serialize.
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if hasattr(result, 'render'):
+            result.render()
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, elapsed, len(ctx.captured_queries)
@@ -0,0 +1,139 @@
+"""
+Đếm tham chiếu cho các file ảnh lưu theo hash nội dung (MediaBlob).
+Được gọi từ signals của ClothingItem; file chỉ bị xóa sau khi transaction commit.
+
+Blob về 0 tham chiếu được giữ lại (ref_count=0) tới khi collect() xóa file trong lúc
+khóa dòng của nó. acquire() tăng tham chiếu trên chính dòng đó (chờ nếu collect() đang
+chạy), rồi mới kiểm tra file còn trên storage và ghi lại từ upload nếu đã bị xóa.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ClothingItem, MediaBlob
+from .storage import get_image_storage
+
+
+def acquire(name, content=None):
+    """
+    Tăng tham chiếu của `name`. `content`: file vừa upload cho tên này, dùng để ghi lại
+    file nếu nó đã bị xóa (blob về 0 ở request khác ngay trước đó).
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        if not MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+            try:
+                with transaction.atomic():
+                    MediaBlob.objects.create(name=name, ref_count=1)
+            except IntegrityError:  # Request khác vừa tạo cùng blob
+                MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+        if content is not None:
+            restore_file(name, content)
+
+
+def acquire_many(names, contents=None):
+    """
+    Như acquire() cho nhiều file (bulk create/update): tạo các blob còn thiếu bằng một
+    bulk_create, rồi tăng tham chiếu bằng một UPDATE cho mỗi mức tăng khác nhau.
+    `contents`: {tên: file vừa upload}.
+    """
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    with transaction.atomic():
+        # ref_count=0 rồi mới tăng, để blob do request khác vừa tạo cũng được tính đúng
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, ref_count=0) for name in counts], ignore_conflicts=True, batch_size=500
+        )
+        by_increment = defaultdict(list)
+        for name, n in counts.items():
+            by_increment[n].append(name)
+        for n, group in by_increment.items():
+            MediaBlob.objects.filter(name__in=group).update(ref_count=F('ref_count') + n)
+        for name, content in (contents or {}).items():
+            restore_file(name, content)
+
+
+def register(name):
+    """
+    Ghi nhận file đã lưu vào storage mà chưa món đồ nào dùng (ví dụ ảnh import): blob với
+    ref_count=0, bị prune_unreferenced() xóa nếu sau thời gian chờ vẫn không được dùng.
+    """
+    MediaBlob.objects.bulk_create([MediaBlob(name=name, ref_count=0)], ignore_conflicts=True)
+
+
+def restore_file(name, content):
+    storage = get_image_storage()
+    if not storage.exists(name):
+        saved = storage.save(name, content)
+        if saved != name:
+            # Storage theo hash nội dung: tên khác nghĩa là `content` không phải file của `name`
+            storage.delete(saved)
+            raise RuntimeError(f'Restoring {name!r} saved the upload as {saved!r}.')
+
+
+def release(name, renditions=None):
+    """
+    Giảm tham chiếu của `name`. Về 0 thì sau khi transaction commit, blob bị xóa cùng
+    file gốc và các rendition sinh ra từ nó (collect()).
+    File chưa được theo dõi (ảnh cũ trước khi có MediaBlob) thì không đụng tới.
+    """
+    if not name:
+        return
+    MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1)
+    if MediaBlob.objects.filter(name=name, ref_count__lte=0).exists():
+        transaction.on_commit(lambda: collect(name, renditions))
+
+
+def collect(name, renditions=None):
+    """
+    Xóa blob `name` nếu vẫn không còn tham chiếu, cùng file và các rendition của nó.
+    Trả về True nếu đã xóa.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name, ref_count__lte=0).first()
+        if blob is None:  # Đã được dùng lại hoặc đã bị xóa
+            return False
+        delete_files([name] + [path for key, path in (renditions or {}).items() if key != 'source'])
+        blob.delete()
+    return True
+
+
+def prune_unreferenced(max_age):
+    """
+    Xóa các blob không còn tham chiếu đã tạo quá `max_age` (timedelta): file import chưa
+    được món đồ nào dùng, blob mà collect() chưa kịp xóa. Trả về số blob đã xóa.
+    """
+    names = MediaBlob.objects.filter(ref_count__lte=0, created_at__lt=timezone.now() - max_age)
+    return sum(collect(name) for name in list(names.values_list('name', flat=True)))
+
+
+def delete_files(names):
+    storage = get_image_storage()
+    for name in names:
+        storage.delete(name)
+
+
+def rebuild_ref_counts():
+    """
+    Tính lại toàn bộ số tham chiếu từ bảng ClothingItem (dùng sau khi dedup hoặc để sửa sai lệch).
+    """
+    counts = dict(
+        ClothingItem.objects.exclude(image='').exclude(image__isnull=True)
+        .values_list('image').annotate(n=Count('id')).order_by()
+    )
+    with transaction.atomic():
+        # Blob không còn món đồ nào dùng về 0 tham chiếu, prune_unreferenced() sẽ xóa file
+        MediaBlob.objects.exclude(name__in=counts).update(ref_count=0)
+        existing = set(MediaBlob.objects.values_list('name', flat=True))
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, ref_count=n) for name, n in counts.items() if name not in existing],
+            batch_size=500,
+        )
+        for blob in MediaBlob.objects.filter(name__in=existing):
+            if blob.ref_count != counts[blob.name]:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=counts[blob.name])
+    return counts
@@ -0,0 +1,250 @@
+"""
+Tạo/sửa/xóa nhiều món đồ trong một request (ClothingItemViewSet.bulk, bulk_delete).
+
+bulk_create/bulk_update không chạy signal save, nên các việc signals thường làm
+(đếm tham chiếu ảnh, xếp hàng xử lý ảnh, chỉ mục tìm kiếm, thống kê tủ đồ, invalidate cache)
+được gọi trực tiếp ở đây.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from . import blobs, search, stats
+from .cache import invalidate_user
+from .models import ClothingItem, ImageSignature, Tombstone
+from .signals import bulk_deleting_items
+from .tasks import schedule_bulk_image_processing
+
+
+def max_bulk_items():
+    return getattr(settings, 'BULK_MAX_ITEMS', 500)
+
+
+def parse_elements(request, allow_files=True):
+    """
+    Lấy danh sách phần tử từ body:
+    - JSON: một mảng, hoặc {"items": [...]}
+    - multipart: field `items` là chuỗi JSON; phần tử có "image": "<tên field file>"
+      sẽ được thay bằng file upload tương ứng trong request.FILES.
+    """
+    data = request.data
+    if hasattr(data, 'getlist'):  # QueryDict của multipart/form
+        raw = data.get('items')
+        try:
+            elements = json.loads(raw) if raw else None
+        except ValueError:
+            raise ValidationError({'items': 'Invalid JSON.'})
+    elif isinstance(data, dict):
+        elements = data.get('items')
+    else:
+        elements = data
+
+    if not isinstance(elements, list) or not all(isinstance(e, dict) for e in elements):
+        raise ValidationError({'items': 'Expected a list of objects.'})
+    if len(elements) > max_bulk_items():
+        raise ValidationError({'items': f'At most {max_bulk_items()} items per request.'})
+
+    if allow_files:
+        for element in elements:
+            file_field = element.get('image')
+            if isinstance(file_field, str):
+                if file_field not in request.FILES:
+                    element['image'] = file_field  # để serializer báo lỗi "không phải file"
+                else:
+                    element['image'] = request.FILES[file_field]
+    return elements
+
+
+def overall_status(results, success=status.HTTP_200_OK):
+    """
+    Mã trạng thái chung: `success` nếu mọi phần tử thành công, 400 nếu không phần tử nào,
+    207 (Multi-Status) nếu một phần; chi tiết nằm trong `status` của từng phần tử.
+    """
+    ok = sum(1 for r in results if status.is_success(r['status']))
+    if ok == len(results):
+        return success
+    if ok == 0:
+        return status.HTTP_400_BAD_REQUEST
+    return status.HTTP_207_MULTI_STATUS
+
+
+def validate_elements(serializer, elements, instances=None):
+    """
+    Validate từng phần tử bằng cùng một serializer (như ListSerializer làm với `child`):
+    danh sách field chỉ được dựng một lần thay vì một lần cho mỗi phần tử.
+    Trả về (validated_data theo index, lỗi theo index).
+    """
+    validated, errors = {}, {}
+    for index, element in enumerate(elements):
+        serializer.instance = instances[index] if instances else None
+        try:
+            validated[index] = serializer.run_validation(element)
+        except ValidationError as exc:
+            errors[index] = exc.detail
+    serializer.instance = None
+    return validated, errors
+
+
+def bulk_create_items(user, elements, serializer_class, context, atomic=False):
+    """
+    Validate từng phần tử, tạo các phần tử hợp lệ bằng một bulk_create trong một transaction.
+    atomic=True: chỉ cần một phần tử lỗi là không tạo gì.
+    """
+    validated, errors = validate_elements(serializer_class(context=context), elements)
+    if atomic and errors:
+        return [_error(index, errors[index]) for index in sorted(errors)], []
+
+    now = timezone.now()
+    items, indexes = [], []
+    for index, data in validated.items():
+        item = ClothingItem(user=user, **data)
+        if item.image:
+            item.image_status = ClothingItem.IMAGE_PROCESSING
+        item.date_added = item.last_modified = now
+        items.append(item)
+        indexes.append(index)
+
+    uploads = [item.image for item in items if item.image and not item.image._committed]
+    with transaction.atomic():
+        # FileField.pre_save lưu file ảnh vào storage ngay trong bulk_create
+        ClothingItem.objects.bulk_create(items, batch_size=200)
+        blobs.acquire_many([item.image.name for item in items], {upload.name: upload.file for upload in uploads})
+        for item in items:
+            item._loaded_image_name = item.image.name or ''
+        stats.apply_item_deltas(user.pk, stats.item_deltas(after=[stats.item_values(item) for item in items]))
+        schedule_bulk_image_processing([item for item in items if item.image])
+        search.index_objects(items)
+    invalidate_user(user.pk)
+
+    data = serializer_class(items, many=True, context=context).data
+    results = [_error(index, errs) for index, errs in errors.items()]
+    results += [
+        {'index': index, 'status': status.HTTP_201_CREATED, 'data': row}
+        for index, row in zip(indexes, data)
+    ]
+    return sorted(results, key=lambda r: r['index']), items
+
+
+def bulk_update_items(queryset, elements, serializer_class, context, atomic=False):
+    """
+    Sửa một phần (partial) nhiều món đồ: mỗi phần tử cần có "id". Lấy toàn bộ món đồ
+    trong một query, ghi lại bằng một bulk_update.
+    """
+    ids = [_as_pk(element.get('id')) for element in elements]
+    instances = queryset.in_bulk([pk for pk in ids if pk is not None])
+
+    results, found = {}, {}
+    for index, pk in enumerate(ids):
+        if pk in instances:
+            found[index] = instances[pk]
+        else:
+            results[index] = {'index': index, 'status': status.HTTP_404_NOT_FOUND, 'errors': {'id': 'Not found.'}}
+    indexes = list(found)
+    validated, errors = validate_elements(
+        serializer_class(partial=True, context=context),
+        [elements[index] for index in indexes],
+        [found[index] for index in indexes],
+    )
+    for position, errs in errors.items():
+        results[indexes[position]] = _error(indexes[position], errs)
+    if atomic and results:
+        return sorted(results.values(), key=lambda r: r['index'])
+
+    now = timezone.now()
+    fields = {'last_modified'}
+    updated, changed_images = {}, []
+    for position, data in validated.items():
+        item = found[indexes[position]]
+        for attr, value in data.items():
+            setattr(item, attr, value)
+            fields.add(attr)
+        item.last_modified = now
+        updated[indexes[position]] = item
+        if 'image' in data:
+            changed_images.append(item)
+    if changed_images:
+        fields.update({'image_status', 'renditions'})
+
+    with transaction.atomic():
+        acquired, released, stale, uploaded = [], [], [], {}
+        for item in changed_images:
+            previous = item._loaded_image_name
+            if item.image and not item.image._committed:
+                upload = item.image.file
+                item.image.save(item.image.name, upload, save=False)
+                uploaded[item.image.name] = upload
+            current = item.image.name or ''
+            if current != previous:
+                acquired.append(current)
+                released.append((previous, item.renditions if item.renditions.get('source') == previous else None))
+                stale.append(item.pk)
+            item._loaded_image_name = current
+            if not item.image:  # Ảnh bị gỡ: bỏ rendition cũ luôn trong bulk_update
+                item.image_status, item.renditions = ClothingItem.IMAGE_READY, {}
+            elif item.renditions.get('source') != current:
+                item.image_status = ClothingItem.IMAGE_PROCESSING
+        # Tăng tham chiếu trước khi giảm: ảnh cũ của món này có thể là ảnh mới của món khác
+        blobs.acquire_many(acquired, {name: uploaded[name] for name in acquired if name in uploaded})
+        for name, renditions in released:
+            blobs.release(name, renditions)
+        if stale:
+            ImageSignature.objects.filter(item_id__in=stale).delete()
+        items = list(updated.values())
+        if items:
+            # Giá trị cũ đọc lại (có khóa) ngay trước khi ghi, không dùng bản lấy lúc validate
+            previous = stats.locked_item_values([item.pk for item in items]) if stats.STAT_FIELDS & fields else {}
+            ClothingItem.objects.bulk_update(items, sorted(fields), batch_size=200)
+            if search.affects_index(items[0], fields):
+                search.index_objects(items)
+            if previous:
+                stats.apply_item_deltas(items[0].user_id, stats.item_deltas(
+                    [previous[item.pk] for item in items if item.pk in previous],
+                    [stats.item_values(item) for item in items if item.pk in previous],
+                ))
+        schedule_bulk_image_processing([item for item in changed_images if item.image])
+    if items:
+        invalidate_user(items[0].user_id)
+
+    data = serializer_class(items, many=True, context=context).data
+    for index, row in zip(updated, data):
+        results[index] = {'index': index, 'status': status.HTTP_200_OK, 'data': row}
+    return sorted(results.values(), key=lambda r: r['index'])
+
+
+def bulk_delete_items(queryset, ids):
+    """
+    Xóa các món đồ thuộc user trong một transaction. Thống kê tủ đồ, item_count, chỉ mục tìm
+    kiếm và tombstone được ghi theo lô (stats.forget_items, search.unindex_objects, một
+    bulk_create); QuerySet.delete() vẫn gửi post_delete cho từng món (đếm tham chiếu ảnh, cache).
+    """
+    ids = [_as_pk(pk) for pk in ids]
+    with transaction.atomic():
+        owners = dict(queryset.filter(pk__in=[pk for pk in ids if pk is not None]).values_list('pk', 'user_id'))
+        existing = set(owners)
+        for user_id in set(owners.values()):
+            stats.forget_items(user_id, [pk for pk, owner in owners.items() if owner == user_id])
+        with bulk_deleting_items(existing):
+            queryset.filter(pk__in=existing).delete()
+        search.unindex_objects(ClothingItem, existing)
+        Tombstone.objects.bulk_create([
+            Tombstone(user_id=user_id, model=Tombstone.CLOTHING_ITEM, object_id=pk) for pk, user_id in owners.items()
+        ])
+    return [
+        {'index': index, 'id': pk, 'status': status.HTTP_204_NO_CONTENT if pk in existing else status.HTTP_404_NOT_FOUND}
+        for index, pk in enumerate(ids)
+    ]
+
+
+def _as_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error(index, errors):
+    return {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
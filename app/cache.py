@@ -0,0 +1,154 @@
+"""
+Cache response theo user cho các endpoint đọc (danh sách/chi tiết món đồ, bộ đồ).
+
+Key gồm user, "phiên bản" dữ liệu của user, phiên bản chung (category) và URL đầy đủ.
+Khi dữ liệu đổi, signals chỉ tăng số phiên bản (app/signals.py), các key cũ tự
+không còn được dùng và hết hạn theo TIMEOUT, không cần quét/xóa key. Phiên bản được tăng
+ngay lúc ghi và tăng lại khi transaction commit: response mà request khác dựng từ dữ liệu
+chưa commit trong khoảng giữa (lưu dưới phiên bản mới) không được dùng tiếp.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+GLOBAL_VERSION_KEY = 'resp:version:global'
+
+
+def cache_settings():
+    options = {'ENABLED': False, 'ALIAS': 'default', 'TIMEOUT': 300}
+    options.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    return options
+
+
+def get_cache():
+    return caches[cache_settings()['ALIAS']]
+
+
+def user_version_key(user_id):
+    return f'resp:version:user:{user_id}'
+
+
+def get_version(key, cache=None):
+    """
+    Giá trị khởi tạo lấy theo thời gian (ms) thay vì 1: nếu key phiên bản bị cache
+    đẩy ra, phiên bản mới vẫn khác mọi phiên bản cũ nên không đọc nhầm response cũ.
+    """
+    if cache is None:
+        cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key, cache=None):
+    if cache is None:
+        cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key, cache=None):
+    if cache is None:
+        cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:  # Chưa có key
+        cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def bump_version_on_commit(key):
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def invalidate_user(user_id):
+    if cache_settings()['ENABLED'] and user_id is not None:
+        bump_version_on_commit(user_version_key(user_id))
+
+
+def invalidate_all():
+    if cache_settings()['ENABLED']:
+        bump_version_on_commit(GLOBAL_VERSION_KEY)
+
+
+class CacheStats:
+    """
+    Đếm hit/miss theo endpoint trong process hiện tại.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            self._counts[endpoint]['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(counts) for endpoint, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+cache_stats = CacheStats()
+
+
+def response_cache_key(user_id, basename, action, url, renderer_format):
+    """
+    Key cache của một response; view async (app/asyncviews.py) dùng cùng key với ViewSet DRF.
+    """
+    user_version = get_version(user_version_key(user_id))
+    global_version = get_version(GLOBAL_VERSION_KEY)
+    digest = hashlib.sha1(f'{url}|{renderer_format}'.encode()).hexdigest()
+    return f'resp:{user_id}:{user_version}:{global_version}:{basename}:{action}:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Mixin cho ViewSet: cache `response.data` của list/retrieve theo user.
+    Đặt sau ConditionalRequestMixin để 304 vẫn được xử lý trước khi đụng tới cache.
+    """
+
+    def get_response_cache_key(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return response_cache_key(
+            request.user.pk, self.basename, self.action, request.build_absolute_uri(), getattr(renderer, 'format', '')
+        )
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        options = cache_settings()
+        if not options['ENABLED'] or not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        endpoint = f'{self.basename}-{self.action}'
+        data = cache.get(key)
+        if data is not None:
+            cache_stats.record(endpoint, hit=True)
+            return Response(data)
+
+        cache_stats.record(endpoint, hit=False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, options['TIMEOUT'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,101 @@
+"""
+Bảng ClothingCategory nạp một lần vào bộ nhớ của process.
+
+ClothingCategory nhỏ, chỉ admin sửa và hiếm khi đổi, nhưng được đọc ở hầu hết request:
+kiểm tra `category` khi ghi món đồ, category_detail/category_name khi trả món đồ, stamp cho
+ETag (conditional.category_stamp()), /api/categories/. Các chỗ đó đọc từ category_catalog.
+
+Bản trong process bị bỏ và nạp lại khi:
+- ClothingCategory được lưu/xóa (signals, app/signals.py): ngay trong process đó, đồng thời
+  tăng số phiên bản trong cache VERSION_CACHE_ALIAS (Redis/file) để các worker khác nạp lại
+  ở request sau. Mỗi lần đọc catalog chỉ là một cache.get, không chạm DB.
+- Đã nạp quá MAX_AGE giây: lưới an toàn khi không có cache dùng chung giữa các worker, hoặc
+  khi bảng bị sửa không qua save()/delete() (queryset.update(), SQL tay).
+"""
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import aget_version, bump_version, get_version
+from .models import ClothingCategory
+
+VERSION_KEY = 'catalog:version:category'
+
+
+def catalog_settings():
+    options = {'VERSION_CACHE_ALIAS': None, 'MAX_AGE': 60}
+    options.update(getattr(settings, 'CATEGORY_CATALOG', {}))
+    return options
+
+
+class CategorySnapshot:
+    """
+    Nội dung bảng category tại một thời điểm. Chỉ đọc, dùng chung giữa các thread.
+    """
+    def __init__(self, categories, version):
+        self.categories = categories  # Theo Meta.ordering (name)
+        self.by_id = {category.pk: category for category in categories}
+        self.names = {category.pk: category.name for category in categories}
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # Giống aggregate_stamp(ClothingCategory.objects.all(), 'updated_at')
+        timestamps = [category.updated_at for category in categories if category.updated_at]
+        self.stamp = (max(timestamps) if timestamps else None, len(categories))
+
+
+class CategoryCatalog:
+    def __init__(self):
+        self._snapshot = None
+
+    @staticmethod
+    def version_cache():
+        alias = catalog_settings()['VERSION_CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def _is_fresh(self, snapshot, version):
+        if snapshot is None or snapshot.version != version:
+            return False
+        max_age = catalog_settings()['MAX_AGE']
+        return max_age is None or time.monotonic() - snapshot.loaded_at < max_age
+
+    def get(self):
+        cache = self.version_cache()
+        # Đọc phiên bản trước khi nạp: nếu bảng đổi trong lúc nạp, lần sau thấy phiên bản mới
+        version = get_version(VERSION_KEY, cache) if cache is not None else None
+        snapshot = self._snapshot
+        if not self._is_fresh(snapshot, version):
+            snapshot = self._snapshot = CategorySnapshot(list(ClothingCategory.objects.all()), version)
+        return snapshot
+
+    async def aget(self):
+        cache = self.version_cache()
+        version = await aget_version(VERSION_KEY, cache) if cache is not None else None
+        snapshot = self._snapshot
+        if not self._is_fresh(snapshot, version):
+            categories = [category async for category in ClothingCategory.objects.all()]
+            snapshot = self._snapshot = CategorySnapshot(categories, version)
+        return snapshot
+
+    def category(self, pk):
+        """
+        Bản sao ClothingCategory theo pk, None nếu không có. Category vừa được tạo ở worker
+        khác (chưa có trong bản đang giữ) được tìm lại trong DB.
+        """
+        category = self.get().by_id.get(pk)
+        if category is None:
+            category = ClothingCategory.objects.filter(pk=pk).first()
+            if category is not None:
+                self._snapshot = None
+            return category
+        return copy.copy(category)
+
+    def invalidate(self):
+        self._snapshot = None
+        cache = self.version_cache()
+        if cache is not None:
+            bump_version(VERSION_KEY, cache)
+
+
+category_catalog = CategoryCatalog()
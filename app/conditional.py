@@ -0,0 +1,149 @@
+import hashlib
+from calendar import timegm
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+from .catalog import category_catalog
+
+
+def aggregate_stamp(queryset, timestamp_field):
+    """
+    (thời điểm sửa mới nhất, số dòng) của queryset trong một query aggregate.
+    Thêm/sửa làm đổi max, xóa làm đổi count.
+    """
+    stamp = queryset.order_by().aggregate(last=Max(timestamp_field), count=Count('pk'))
+    return stamp['last'], stamp['count']
+
+
+def category_stamp():
+    # Tính từ bảng category trong bộ nhớ (app/catalog.py), không query
+    return category_catalog.get().stamp
+
+
+async def aaggregate_stamp(queryset, timestamp_field):
+    stamp = await queryset.order_by().aaggregate(last=Max(timestamp_field), count=Count('pk'))
+    return stamp['last'], stamp['count']
+
+
+async def acategory_stamp():
+    return (await category_catalog.aget()).stamp
+
+
+def make_validators(user_id, full_path, renderer_format, stamps):
+    """
+    (ETag, Last-Modified) từ user, URL, định dạng response và các stamp; dùng chung cho
+    view DRF và view async (app/asyncviews.py) để cùng URL luôn có cùng ETag.
+    """
+    raw = '|'.join([str(user_id), full_path, renderer_format] + [
+        f'{timestamp.isoformat() if timestamp else ""}:{count}' for timestamp, count in stamps
+    ])
+    etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+    timestamps = [timestamp for timestamp, _ in stamps if timestamp]
+    last_modified = timegm(max(timestamps).utctimetuple()) if timestamps else None
+    return etag, last_modified
+
+
+def set_validator_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+class ConditionalRequestMixin:
+    """
+    Mixin cho ModelViewSet: gắn ETag (strong) và Last-Modified cho list/retrieve,
+    trả 304 khi If-None-Match/If-Modified-Since khớp, và kiểm tra If-Match trên
+    update/partial_update/destroy (412 nếu client đang sửa trên bản cũ).
+
+    Validator được tính từ các query aggregate (max timestamp + count) do
+    `get_validator_stamps()` trả về, không cần serialize payload.
+
+    Lệnh ghi có If-Match chạy trong một transaction: sau khi precondition khớp, dòng đích
+    được "giữ" bằng UPDATE có điều kiện `write_stamp_field` vẫn bằng timestamp vừa đọc (khóa
+    dòng tới khi commit). Lệnh ghi khác chen vào giữa làm UPDATE không khớp dòng nào -> 412.
+    """
+    write_stamp_field = None  # Trường timestamp của stamp đầu tiên trong get_validator_stamps()
+
+    def get_validator_stamps(self, queryset, detail):
+        """
+        Trả về list các cặp (timestamp, count) mô tả trạng thái dữ liệu của response.
+        `queryset` đã được lọc theo user (và theo pk nếu là detail).
+        """
+        raise NotImplementedError
+
+    def get_validator_queryset(self, detail):
+        queryset = self.filter_queryset(self.get_queryset())
+        if detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, detail, stamps=None):
+        if stamps is None:
+            stamps = self.get_validator_stamps(self.get_validator_queryset(detail), detail)
+        if detail and not stamps[0][1]:
+            return None, None  # Không có object: để view trả 404 như bình thường
+
+        user_id = getattr(self.request.user, 'pk', None)
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return make_validators(user_id, self.request.get_full_path(), getattr(renderer, 'format', ''), stamps)
+
+    def conditional_response(self, request, detail, handler, *args, **kwargs):
+        if request.method in SAFE_METHODS or 'If-Match' not in request.headers:
+            return self.evaluate_conditional(request, detail, False, handler, *args, **kwargs)
+        with transaction.atomic():
+            return self.evaluate_conditional(request, detail, True, handler, *args, **kwargs)
+
+    def evaluate_conditional(self, request, detail, claim, handler, *args, **kwargs):
+        queryset = self.get_validator_queryset(detail)
+        stamps = self.get_validator_stamps(queryset, detail)
+        etag, last_modified = self.get_validators(detail, stamps=stamps)
+        if etag is not None:
+            response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                    self.set_validator_headers(response, etag, last_modified)
+                return response
+            if claim and not self.claim_for_write(queryset, stamps):
+                return HttpResponse(status=status.HTTP_412_PRECONDITION_FAILED)
+
+        response = handler(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            if response.status_code == status.HTTP_204_NO_CONTENT:
+                return response
+            # Trả validator mới sau khi ghi để client dùng cho lần If-Match tiếp theo
+            etag, last_modified = self.get_validators(detail)
+        if etag is not None and status.is_success(response.status_code):
+            self.set_validator_headers(response, etag, last_modified)
+        return response
+
+    def claim_for_write(self, queryset, stamps):
+        """
+        Khóa dòng đích nếu timestamp của nó vẫn là giá trị đã dùng để tính ETag; False nếu
+        một lệnh ghi khác đã sửa nó trong lúc đó.
+        """
+        field = self.write_stamp_field
+        if field is None:
+            return True
+        return bool(queryset.order_by().filter(**{field: stamps[0][0]}).update(**{field: F(field)}))
+
+    def set_validator_headers(self, response, etag, last_modified):
+        set_validator_headers(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, False, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, True, super().retrieve, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.conditional_response(request, True, super().update, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.conditional_response(request, True, super().destroy, *args, **kwargs)
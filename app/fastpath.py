@@ -0,0 +1,204 @@
+"""
+Đường đọc nhanh cho các danh sách nóng (GET /api/clothing-items/, /api/outfits/).
+
+Thay vì dựng instance model rồi chạy to_representation của từng field DRF, payload được
+ghép thẳng từ các dòng values() với:
+- tiền tố URL (scheme://host + MEDIA_URL) tính một lần cho mỗi request,
+- bảng id -> tên category trong process (app/catalog.py),
+- định dạng datetime giống hệt DateTimeField của DRF.
+
+JSON trả về phải giống hệt ClothingItemSerializer/OutfitSerializer (xem test parity
+trong app/tests.py). Tắt bằng settings FAST_READ_PATH = False.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .catalog import category_catalog
+from .images import RENDITION_SIZES
+from .models import ClothingItem
+from .storage import get_image_storage
+from .timing import timed
+
+ITEM_COLUMNS = (
+    'id', 'user__username', 'name', 'category_id', 'color', 'brand', 'image', 'renditions',
+    'image_status', 'notes', 'date_added', 'last_modified',
+)
+OUTFIT_COLUMNS = ('id', 'user__username', 'name', 'description', 'item_count', 'created_at', 'updated_at')
+
+
+def fast_read_path_enabled():
+    return getattr(settings, 'FAST_READ_PATH', True)
+
+
+class UrlBuilder:
+    """
+    URL tuyệt đối của file media, giống request.build_absolute_uri(storage.url(name)) nhưng
+    tiền tố "scheme://host/media/" chỉ tính một lần. Storage không phải FileSystemStorage
+    (S3, ...) thì gọi storage.url() như bình thường.
+    """
+    def __init__(self, request, storage):
+        self.request = request
+        self.storage = storage
+        self.prefix = None
+        if isinstance(storage, FileSystemStorage) and storage.base_url and storage.base_url.startswith('/'):
+            self.prefix = request.build_absolute_uri('/')[:-1] + storage.base_url
+
+    def __call__(self, name):
+        if self.prefix is not None:
+            path = filepath_to_uri(name).lstrip('/')
+            if '//' not in path and '/./' not in path and '/../' not in path and not path.startswith(('./', '../')):
+                return self.prefix + path
+        return self.request.build_absolute_uri(self.storage.url(name))
+
+
+class DateTimeFormatter:
+    """
+    Giống serializers.DateTimeField().to_representation với DATETIME_FORMAT mặc định (ISO 8601).
+    """
+    def __init__(self):
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def __call__(self, value):
+        if not value:
+            return None
+        if self.timezone is not None:
+            value = value.astimezone(self.timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+
+def can_use_fast_path():
+    # Chỉ ghép tay khi format datetime là ISO 8601 như mặc định của DRF
+    return fast_read_path_enabled() and (api_settings.DATETIME_FORMAT or '').lower() == 'iso-8601'
+
+
+class ItemRowSerializer:
+    """
+    Ghép dict của một món đồ từ một dòng values(ITEM_COLUMNS), cùng thứ tự key với ClothingItemSerializer.
+    `categories` ({id: tên}) truyền sẵn khi gọi từ view async (lấy bằng category_catalog.aget()).
+    """
+    def __init__(self, request, categories=None):
+        self.url = UrlBuilder(request, get_image_storage())
+        self.datetime = DateTimeFormatter()
+        self.categories = category_catalog.get().names if categories is None else categories
+
+    def __call__(self, row):
+        category_id = row['category_id']
+        if category_id is None:
+            category_name = category_detail = None
+        else:
+            category_name = self.categories.get(category_id)
+            category_detail = {'id': category_id, 'name': category_name}
+        image = row['image'] or None
+        if image:
+            original = self.url(image)
+            renditions = row['renditions']
+            image_urls = {}
+            for size_name in RENDITION_SIZES:
+                rendition = renditions.get(size_name)
+                image_urls[size_name] = self.url(rendition) if rendition else original
+            image_urls['original'] = original
+        else:
+            original = image_urls = None
+        return {
+            'id': row['id'],
+            'user_username': row['user__username'],
+            'name': row['name'],
+            'category_name': category_name,
+            'category_detail': category_detail,
+            'color': row['color'],
+            'brand': row['brand'],
+            'image': image,
+            'image_display_url': original,
+            'image_urls': image_urls,
+            'image_status': row['image_status'],
+            'notes': row['notes'],
+            'date_added': self.datetime(row['date_added']),
+            'last_modified': self.datetime(row['last_modified']),
+        }
+
+
+def serialize_items(rows, request):
+    serialize = ItemRowSerializer(request)
+    return [serialize(row) for row in rows]
+
+
+def outfit_items_queryset(outfit_ids):
+    """
+    Các món đồ (values(ITEM_COLUMNS) kèm id bộ đồ ở key `outfits`) của các bộ đồ trong
+    `outfit_ids` bằng một query join bảng trung gian, giữ thứ tự như prefetch
+    (ordering mặc định của ClothingItem).
+    """
+    return ClothingItem.objects.filter(outfits__in=outfit_ids).values('outfits', *ITEM_COLUMNS)
+
+
+def assemble_outfits(rows, item_rows, serialize_item):
+    """
+    Outfit đầy đủ (như OutfitSerializer) từ các dòng values(OUTFIT_COLUMNS) và các dòng
+    của outfit_items_queryset().
+    """
+    format_datetime = serialize_item.datetime
+    members = {row['id']: [] for row in rows}
+    for item in item_rows:
+        members[item['outfits']].append(serialize_item(item))
+    return [
+        {
+            'id': row['id'],
+            'user_username': row['user__username'],
+            'name': row['name'],
+            'description': row['description'],
+            'clothing_items_details': members[row['id']],
+            'item_count': row['item_count'],
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+        }
+        for row in rows
+    ]
+
+
+def serialize_outfits(rows, request):
+    rows = list(rows)
+    item_rows = outfit_items_queryset([row['id'] for row in rows])
+    return assemble_outfits(rows, item_rows, ItemRowSerializer(request))
+
+
+class FastListMixin:
+    """
+    Mixin cho ViewSet (đặt sau ConditionalRequestMixin/CachedResponseMixin): `list` với
+    representation đầy đủ mặc định được ghép từ values() bằng `fast_serialize_rows`,
+    các trường hợp khác đi qua serializer như ListModelMixin.
+    """
+    fast_columns = ()
+
+    def fast_serialize_rows(self, rows):
+        raise NotImplementedError
+
+    def use_fast_list(self):
+        return can_use_fast_path() and not getattr(self, 'use_compact_serializer', lambda: False)()
+
+    def list_response(self, queryset):
+        """
+        Response danh sách (có phân trang) cho `queryset` đã lọc; dùng chung cho `list`
+        và các action kiểu danh sách như `search`.
+        """
+        if self.use_fast_list():
+            queryset = queryset.values(*self.fast_columns)
+            serialize = self.fast_serialize_rows
+        else:
+            serialize = lambda rows: self.get_serializer(rows, many=True).data
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with timed('serialize'):
+                data = serialize(page)
+            return self.get_paginated_response(data)
+        with timed('serialize'):
+            return Response(serialize(queryset))
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
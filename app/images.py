@@ -0,0 +1,127 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .cache import invalidate_user
+from .models import ClothingItem
+
+# Kích thước cạnh dài tối đa (px) của từng rendition. 'original' luôn là file gốc.
+RENDITION_SIZES = getattr(settings, 'IMAGE_RENDITION_SIZES', {'thumb': 200, 'medium': 800})
+RENDITION_DIR = 'clothing_images/renditions/'
+
+
+def rendition_format():
+    """
+    WebP nếu Pillow được build có hỗ trợ, ngược lại dùng JPEG.
+    """
+    preferred = getattr(settings, 'IMAGE_RENDITION_FORMAT', 'WEBP').upper()
+    if preferred == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return preferred
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format, quality=80, method=4)
+    return buffer.getvalue()
+
+
+def generate_renditions(name, storage=default_storage):
+    """
+    Tạo các rendition cho file ảnh `name` trong `storage`, trả về dict {tên size: đường dẫn}.
+    File được mở lại từ storage (file upload tạm có thể đã bị move khi lưu).
+    Ảnh được xoay theo EXIF rồi encode lại nên không còn metadata EXIF (GPS, máy chụp...).
+    Tên file là hash nội dung: cùng nội dung thì dùng lại file đã có.
+    """
+    image_format = rendition_format()
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    largest = max(RENDITION_SIZES.values())
+
+    with storage.open(name, 'rb') as image_file:
+        image = Image.open(image_file)
+        # Với JPEG, draft() cho phép giải mã thẳng ở độ phân giải thấp hơn,
+        # nhanh và tốn ít RAM hơn nhiều so với giải mã ảnh gốc vài chục megapixel.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    renditions = {}
+    for size_name, size in sorted(RENDITION_SIZES.items(), key=lambda kv: -kv[1]):
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        data = _encode(resized, image_format)
+        digest = hashlib.sha256(data).hexdigest()
+        rendition_name = f'{RENDITION_DIR}{digest[:2]}/{digest}.{extension}'
+        if not storage.exists(rendition_name):
+            rendition_name = storage.save(rendition_name, ContentFile(data))
+        renditions[size_name] = rendition_name
+    return renditions
+
+
+def update_item_fields(item, **fields):
+    """
+    Ghi các trường dẫn xuất từ ảnh (renditions, image_status) bằng update(), không chạy
+    lại signal save. last_modified vẫn được cập nhật vì nội dung trả về cho client đã đổi
+    (ETag, đồng bộ dựa vào nó).
+    """
+    fields['last_modified'] = timezone.now()
+    ClothingItem.objects.filter(pk=item.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(item, name, value)
+    invalidate_user(item.user_id)
+
+
+def update_renditions(item, force=False):
+    """
+    Đảm bảo `item.renditions` khớp với `item.image` hiện tại.
+    Chỉ tạo lại khi ảnh gốc đổi (hoặc force=True).
+    """
+    if not item.image:
+        renditions = {}
+    elif not force and item.renditions.get('source') == item.image.name:
+        return item.renditions
+    else:
+        renditions = {'source': item.image.name, **generate_renditions(item.image.name, item.image.storage)}
+
+    if renditions != item.renditions:
+        update_item_fields(item, renditions=renditions)
+    return renditions
+
+
+def rendition_url(item, size_name, build_url):
+    """
+    URL của một rendition; dùng tạm ảnh gốc nếu rendition chưa có.
+    """
+    if not item.image:
+        return None
+    name = item.renditions.get(size_name)
+    return build_url(item.image.storage.url(name) if name else item.image.url)
+
+
+def rendition_urls(item, build_url):
+    """
+    URL cho từng size và 'original'. Rendition chưa có (ảnh cũ chưa backfill)
+    thì dùng tạm ảnh gốc để client luôn có ảnh hiển thị.
+    """
+    if not item.image:
+        return None
+    original = build_url(item.image.url)
+    urls = {}
+    for size_name in RENDITION_SIZES:
+        name = item.renditions.get(size_name)
+        urls[size_name] = build_url(item.image.storage.url(name)) if name else original
+    urls['original'] = original
+    return urls
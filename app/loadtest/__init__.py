@@ -0,0 +1,10 @@
+"""
+Đo tải các API của app (lệnh `bench_traffic`).
+
+- dataset.py: tạo user, category, món đồ, bộ đồ và ảnh giả theo quy mô chọn trước,
+- scenarios.py: các request mẫu cho từng route trong app/urls.py (và /media/) cùng các
+  tỉ lệ trộn (mix) mô phỏng lưu lượng thật,
+- runner.py: phát lại một mix qua Django test client (trong process, đếm được query)
+  hoặc qua HTTP tới gunicorn chạy local,
+- report.py: p50/p95/p99, số query và số byte mỗi request theo kịch bản; lưu/so sánh baseline.
+"""
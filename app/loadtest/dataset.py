@@ -0,0 +1,173 @@
+"""
+Dữ liệu giả cho đo tải. Mọi thứ được ghi bằng bulk_create, các việc mà signals thường làm
+(chỉ mục tìm kiếm, thống kê gợi ý, đếm tham chiếu ảnh) được gọi trực tiếp như app/bulk.py.
+Ảnh được vẽ bằng Pillow và xử lý đồng bộ (rendition, dấu vân tay) để các route ảnh có dữ liệu.
+"""
+import io
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from PIL import Image, ImageDraw
+from rest_framework.authtoken.models import Token
+
+from .. import blobs, recommend, search, stats
+from ..membership import OutfitItems
+from ..models import ClothingCategory, ClothingItem, Outfit, Tombstone
+from ..storage import get_image_storage
+from ..tasks import process_item_image
+
+PASSWORD = 'bench-pass-123'
+NAMES = ['Áo sơ mi', 'Áo thun', 'Quần jean', 'Quần tây', 'Váy', 'Áo khoác', 'Giày', 'Túi', 'Mũ', 'Khăn']
+COLORS = ['đỏ', 'xanh', 'đen', 'trắng', 'vàng', 'xám', 'hồng', 'nâu']
+BRANDS = ['Uniqlo', 'Zara', 'H&M', 'Canifa', 'Routine', 'Nike', 'Adidas', 'Local']
+
+
+class Scale:
+    """
+    Quy mô dữ liệu giả (mỗi user).
+    """
+    def __init__(self, users=3, categories=8, items=200, outfits=40, items_per_outfit=4, images=6):
+        self.users = users
+        self.categories = categories
+        self.items = items
+        self.outfits = outfits
+        self.items_per_outfit = items_per_outfit
+        self.images = images
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @staticmethod
+    def add_arguments(parser):
+        """
+        Các option quy mô cho lệnh quản trị đo tải (bench_traffic, bench_asgi).
+        """
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--categories', type=int, default=8)
+        parser.add_argument('--items', type=int, default=200, help='Số món đồ mỗi user.')
+        parser.add_argument('--outfits', type=int, default=40, help='Số bộ đồ mỗi user.')
+        parser.add_argument('--items-per-outfit', type=int, default=4)
+        parser.add_argument('--images', type=int, default=6, help='Số món đồ có ảnh mỗi user.')
+
+    @classmethod
+    def from_options(cls, options):
+        return cls(
+            users=options['users'], categories=options['categories'], items=options['items'],
+            outfits=options['outfits'], items_per_outfit=options['items_per_outfit'], images=options['images'],
+        )
+
+
+class BenchUser:
+    def __init__(self, user, token):
+        self.user = user
+        self.token = token
+        self.item_ids = []
+        self.outfit_ids = []
+        self.image_item_ids = []
+
+
+class Dataset:
+    """
+    Dữ liệu đã tạo: các user thường, một user staff (cho route chỉ dành cho admin),
+    category, và một ảnh JPEG mẫu dùng cho các request upload.
+    """
+    def __init__(self, prefix, users, admin, category_ids, sample_image):
+        self.prefix = prefix
+        self.users = users
+        self.admin = admin
+        self.category_ids = category_ids
+        self.sample_image = sample_image
+
+    def delete(self):
+        """
+        Xóa dữ liệu đã tạo (khi đo qua gunicorn, dữ liệu phải được commit).
+        """
+        User.objects.filter(username__startswith=self.prefix).delete()
+        ClothingCategory.objects.filter(pk__in=self.category_ids).delete()
+        Tombstone.objects.filter(model=Tombstone.CATEGORY, object_id__in=self.category_ids).delete()
+
+
+def draw_image(rng, size=(480, 640)):
+    image = Image.new('RGB', size, tuple(rng.randrange(180, 256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(4):
+        x, y = rng.randrange(size[0] // 2), rng.randrange(size[1] // 2)
+        box = (x, y, x + rng.randrange(60, size[0] // 2), y + rng.randrange(60, size[1] // 2))
+        draw.rectangle(box, fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def build_dataset(scale, seed=0):
+    rng = random.Random(seed)
+    prefix = f'__bench_{uuid.uuid4().hex[:8]}_'
+    password = make_password(PASSWORD)  # Băm một lần cho mọi user
+    categories = ClothingCategory.objects.bulk_create(
+        ClothingCategory(name=f'{prefix}{i}') for i in range(scale.categories)
+    )
+    category_ids = [category.pk for category in categories]
+
+    accounts = User.objects.bulk_create(
+        [User(username=f'{prefix}user{i}', password=password) for i in range(scale.users)]
+        + [User(username=f'{prefix}admin', password=password, is_staff=True)]
+    )
+    tokens = Token.objects.bulk_create(Token(key=Token.generate_key(), user=user) for user in accounts)
+    users = [BenchUser(user, token.key) for user, token in zip(accounts, tokens)]
+    admin = users.pop()
+
+    storage = get_image_storage()
+    for bench_user in users:
+        _build_wardrobe(bench_user, scale, category_ids, storage, rng)
+    return Dataset(prefix, users, admin, category_ids, draw_image(rng))
+
+
+def _build_wardrobe(bench_user, scale, category_ids, storage, rng):
+    user = bench_user.user
+    items = ClothingItem.objects.bulk_create(
+        [
+            ClothingItem(
+                user=user,
+                name=f'{rng.choice(NAMES)} {rng.choice(COLORS)} {i}',
+                category_id=rng.choice(category_ids) if category_ids and rng.random() < 0.9 else None,
+                color=rng.choice(COLORS),
+                brand=rng.choice(BRANDS),
+                notes=' '.join(rng.choice(NAMES) for _ in range(rng.randrange(0, 6))),
+            )
+            for i in range(scale.items)
+        ],
+        batch_size=500,
+    )
+    search.index_objects(items)
+    stats.apply_item_deltas(user.pk, stats.item_deltas(after=[stats.item_values(item) for item in items]))
+    bench_user.item_ids = [item.pk for item in items]
+
+    with_images = items[:scale.images]
+    for item in with_images:
+        item.image = storage.save('clothing_images/bench.jpg', ContentFile(draw_image(rng)))
+    ClothingItem.objects.bulk_update(with_images, ['image'])
+    blobs.acquire_many([item.image.name for item in with_images])
+    for item in with_images:
+        process_item_image(item)
+    bench_user.image_item_ids = [item.pk for item in with_images]
+
+    outfits = Outfit.objects.bulk_create(
+        [Outfit(user=user, name=f'Bộ đồ {i}', description=rng.choice(NAMES)) for i in range(scale.outfits)]
+    )
+    search.index_objects(outfits)
+    bench_user.outfit_ids = [outfit.pk for outfit in outfits]
+    members = {
+        outfit.pk: set(rng.sample(bench_user.item_ids, min(scale.items_per_outfit, len(items))))
+        for outfit in outfits
+    }
+    OutfitItems.objects.bulk_create(
+        [OutfitItems(outfit_id=outfit_id, clothingitem_id=item_id)
+         for outfit_id, item_ids in members.items() for item_id in item_ids],
+        batch_size=500,
+    )
+    empty = {outfit_id: set() for outfit_id in members}
+    recommend.apply_deltas(user.pk, recommend.membership_deltas(empty, members))
+    stats.set_item_counts({outfit_id: len(item_ids) for outfit_id, item_ids in members.items()})
@@ -0,0 +1,107 @@
+"""
+Tổng hợp kết quả đo theo kịch bản và so sánh với baseline đã lưu (JSON).
+
+Số query và số byte gần như không đổi giữa các lần chạy cùng mix/quy mô/seed nên được so
+chặt; độ trễ phụ thuộc máy nên chỉ báo khi p95 chậm hơn LATENCY_RATIO lần và hơn LATENCY_FLOOR_MS,
+và chỉ với kịch bản có đủ MIN_LATENCY_SAMPLES mẫu (thường chỉ còn dòng TOTAL khi chạy ít request).
+"""
+import json
+import math
+import statistics
+from collections import Counter, defaultdict
+
+TOTAL = '__total__'
+LATENCY_RATIO = 1.5
+LATENCY_FLOOR_MS = 2.0
+BYTES_RATIO = 1.1
+QUERY_SLACK = 0.5
+# Ít mẫu hơn thì p95 gần như là giá trị lớn nhất, quá nhiễu để so
+MIN_LATENCY_SAMPLES = 20
+
+
+def percentile(values, q):
+    """
+    Phân vị kiểu nearest-rank của dãy đã sắp xếp.
+    """
+    if not values:
+        return None
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+def _stats(samples):
+    latencies = sorted(sample.elapsed_ms for sample in samples)
+    queries = [sample.queries for sample in samples if sample.queries is not None]
+    return {
+        'count': len(samples),
+        'p50': round(percentile(latencies, 50), 3),
+        'p95': round(percentile(latencies, 95), 3),
+        'p99': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': round(statistics.fmean(queries), 2) if queries else None,
+        'bytes': round(statistics.fmean(sample.size for sample in samples)),
+        'errors': sum(1 for sample in samples if sample.status >= 400),
+        'statuses': dict(sorted(Counter(str(sample.status) for sample in samples).items())),
+    }
+
+
+def summarize(samples, duration=None):
+    """
+    {tên kịch bản: thống kê}, kèm dòng TOTAL cho toàn bộ (có `rps` nếu biết thời gian chạy).
+    """
+    by_scenario = defaultdict(list)
+    for sample in samples:
+        by_scenario[sample.scenario].append(sample)
+    summary = {name: _stats(group) for name, group in sorted(by_scenario.items())}
+    if samples:
+        summary[TOTAL] = _stats(samples)
+        if duration:
+            summary[TOTAL]['rps'] = round(len(samples) / duration, 1)
+    return summary
+
+
+def format_table(summary):
+    header = f'{"scenario":<22} {"n":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"bytes":>9} {"err":>4}'
+    lines = [header, '-' * len(header)]
+    for name, row in summary.items():
+        queries = '-' if row['queries'] is None else f'{row["queries"]:.1f}'
+        lines.append(
+            f'{"TOTAL" if name == TOTAL else name:<22} {row["count"]:>5} {row["p50"]:>8.2f} {row["p95"]:>8.2f} '
+            f'{row["p99"]:>8.2f} {queries:>8} {row["bytes"]:>9} {row["errors"]:>4}'
+        )
+    if TOTAL in summary and 'rps' in summary[TOTAL]:
+        lines.append(f'{summary[TOTAL]["rps"]} request/s')
+    return '\n'.join(lines)
+
+
+def save_baseline(path, summary, meta):
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump({'meta': meta, 'scenarios': summary}, baseline, indent=2, ensure_ascii=False, sort_keys=True)
+        baseline.write('\n')
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as baseline:
+        return json.load(baseline)
+
+
+def compare(summary, baseline, latency_ratio=LATENCY_RATIO, latency_floor_ms=LATENCY_FLOOR_MS):
+    """
+    Danh sách mô tả các chỉ số xấu đi so với baseline (rỗng nếu không có).
+    """
+    regressions = []
+    for name, row in summary.items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if row['count'] >= MIN_LATENCY_SAMPLES and base['count'] >= MIN_LATENCY_SAMPLES:
+            if row['p95'] > base['p95'] * latency_ratio and row['p95'] - base['p95'] > latency_floor_ms:
+                regressions.append(f'{name}: p95 {base["p95"]} ms -> {row["p95"]} ms')
+        if name == TOTAL:
+            continue
+        if row['queries'] is not None and base['queries'] is not None and row['queries'] > base['queries'] + QUERY_SLACK:
+            regressions.append(f'{name}: queries {base["queries"]} -> {row["queries"]}')
+        if row['bytes'] > base['bytes'] * BYTES_RATIO:
+            regressions.append(f'{name}: bytes {base["bytes"]} -> {row["bytes"]}')
+        if row['errors'] > base['errors']:
+            regressions.append(f'{name}: errors {base["errors"]} -> {row["errors"]}')
+    return regressions
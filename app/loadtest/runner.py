@@ -0,0 +1,244 @@
+"""
+Phát lại kịch bản (scenarios.py) qua một "transport":
+- ClientTransport: Django test client trong cùng process, đếm được số query mỗi request;
+  dùng trong transaction được rollback nên không để lại dữ liệu.
+- HttpTransport: HTTP tới một server đang chạy (gunicorn local do `gunicorn_server()` khởi
+  động, WSGI hoặc ASGI, hoặc URL có sẵn), đo cả chi phí WSGI/mạng; dữ liệu giả phải được commit.
+SlowUploads tạo thêm các client upload chậm chạy song song trong lúc đo.
+"""
+import http.client
+import io
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+
+from .scenarios import MIXES, SCENARIOS_BY_NAME, Context
+
+
+class Sample:
+    def __init__(self, scenario, status, elapsed_ms, queries, size):
+        self.scenario = scenario
+        self.status = status
+        self.elapsed_ms = elapsed_ms
+        self.queries = queries
+        self.size = size
+
+
+class ClientTransport:
+    counts_queries = True
+    concurrent = False
+
+    def __init__(self):
+        # Lỗi 500 được ghi nhận như một response thay vì ném exception ra ngoài
+        self.client = Client(raise_request_exception=False)
+
+    def send(self, call, token):
+        body, content_type = call.body()
+        headers = dict(call.headers)
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.generic(
+                call.method, call.path, body, content_type=content_type or 'application/octet-stream',
+                secure=True, headers=headers,
+            )
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed, len(queries.captured_queries), size
+
+
+class HttpTransport:
+    counts_queries = False
+    concurrent = True
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        # Giữ kết nối keep-alive riêng cho mỗi thread
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self.local.connection
+
+    def send(self, call, token):
+        body, content_type = call.body()
+        # Server chạy với SECURE_SSL_REDIRECT: giả làm request đã qua proxy HTTPS
+        headers = {'X-Forwarded-Proto': 'https', **call.headers}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        conn = self._connection()
+        start = time.perf_counter()
+        try:
+            conn.request(call.method, call.path, body or None, headers)
+            response = conn.getresponse()
+            size = len(response.read())
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.connection = None
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        return response.status, elapsed, None, size
+
+
+def schedule(mix, count, seed=0):
+    """
+    `count` tên kịch bản rút ngẫu nhiên (cố định theo seed) theo trọng số của mix.
+    """
+    weights = MIXES[mix] if isinstance(mix, str) else mix
+    names = sorted(weights)
+    return random.Random(seed).choices(names, [weights[name] for name in names], k=count)
+
+
+def replay(transport, dataset, names, warmup=0, seed=0, concurrency=1):
+    """
+    Gửi lần lượt các kịch bản `names`; `warmup` request đầu không được ghi lại.
+    Với transport HTTP và concurrency > 1, mỗi lượt dựng `concurrency` request rồi gửi song song.
+    Trả về (các Sample, thời gian chạy tính bằng giây).
+    """
+    ctx = Context(dataset, random.Random(seed))
+    concurrency = concurrency if transport.concurrent else 1
+    samples = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for offset in range(0, len(names), concurrency):
+            batch = []
+            for name in names[offset:offset + concurrency]:
+                scenario = SCENARIOS_BY_NAME[name]
+                ctx.account = dataset.admin if scenario.as_admin else ctx.rng.choice(dataset.users)
+                call = scenario.build(ctx)
+                batch.append((name, call, ctx.account.token if call.auth else None))
+            # Test client phải chạy trên thread chính: dữ liệu giả nằm trong transaction của
+            # connection thread này, thread khác mở connection riêng nên không thấy
+            send = executor.map if concurrency > 1 else map
+            results = send(lambda job: transport.send(job[1], job[2]), batch)
+            for index, ((name, _, _), result) in enumerate(zip(batch, results), offset):
+                if index >= warmup:
+                    samples.append(Sample(name, *result))
+            if offset < warmup <= offset + concurrency:
+                started = time.perf_counter()
+    return samples, time.perf_counter() - started
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn_server(workers=2, env=None, startup_timeout=30, asgi=False):
+    """
+    Chạy `gunicorn myapp.wsgi` (worker sync) hoặc, với `asgi`, `myapp.asgi` trên worker
+    uvicorn, trên một port trống, trả về URL gốc. Server dùng cùng DATABASE_URL với
+    process hiện tại; `env` thêm biến môi trường (ví dụ MEDIA_ROOT).
+    """
+    port = _free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'myapp.asgi:application' if asgi else 'myapp.wsgi',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+    ]
+    if asgi:
+        command += ['--worker-class', 'uvicorn.workers.UvicornWorker']
+    # DEBUG=False nên phải cho phép host 127.0.0.1 (xem ALLOWED_HOSTS trong settings)
+    process = subprocess.Popen(
+        command, cwd=settings.BASE_DIR, env={**os.environ, 'RENDER_EXTERNAL_HOSTNAME': '127.0.0.1', **(env or {})},
+    )
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError('gunicorn did not start in time')
+                time.sleep(0.2)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+class SlowUploads:
+    """
+    `clients` thread, mỗi thread liên tục upload ảnh (POST multipart /api/clothing-items/)
+    và gửi body rất chậm, trong khoảng `seconds` giây mỗi lần, như điện thoại trên mạng yếu.
+    Với gunicorn sync, mỗi upload như vậy giữ nguyên một worker trong suốt thời gian gửi.
+    """
+    def __init__(self, base_url, dataset, clients, seconds=5.0, chunks=50):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.dataset = dataset
+        self.clients = clients
+        self.delay = seconds / chunks
+        self.chunks = chunks
+        self.stop = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.completed = 0
+
+    def __enter__(self):
+        for index in range(self.clients):
+            thread = threading.Thread(target=self.run, args=(index,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+
+    def run(self, index):
+        account = self.dataset.users[index % len(self.dataset.users)]
+        image = io.BytesIO(self.dataset.sample_image)
+        image.name = 'photo.jpg'
+        body = encode_multipart(BOUNDARY, {'name': f'Upload chậm {index}', 'image': image})
+        step = max(len(body) // self.chunks, 1)
+        headers = {
+            'X-Forwarded-Proto': 'https', 'Authorization': f'Token {account.token}',
+            'Content-Type': MULTIPART_CONTENT, 'Content-Length': str(len(body)),
+        }
+        while not self.stop.is_set():
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                conn.putrequest('POST', '/api/clothing-items/')
+                for name, value in headers.items():
+                    conn.putheader(name, value)
+                conn.endheaders()
+                for offset in range(0, len(body), step):
+                    conn.send(body[offset:offset + step])
+                    if self.stop.wait(self.delay):
+                        break
+                else:
+                    conn.getresponse().read()
+                    with self.lock:
+                        self.completed += 1
+            except (http.client.HTTPException, OSError):
+                pass
+            finally:
+                conn.close()
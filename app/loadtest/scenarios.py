@@ -0,0 +1,253 @@
+"""
+Các kịch bản request cho đo tải: mỗi kịch bản ứng với một route (tên URL trong app/urls.py,
+hoặc 'media') và dựng một request cụ thể từ dữ liệu giả. Phần chuẩn bị (ví dụ tạo món đồ
+để xóa) chạy bằng ORM trước khi bấm giờ.
+
+MIXES là tỉ lệ trộn các kịch bản:
+- browse: app mobile lướt tủ đồ (đọc là chính),
+- edit: thêm/sửa/xóa món đồ và bộ đồ,
+- sync: client offline đồng bộ và tải ảnh,
+- all: mọi kịch bản cùng trọng số (dùng để kiểm tra không route nào bị sót).
+"""
+import io
+import json
+import tarfile
+
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+from ..membership import OutfitItems
+from ..models import ClothingItem, Outfit
+from ..transfer import FORMAT_VERSION
+from .dataset import PASSWORD
+
+
+class Call:
+    """
+    Một request: `data` được mã hóa theo `format` ('json', 'multipart' hoặc bytes thô
+    với `content_type`).
+    """
+    def __init__(self, method, path, data=None, format='json', content_type=None, headers=None, auth=True):
+        self.method = method
+        self.path = path
+        self.data = data
+        self.format = format
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.auth = auth
+
+    def body(self):
+        if self.data is None:
+            return b'', None
+        if isinstance(self.data, bytes):
+            return self.data, self.content_type
+        if self.format == 'multipart':
+            return encode_multipart(BOUNDARY, self.data), MULTIPART_CONTENT
+        return json.dumps(self.data).encode(), 'application/json'
+
+
+class Context:
+    """
+    Trạng thái khi phát lại: dữ liệu giả, bộ sinh số ngẫu nhiên và user của request hiện tại.
+    """
+    def __init__(self, dataset, rng):
+        self.dataset = dataset
+        self.rng = rng
+        self.account = None
+        self.counter = 0
+
+    @property
+    def user(self):
+        return self.account.user
+
+    def next_id(self):
+        self.counter += 1
+        return self.counter
+
+    def item_id(self):
+        return self.rng.choice(self.account.item_ids)
+
+    def outfit_id(self):
+        return self.rng.choice(self.account.outfit_ids)
+
+    def image_item(self):
+        return ClothingItem.objects.only('image', 'renditions').get(pk=self.rng.choice(self.account.image_item_ids))
+
+    def new_items(self, count):
+        items = ClothingItem.objects.bulk_create(
+            ClothingItem(user=self.user, name=f'Bench tạm {self.next_id()}') for _ in range(count)
+        )
+        return [item.pk for item in items]
+
+    def member_ids(self, outfit_id):
+        return list(OutfitItems.objects.filter(outfit_id=outfit_id).values_list('clothingitem_id', flat=True))
+
+
+class Scenario:
+    def __init__(self, name, route, build, as_admin=False):
+        self.name = name
+        self.route = route
+        self.build = build
+        self.as_admin = as_admin
+
+
+def _upload(ctx):
+    image = io.BytesIO(ctx.dataset.sample_image)
+    image.name = 'photo.jpg'
+    return image
+
+
+def _membership(action, pick):
+    def build(ctx):
+        outfit_id = ctx.outfit_id()
+        return Call('POST', f'/api/outfits/{outfit_id}/{action}/', pick(ctx, outfit_id))
+    return build
+
+
+def _add_one(ctx, outfit_id):
+    return {'clothing_item_id': ctx.item_id()}
+
+
+def _remove_one(ctx, outfit_id):
+    members = ctx.member_ids(outfit_id)
+    if not members:
+        Outfit.objects.get(pk=outfit_id).clothing_items.add(ctx.item_id())
+        members = ctx.member_ids(outfit_id)
+    return {'clothing_item_id': ctx.rng.choice(members)}
+
+
+def _add_many(ctx, outfit_id):
+    return {'clothing_item_ids': ctx.rng.sample(ctx.account.item_ids, min(3, len(ctx.account.item_ids)))}
+
+
+def _remove_many(ctx, outfit_id):
+    return {'clothing_item_ids': ctx.member_ids(outfit_id)[:2] or [ctx.item_id()]}
+
+
+def _delete_item(ctx):
+    return Call('DELETE', f'/api/clothing-items/{ctx.new_items(1)[0]}/')
+
+
+def _delete_outfit(ctx):
+    outfit = Outfit.objects.create(user=ctx.user, name=f'Bench tạm {ctx.next_id()}')
+    return Call('DELETE', f'/api/outfits/{outfit.pk}/')
+
+
+def _bulk_update(ctx):
+    ids = ctx.rng.sample(ctx.account.item_ids, min(20, len(ctx.account.item_ids)))
+    return Call('PATCH', '/api/clothing-items/bulk/', [{'id': pk, 'color': ctx.rng.choice(['đỏ', 'xanh'])} for pk in ids])
+
+
+def _import_records(ctx):
+    lines = [{'type': 'header', 'data': {'version': FORMAT_VERSION}}]
+    lines += [{'type': 'clothing_item', 'data': {'id': i, 'name': f'Nhập {i}'}} for i in range(5)]
+    lines += [{'type': 'outfit', 'data': {'id': 1, 'name': 'Nhập'}}]
+    lines += [{'type': 'outfit_item', 'data': {'outfit': 1, 'clothing_item': i}} for i in range(3)]
+    body = ''.join(json.dumps(line) + '\n' for line in lines).encode()
+    return Call('POST', '/api/import/', body, content_type='application/x-ndjson')
+
+
+def _import_images(ctx):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        info = tarfile.TarInfo('clothing_images/photo.jpg')
+        info.size = len(ctx.dataset.sample_image)
+        archive.addfile(info, io.BytesIO(ctx.dataset.sample_image))
+    return Call('POST', '/api/import/images/', buffer.getvalue(), content_type='application/x-tar')
+
+
+def _media(kind, headers=None):
+    def build(ctx):
+        item = ctx.image_item()
+        name = item.image.name if kind == 'original' else item.renditions.get(kind, item.image.name)
+        return Call('GET', item.image.storage.url(name), headers=headers)
+    return build
+
+
+SCENARIOS = [
+    Scenario('api-root', 'api-root', lambda ctx: Call('GET', '/api/')),
+    Scenario('categories', 'clothingcategory-list', lambda ctx: Call('GET', '/api/categories/')),
+    Scenario('category-detail', 'clothingcategory-detail',
+             lambda ctx: Call('GET', f'/api/categories/{ctx.rng.choice(ctx.dataset.category_ids)}/')),
+
+    Scenario('items-page', 'clothingitem-list', lambda ctx: Call('GET', '/api/clothing-items/?page=1')),
+    Scenario('items-keyset', 'clothingitem-list',
+             lambda ctx: Call('GET', '/api/clothing-items/?pagination=keyset&page_size=50')),
+    Scenario('items-compact', 'clothingitem-list',
+             lambda ctx: Call('GET', '/api/clothing-items/?pagination=keyset&page_size=100&fields=id,name,thumbnail')),
+    Scenario('item-create', 'clothingitem-list',
+             lambda ctx: Call('POST', '/api/clothing-items/', {'name': f'Áo mới {ctx.next_id()}', 'color': 'đỏ'})),
+    Scenario('item-upload', 'clothingitem-list',
+             lambda ctx: Call('POST', '/api/clothing-items/', {'name': 'Ảnh mới', 'image': _upload(ctx)}, 'multipart')),
+    Scenario('item-detail', 'clothingitem-detail', lambda ctx: Call('GET', f'/api/clothing-items/{ctx.item_id()}/')),
+    Scenario('item-update', 'clothingitem-detail',
+             lambda ctx: Call('PATCH', f'/api/clothing-items/{ctx.item_id()}/', {'brand': 'Zara'})),
+    Scenario('item-delete', 'clothingitem-detail', _delete_item),
+    Scenario('items-bulk-create', 'clothingitem-bulk', lambda ctx: Call(
+        'POST', '/api/clothing-items/bulk/', [{'name': f'Bulk {ctx.next_id()}', 'brand': 'Local'} for _ in range(20)]
+    )),
+    Scenario('items-bulk-update', 'clothingitem-bulk', _bulk_update),
+    Scenario('items-bulk-delete', 'clothingitem-bulk-delete',
+             lambda ctx: Call('POST', '/api/clothing-items/bulk-delete/', {'ids': ctx.new_items(10)})),
+    Scenario('items-search', 'clothingitem-search',
+             lambda ctx: Call('GET', f'/api/clothing-items/search/?q={ctx.rng.choice(["ao", "quan+den", "giay"])}')),
+    Scenario('items-duplicates', 'clothingitem-duplicates', lambda ctx: Call('GET', '/api/clothing-items/duplicates/')),
+    Scenario('item-similar', 'clothingitem-similar',
+             lambda ctx: Call('GET', f'/api/clothing-items/{ctx.rng.choice(ctx.account.image_item_ids)}/similar/')),
+
+    Scenario('outfits-page', 'outfit-list', lambda ctx: Call('GET', '/api/outfits/?page=1')),
+    Scenario('outfits-expand', 'outfit-list', lambda ctx: Call(
+        'GET', '/api/outfits/?pagination=keyset&page_size=20&fields=id,name,clothing_items.thumbnail'
+    )),
+    Scenario('outfit-create', 'outfit-list', lambda ctx: Call(
+        'POST', '/api/outfits/', {'name': 'Bộ mới', 'clothing_items': ctx.rng.sample(ctx.account.item_ids, 4)}
+    )),
+    Scenario('outfit-detail', 'outfit-detail', lambda ctx: Call('GET', f'/api/outfits/{ctx.outfit_id()}/')),
+    Scenario('outfit-update', 'outfit-detail',
+             lambda ctx: Call('PATCH', f'/api/outfits/{ctx.outfit_id()}/', {'description': 'Đi làm'})),
+    Scenario('outfit-delete', 'outfit-detail', _delete_outfit),
+    Scenario('outfits-search', 'outfit-search', lambda ctx: Call('GET', '/api/outfits/search/?q=bo')),
+    Scenario('outfits-recommend', 'outfit-recommend', lambda ctx: Call('GET', '/api/outfits/recommend/?count=5')),
+    Scenario('outfit-add-item', 'outfit-add-clothing-item-to-outfit', _membership('add-item', _add_one)),
+    Scenario('outfit-remove-item', 'outfit-remove-clothing-item-from-outfit', _membership('remove-item', _remove_one)),
+    Scenario('outfit-add-items', 'outfit-add-clothing-items-to-outfit', _membership('add-items', _add_many)),
+    Scenario('outfit-remove-items', 'outfit-remove-clothing-items-from-outfit',
+             _membership('remove-items', _remove_many)),
+
+    Scenario('register', 'auth_register', lambda ctx: Call('POST', '/api/auth/register/', {
+        'username': f'{ctx.dataset.prefix}new{ctx.next_id()}', 'password': PASSWORD, 'email': 'bench@example.com',
+    }, auth=False)),
+    Scenario('login', 'auth_login', lambda ctx: Call(
+        'POST', '/api/auth/login/', {'username': ctx.user.username, 'password': PASSWORD}, auth=False
+    )),
+    Scenario('cache-stats', 'cache_stats', lambda ctx: Call('GET', '/api/cache-stats/'), as_admin=True),
+    Scenario('stats', 'wardrobe_stats', lambda ctx: Call('GET', '/api/stats/')),
+    Scenario('sync', 'sync', lambda ctx: Call('GET', '/api/sync/?page_size=200')),
+    Scenario('sync-ndjson', 'sync', lambda ctx: Call('GET', '/api/sync/?format=ndjson')),
+    Scenario('export', 'wardrobe_export', lambda ctx: Call('GET', '/api/export/')),
+    Scenario('export-images', 'wardrobe_export_images', lambda ctx: Call('GET', '/api/export/images/')),
+    Scenario('import', 'wardrobe_import', _import_records),
+    Scenario('import-images', 'wardrobe_import_images', _import_images),
+
+    Scenario('media-thumb', 'media', _media('thumb')),
+    Scenario('media-original', 'media', _media('original')),
+    Scenario('media-range', 'media', _media('original', {'Range': 'bytes=0-4095'})),
+]
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
+
+MIXES = {
+    'browse': {
+        'items-keyset': 20, 'items-compact': 15, 'item-detail': 10, 'outfits-page': 8, 'outfits-expand': 8,
+        'outfit-detail': 6, 'categories': 4, 'items-search': 6, 'outfits-recommend': 3, 'item-similar': 2,
+        'stats': 4, 'media-thumb': 15, 'media-original': 3,
+    },
+    'edit': {
+        'item-create': 10, 'item-upload': 4, 'item-update': 15, 'item-delete': 5, 'items-bulk-create': 2,
+        'items-bulk-update': 2, 'items-bulk-delete': 1, 'outfit-create': 6, 'outfit-update': 6,
+        'outfit-add-item': 8, 'outfit-remove-item': 6, 'outfit-add-items': 3, 'outfit-remove-items': 3,
+        'item-detail': 10, 'outfit-detail': 8,
+    },
+    'sync': {
+        'sync': 30, 'sync-ndjson': 10, 'media-thumb': 30, 'media-range': 10, 'login': 2, 'categories': 5,
+    },
+    'all': {scenario.name: 1 for scenario in SCENARIOS},
+}
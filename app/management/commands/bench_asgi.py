@@ -0,0 +1,84 @@
+import importlib.util
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from app.loadtest.dataset import Scale, build_dataset
+from app.loadtest.report import TOTAL, summarize
+from app.loadtest.runner import HttpTransport, SlowUploads, gunicorn_server, replay, schedule
+from app.loadtest.scenarios import MIXES
+
+DEPLOYMENTS = {'wsgi': False, 'asgi': True}
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh deploy WSGI (gunicorn sync, view DRF) với ASGI (gunicorn + worker uvicorn, "
+        "app/asyncviews.py) trên cùng dữ liệu giả và cùng mix request: request/s và p95 theo "
+        "số request song song, với cùng số worker. --slow-uploads thêm các client upload ảnh "
+        "chậm chạy song song để thấy mỗi process còn phục vụ được bao nhiêu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', choices=sorted(MIXES), default='browse')
+        parser.add_argument('--requests', type=int, default=300, help='Số request được đo mỗi lượt.')
+        parser.add_argument('--warmup', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='Các mức request song song, cách nhau bởi dấu phẩy.')
+        parser.add_argument('--workers', type=int, default=1, help='Số worker (process) cho mỗi deploy.')
+        parser.add_argument('--slow-uploads', type=int, default=0, help='Số client upload chậm chạy song song.')
+        parser.add_argument('--upload-seconds', type=float, default=5.0, help='Thời gian gửi mỗi upload chậm.')
+        parser.add_argument('--only', choices=sorted(DEPLOYMENTS), help='Chỉ đo một deploy.')
+        parser.add_argument('--json', help='Ghi kết quả (JSON) vào file này.')
+        Scale.add_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency phải là các số nguyên cách nhau bởi dấu phẩy.')
+        deployments = [options['only']] if options['only'] else list(DEPLOYMENTS)
+        if 'asgi' in deployments and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('Chưa cài uvicorn (pip install uvicorn), cần cho deploy ASGI.')
+
+        names = schedule(options['mix'], options['warmup'] + options['requests'], options['seed'])
+        results = []
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            # Server là process khác nên dữ liệu giả phải được commit, và xóa khi đo xong
+            dataset = build_dataset(Scale.from_options(options), options['seed'])
+            try:
+                for deployment in deployments:
+                    env = {'MEDIA_ROOT_RENDER_DISK_PATH': media_root, 'ASYNC_VIEWS': str(DEPLOYMENTS[deployment])}
+                    with gunicorn_server(options['workers'], env, asgi=DEPLOYMENTS[deployment]) as url:
+                        for level in levels:
+                            results.append(self.measure(deployment, level, url, dataset, names, options))
+            finally:
+                dataset.delete()
+
+        self.stdout.write(self.format(results))
+        if options['json']:
+            meta = {key: options[key] for key in ('mix', 'requests', 'workers', 'slow_uploads', 'upload_seconds')}
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump({'meta': meta, 'results': results}, output, indent=2, ensure_ascii=False)
+
+    def measure(self, deployment, level, url, dataset, names, options):
+        with SlowUploads(url, dataset, options['slow_uploads'], options['upload_seconds']) as uploads:
+            samples, duration = replay(HttpTransport(url), dataset, names, options['warmup'], options['seed'], level)
+        total = summarize(samples, duration)[TOTAL]
+        return {
+            'deployment': deployment, 'concurrency': level, 'rps': total['rps'], 'p50': total['p50'],
+            'p95': total['p95'], 'errors': total['errors'], 'slow_uploads_completed': uploads.completed,
+        }
+
+    def format(self, results):
+        header = f'{"deploy":<7} {"song song":>9} {"request/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"err":>5} {"upload chậm xong":>17}'
+        lines = [header, '-' * len(header)]
+        for row in results:
+            lines.append(
+                f'{row["deployment"]:<7} {row["concurrency"]:>9} {row["rps"]:>10} {row["p50"]:>9.2f} '
+                f'{row["p95"]:>9.2f} {row["errors"]:>5} {row["slow_uploads_completed"]:>17}'
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,78 @@
+import io
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.benchmarking import rolled_back, timed_call
+from app.models import ClothingItem
+from app.views import ClothingItemViewSet
+
+
+def make_image(index):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (index % 256, (index * 7) % 256, 90)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(f'bench-{index}.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh tạo N món đồ bằng N request POST đơn lẻ với một request POST /bulk/. "
+        "Dữ liệu được tạo trong transaction và rollback sau khi đo; ảnh ghi vào thư mục tạm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500, help='Số món đồ tạo ở mỗi cách.')
+        parser.add_argument('--images', action='store_true', help='Gửi kèm một ảnh nhỏ cho mỗi món đồ (multipart).')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with rolled_back():
+                self.run(options)
+
+    def run(self, options):
+        total, images = options['items'], options['images']
+        factory = APIRequestFactory()
+        create = ClothingItemViewSet.as_view({'post': 'create'})
+        bulk = ClothingItemViewSet.as_view({'post': 'bulk'})
+
+        single_user = User.objects.create_user(username='__bench_bulk_single__')
+        single_ms = single_queries = 0
+        for i in range(total):
+            data = {'name': f'Bench item {i}', 'color': 'blue'}
+            if images:
+                data['image'] = make_image(i)
+            request = factory.post(
+                '/api/clothing-items/', data, format='multipart' if images else 'json', secure=True
+            )
+            force_authenticate(request, user=single_user)
+            response, elapsed, queries = timed_call(create, request)
+            assert response.status_code == 201, response.data
+            single_ms += elapsed
+            single_queries += queries
+
+        bulk_user = User.objects.create_user(username='__bench_bulk_batch__')
+        elements = [{'name': f'Bench item {i}', 'color': 'blue'} for i in range(total)]
+        if images:
+            data = {f'file{i}': make_image(i) for i in range(total)}
+            for i, element in enumerate(elements):
+                element['image'] = f'file{i}'
+            data['items'] = json.dumps(elements)
+            request = factory.post('/api/clothing-items/bulk/', data, format='multipart', secure=True)
+        else:
+            request = factory.post('/api/clothing-items/bulk/', elements, format='json', secure=True)
+        force_authenticate(request, user=bulk_user)
+        response, bulk_ms, bulk_queries = timed_call(bulk, request)
+        assert response.status_code == 201, response.data
+        assert ClothingItem.objects.filter(user=bulk_user).count() == total
+
+        self.stdout.write(f'{total} items{" with images" if images else ""}')
+        self.stdout.write(f'{"mode":>8} {"total ms":>10} {"ms/item":>8} {"queries":>8}')
+        for mode, ms, queries in (('single', single_ms, single_queries), ('bulk', bulk_ms, bulk_queries)):
+            self.stdout.write(f'{mode:>8} {ms:>10.1f} {ms / total:>8.2f} {queries:>8}')
+        self.stdout.write(f'Speedup: {single_ms / bulk_ms:.1f}x')
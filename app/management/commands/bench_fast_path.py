@@ -0,0 +1,74 @@
+import statistics
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.benchmarking import rolled_back, timed_call
+from app.models import ClothingCategory, ClothingItem, Outfit
+from app.views import ClothingItemViewSet, OutfitViewSet
+
+CASES = [
+    ('items', ClothingItemViewSet),
+    ('outfits', OutfitViewSet),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh danh sách đầy đủ dựng bằng serializer DRF với đường đọc nhanh từ values() "
+        "(FAST_READ_PATH). Dữ liệu giả được tạo trong transaction và rollback sau khi đo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outfits', type=int, default=50, help='Số bộ đồ giả.')
+        parser.add_argument('--items-per-outfit', type=int, default=8, help='Số món đồ mỗi bộ đồ.')
+        parser.add_argument('--page-size', type=int, default=100, help='Số dòng mỗi trang.')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi trường hợp (lấy trung vị).')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        user = User.objects.create_user(username='__bench_fast_path__')
+        category = ClothingCategory.objects.create(name='__bench_fast_path__')
+        per_outfit = options['items_per_outfit']
+        items = ClothingItem.objects.bulk_create(
+            ClothingItem(
+                user=user, name=f'Bench item {i}', category=category, color='blue', brand='Brand',
+                notes='Ghi chú ' * 10, image=f'clothing_images/bench/{i:04d}.jpg',
+                renditions={'source': f'clothing_images/bench/{i:04d}.jpg',
+                            'thumb': f'clothing_images/renditions/{i:04d}_thumb.webp'},
+            )
+            for i in range(options['outfits'] * per_outfit)
+        )
+        outfits = Outfit.objects.bulk_create(
+            Outfit(user=user, name=f'Bench outfit {i}') for i in range(options['outfits'])
+        )
+        through = Outfit.clothing_items.through
+        through.objects.bulk_create(
+            through(outfit_id=outfit.pk, clothingitem_id=items[i * per_outfit + j].pk)
+            for i, outfit in enumerate(outfits) for j in range(per_outfit)
+        )
+
+        factory = APIRequestFactory()
+        query = {'page_size': options['page_size'], 'pagination': 'keyset'}
+        self.stdout.write(f'{"case":>16} {"ms":>8} {"rows/s":>10} {"queries":>8} {"bytes":>9}')
+        for name, viewset in CASES:
+            view = viewset.as_view({'get': 'list'})
+            for path, enabled in (('serializer', False), ('fast', True)):
+                timings = []
+                with override_settings(FAST_READ_PATH=enabled):
+                    for _ in range(options['repeat']):
+                        request = factory.get('/api/', query, secure=True)
+                        force_authenticate(request, user=user)
+                        response, elapsed, queries = timed_call(view, request)
+                        timings.append(elapsed)
+                median = statistics.median(timings)
+                rows = len(response.data['results'])
+                self.stdout.write(
+                    f'{name + " " + path:>16} {median:>8.2f} {rows / median * 1000:>10.0f} '
+                    f'{queries:>8} {len(response.content):>9}'
+                )
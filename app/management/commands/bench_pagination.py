@@ -0,0 +1,71 @@
+import statistics
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.benchmarking import rolled_back, timed_call
+from app.models import ClothingItem
+from app.pagination import KeysetPagination
+from app.views import ClothingItemViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh thời gian lấy trang của PageNumberPagination và KeysetPagination "
+        "ở nhiều độ sâu. Dữ liệu giả được tạo trong transaction và rollback sau khi đo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000, help='Số món đồ giả tạo cho user benchmark.')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi trang (lấy trung vị).')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        total = options['items']
+        page_size = api_settings.PAGE_SIZE
+        user = User.objects.create_user(username='__bench_pagination__')
+        now = timezone.now()
+        items = ClothingItem.objects.bulk_create(
+            ClothingItem(user=user, name=f'Bench item {i}') for i in range(total)
+        )
+        # bulk_create gán cùng một last_modified cho mọi dòng, rải lại cho giống dữ liệu thật
+        for i, item in enumerate(items):
+            item.last_modified = now - timedelta(seconds=i)
+        ClothingItem.objects.bulk_update(items, ['last_modified'], batch_size=500)
+
+        ordered = list(ClothingItem.objects.filter(user=user).order_by('-last_modified', '-id'))
+        view = ClothingItemViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        keyset = KeysetPagination('last_modified')
+        last_page = max((total - 1) // page_size + 1, 1)
+        depths = sorted({1, 10, 100, last_page // 2, last_page} & set(range(1, last_page + 1)))
+
+        self.stdout.write(f'{total} items, page_size={page_size}')
+        self.stdout.write(f'{"page":>8} {"page-number ms":>15} {"queries":>8} {"keyset ms":>10} {"queries":>8}')
+        for page in depths:
+            page_params = {'page': page}
+            keyset_params = {'pagination': 'keyset'}
+            if page > 1:
+                keyset_params['cursor'] = keyset.encode_cursor(ordered[(page - 1) * page_size - 1])
+            page_ms, page_queries = self.measure(factory, view, user, page_params, options['repeat'])
+            keyset_ms, keyset_queries = self.measure(factory, view, user, keyset_params, options['repeat'])
+            self.stdout.write(
+                f'{page:>8} {page_ms:>15.2f} {page_queries:>8} {keyset_ms:>10.2f} {keyset_queries:>8}'
+            )
+
+    def measure(self, factory, view, user, params, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            request = factory.get('/api/clothing-items/', params, secure=True)
+            force_authenticate(request, user=user)
+            _, elapsed, queries = timed_call(view, request)
+            timings.append(elapsed)
+        return statistics.median(timings), queries
@@ -0,0 +1,71 @@
+import statistics
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.benchmarking import rolled_back, timed_call
+from app.models import ClothingCategory, ClothingItem, Outfit
+from app.views import ClothingItemViewSet, OutfitViewSet
+
+CASES = [
+    ('items full', ClothingItemViewSet, {}),
+    ('items compact', ClothingItemViewSet, {'fields': 'id,name,thumbnail'}),
+    ('outfits full', OutfitViewSet, {}),
+    ('outfits ids', OutfitViewSet, {'fields': 'id,name,clothing_items'}),
+    ('outfits grid', OutfitViewSet, {'fields': 'id,name,clothing_items.id,clothing_items.thumbnail'}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh kích thước payload và thời gian của danh sách đầy đủ với bản gọn "
+        "(?fields=/?expand=). Dữ liệu giả được tạo trong transaction và rollback sau khi đo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outfits', type=int, default=50, help='Số bộ đồ giả.')
+        parser.add_argument('--items-per-outfit', type=int, default=8, help='Số món đồ mỗi bộ đồ.')
+        parser.add_argument('--page-size', type=int, default=50, help='Số dòng mỗi trang.')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi trường hợp (lấy trung vị).')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        user = User.objects.create_user(username='__bench_sparse__')
+        category = ClothingCategory.objects.create(name='__bench_sparse__')
+        per_outfit = options['items_per_outfit']
+        items = ClothingItem.objects.bulk_create(
+            ClothingItem(
+                user=user, name=f'Bench item {i}', category=category, color='blue', brand='Brand',
+                notes='Ghi chú ' * 10, image=f'clothing_images/bench/{i:04d}.jpg',
+                renditions={'source': f'clothing_images/bench/{i:04d}.jpg',
+                            'thumb': f'clothing_images/renditions/{i:04d}_thumb.webp'},
+            )
+            for i in range(options['outfits'] * per_outfit)
+        )
+        outfits = Outfit.objects.bulk_create(
+            Outfit(user=user, name=f'Bench outfit {i}') for i in range(options['outfits'])
+        )
+        through = Outfit.clothing_items.through
+        through.objects.bulk_create(
+            through(outfit_id=outfit.pk, clothingitem_id=items[i * per_outfit + j].pk)
+            for i, outfit in enumerate(outfits) for j in range(per_outfit)
+        )
+
+        factory = APIRequestFactory()
+        self.stdout.write(f'{"case":>14} {"ms":>8} {"queries":>8} {"bytes":>9}')
+        for name, viewset, params in CASES:
+            view = viewset.as_view({'get': 'list'})
+            query = {'page_size': options['page_size'], 'pagination': 'keyset', **params}
+            timings = []
+            for _ in range(options['repeat']):
+                request = factory.get('/api/', query, secure=True)
+                force_authenticate(request, user=user)
+                response, elapsed, queries = timed_call(view, request)
+                timings.append(elapsed)
+            self.stdout.write(
+                f'{name:>14} {statistics.median(timings):>8.2f} {queries:>8} {len(response.content):>9}'
+            )
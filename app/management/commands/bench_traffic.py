@@ -0,0 +1,85 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from app.benchmarking import rolled_back
+from app.loadtest.dataset import Scale, build_dataset
+from app.loadtest.report import LATENCY_RATIO, compare, format_table, load_baseline, save_baseline, summarize
+from app.loadtest.runner import ClientTransport, HttpTransport, gunicorn_server, replay, schedule
+from app.loadtest.scenarios import MIXES
+
+
+class Command(BaseCommand):
+    help = (
+        "Tạo dữ liệu giả rồi phát lại một mix request trên các route của API, báo p50/p95/p99, "
+        "số query và số byte mỗi kịch bản. Mặc định chạy qua Django test client trong transaction "
+        "được rollback; --gunicorn chạy một gunicorn local (dữ liệu giả được commit rồi xóa)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', choices=sorted(MIXES), default='browse')
+        parser.add_argument('--requests', type=int, default=500, help='Số request được đo.')
+        parser.add_argument('--warmup', type=int, default=50, help='Số request chạy trước, không tính.')
+        parser.add_argument('--seed', type=int, default=0)
+        Scale.add_arguments(parser)
+        parser.add_argument('--gunicorn', action='store_true', help='Đo qua HTTP tới gunicorn chạy local.')
+        parser.add_argument('--url', help='Đo qua HTTP tới server có sẵn (cùng database) thay vì gunicorn tự chạy.')
+        parser.add_argument('--workers', type=int, default=2, help='Số worker gunicorn.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Số request song song (chỉ qua HTTP).')
+        parser.add_argument('--json', help='Ghi kết quả (JSON) vào file này.')
+        parser.add_argument('--save-baseline', help='Lưu kết quả làm baseline vào file này.')
+        parser.add_argument('--baseline', help='So với baseline này, lỗi nếu có chỉ số xấu đi.')
+        parser.add_argument('--latency-ratio', type=float, default=LATENCY_RATIO,
+                            help='p95 chậm hơn bao nhiêu lần baseline thì coi là xấu đi.')
+
+    def handle(self, *args, **options):
+        scale = Scale.from_options(options)
+        names = schedule(options['mix'], options['warmup'] + options['requests'], options['seed'])
+        http = options['gunicorn'] or options['url']
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            if http:
+                samples, duration = self.run_http(options, scale, names, media_root)
+            else:
+                with rolled_back():
+                    dataset = build_dataset(scale, options['seed'])
+                    samples, duration = replay(ClientTransport(), dataset, names, options['warmup'], options['seed'])
+
+        summary = summarize(samples, duration)
+        self.stdout.write(format_table(summary))
+        meta = {
+            'mix': options['mix'], 'requests': options['requests'], 'seed': options['seed'],
+            'scale': scale.as_dict(), 'transport': 'http' if http else 'client',
+        }
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump({'meta': meta, 'scenarios': summary}, output, indent=2, ensure_ascii=False)
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], summary, meta)
+            self.stdout.write(f'Đã lưu baseline: {options["save_baseline"]}')
+        if options['baseline']:
+            self.check_baseline(options, summary, meta)
+
+    def run_http(self, options, scale, names, media_root):
+        # Server là process khác nên dữ liệu giả phải được commit, và xóa khi đo xong
+        dataset = build_dataset(scale, options['seed'])
+        try:
+            if options['url']:
+                transport = HttpTransport(options['url'])
+                return replay(transport, dataset, names, options['warmup'], options['seed'], options['concurrency'])
+            env = {'MEDIA_ROOT_RENDER_DISK_PATH': media_root}
+            with gunicorn_server(options['workers'], env) as url:
+                transport = HttpTransport(url)
+                return replay(transport, dataset, names, options['warmup'], options['seed'], options['concurrency'])
+        finally:
+            dataset.delete()
+
+    def check_baseline(self, options, summary, meta):
+        baseline = load_baseline(options['baseline'])
+        if baseline['meta'] != meta:
+            self.stderr.write(f'Cảnh báo: baseline được đo với cấu hình khác: {baseline["meta"]}')
+        regressions = compare(summary, baseline, options['latency_ratio'])
+        if regressions:
+            raise CommandError('Chỉ số xấu đi so với baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Không có chỉ số nào xấu đi so với baseline.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app.models import ClothingItem
+from app.similarity import update_signature
+
+
+class Command(BaseCommand):
+    help = "Tính dấu vân tay ảnh (pHash, dHash, histogram màu) cho các món đồ có ảnh nhưng chưa có hoặc đã cũ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        items = ClothingItem.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        done = failed = 0
+        for item in items.only('pk', 'user', 'image').iterator(chunk_size=options['chunk_size']):
+            try:
+                update_signature(item)
+            except Exception as exc:  # Ảnh hỏng/mất file không được làm dừng cả lệnh
+                failed += 1
+                self.stderr.write(f'#{item.pk} {item.image.name}: {exc}')
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Xong {done} ảnh, lỗi {failed} ảnh.'))
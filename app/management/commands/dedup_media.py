@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.blobs import rebuild_ref_counts
+from app.images import update_item_fields
+from app.models import ClothingItem
+from app.storage import get_image_storage, hash_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Chuyển ảnh cũ của ClothingItem sang tên theo hash nội dung, gộp các bản trùng "
+        "thành một file, tính lại số tham chiếu MediaBlob và xóa các bản sao không còn dùng."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ in kế hoạch, không thay đổi gì.')
+        parser.add_argument('--keep-old', action='store_true', help='Không xóa file cũ sau khi đã chuyển.')
+
+    def handle(self, *args, **options):
+        storage = get_image_storage()
+        dry_run = options['dry_run']
+        names = (
+            ClothingItem.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by().values_list('image', flat=True).distinct()
+        )
+
+        moves = {}
+        groups = defaultdict(list)
+        for name in names.iterator():
+            if not storage.exists(name):
+                self.stderr.write(f'Thiếu file: {name}')
+                continue
+            with storage.open(name, 'rb') as f:
+                digest = hash_file(f)
+            target = storage.content_name(name, digest)
+            groups[target].append(name)
+            if target != name:
+                moves[name] = target
+
+        duplicates = sum(len(sources) - 1 for sources in groups.values())
+        self.stdout.write(f'{len(groups)} file khác nhau, {duplicates} bản trùng, {len(moves)} file cần đổi tên.')
+        for old, new in sorted(moves.items()):
+            self.stdout.write(f'  {old} -> {new}')
+        if dry_run:
+            return
+
+        for old, new in moves.items():
+            if not storage.exists(new):
+                with storage.open(old, 'rb') as f:
+                    saved = storage.save(new, f)
+                assert saved == new, (saved, new)
+            with transaction.atomic():
+                for item in ClothingItem.objects.filter(image=old).only('pk', 'image', 'renditions'):
+                    renditions = dict(item.renditions)
+                    if renditions.get('source') == old:
+                        renditions['source'] = new
+                    # update() để không chạy signal đếm tham chiếu (sẽ tính lại toàn bộ ở dưới)
+                    update_item_fields(item, image=new, renditions=renditions)
+
+        rebuild_ref_counts()
+
+        if not options['keep_old']:
+            for old in moves:
+                storage.delete(old)
+        self.stdout.write(self.style.SUCCESS(f'Đã gộp {duplicates} bản trùng.'))
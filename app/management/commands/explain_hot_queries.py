@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from app.models import ClothingItem, Outfit
+from app.search import ItemSearch
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy EXPLAIN cho các query nóng của API (SQLite hoặc PostgreSQL) "
+        "để kiểm tra index còn được dùng sau khi đổi schema."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username dùng để dựng query (mặc định: user đầu tiên).')
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Dùng EXPLAIN ANALYZE (chỉ PostgreSQL, query sẽ thực sự chạy).',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--analyze chỉ hỗ trợ PostgreSQL.')
+            explain_options = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f'Database: {connection.vendor}, user: {user.username} (id={user.pk})')
+        for name, queryset in self.hot_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {name}'))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Không tìm thấy user "{username}".')
+        user = User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError('Database chưa có user nào.')
+        return user
+
+    def hot_queries(self, user):
+        """
+        Các query tương ứng với những đường đọc chính của API và admin.
+        """
+        now = timezone.now()
+        items = ClothingItem.objects.filter(user=user)
+        outfits = Outfit.objects.filter(user=user)
+        item_id = items.values_list('pk', flat=True).first() or 0
+        return [
+            ('clothing-items list (page-number)', items.select_related('user')[:10]),
+            ('clothing-items count', items.values('pk')),
+            ('clothing-items keyset page', items.filter(last_modified__lte=now).order_by('-last_modified', '-id')[:11]),
+            ('clothing-items by date_added', items.order_by('-date_added')[:10]),
+            ('outfits list (page-number)', outfits.select_related('user')[:10]),
+            ('outfits keyset page', outfits.filter(updated_at__lte=now).order_by('-updated_at', '-id')[:11]),
+            ('outfit items prefetch', ClothingItem.objects.filter(outfits__in=outfits.values('pk')[:10])),
+            ('outfits using an item', Outfit.objects.filter(clothing_items=item_id).values('pk')),
+            ('clothing-items search', ItemSearch(user, 'ao').apply(items)[:10]),
+            ('admin brand filter', ClothingItem.objects.values('brand').distinct().order_by('brand')),
+            ('admin color filter', ClothingItem.objects.values('color').distinct().order_by('color')),
+        ]
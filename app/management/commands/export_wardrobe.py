@@ -0,0 +1,34 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app.transfer import export_images, export_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Xuất tủ đồ của một user ra NDJSON (món đồ, bộ đồ, thành viên bộ đồ) và tar ảnh, "
+        "đọc DB theo từng chunk nên không giới hạn kích thước tủ đồ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', help='File NDJSON (mặc định: stdout).')
+        parser.add_argument('--images', help='Ghi thêm tar các file ảnh vào đường dẫn này.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Số dòng đọc mỗi lượt.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Không có user {options['username']!r}.")
+        records = export_records(user, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(records)
+        else:
+            sys.stdout.writelines(records)
+        if options['images']:
+            with open(options['images'], 'wb') as output:
+                output.writelines(export_images(user))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from app.images import update_renditions
+from app.models import ClothingItem
+
+
+class Command(BaseCommand):
+    help = "Tạo rendition (thumb, medium) cho các món đồ đã có ảnh nhưng chưa có bản thu nhỏ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Tạo lại cả những ảnh đã có rendition.')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        items = ClothingItem.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        done = failed = 0
+        for item in items.iterator(chunk_size=options['chunk_size']):
+            try:
+                update_renditions(item, force=options['force'])
+            except Exception as exc:  # Ảnh hỏng/mất file không được làm dừng cả lệnh
+                failed += 1
+                self.stderr.write(f'#{item.pk} {item.image.name}: {exc}')
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Xong {done} ảnh, lỗi {failed} ảnh.'))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from app.transfer import import_images, import_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Nạp bản xuất của `export_wardrobe` vào tủ đồ của một user (tạo mới, không ghi đè). "
+        "Ảnh (--images) được nạp trước để các món đồ trỏ được tới."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='File NDJSON.')
+        parser.add_argument('--images', help='Tar các file ảnh.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Số dòng ghi mỗi lượt.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Không có user {options['username']!r}.")
+        try:
+            if options['images']:
+                with open(options['images'], 'rb') as archive:
+                    count = import_images(archive)
+                self.stdout.write(f'Đã nạp {count} file ảnh.')
+            with open(options['path'], 'rb') as lines:
+                stats = import_records(user, lines, options['chunk_size'])
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+        summary = ', '.join(f'{key}: {value}' for key, value in stats.items())
+        self.stdout.write(self.style.SUCCESS(f'Xong ({summary}).'))
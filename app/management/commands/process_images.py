@@ -0,0 +1,79 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# Module này được process con (spawn) import lại trước khi Django được setup,
+# nên không import models/app.tasks ở mức module.
+
+
+def _init_worker():
+    django.setup()
+
+
+def _run_job(job_id):
+    from app.tasks import run_image_job
+    return run_image_job(job_id)
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker xử lý hàng đợi ảnh (ImageJob): kiểm tra ảnh, tạo rendition và cập nhật "
+        "image_status của món đồ. Chạy song song bằng process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Số giây chờ khi hàng đợi trống.')
+        parser.add_argument('--stale-after', type=int, default=600, help='Số giây trước khi job "running" bị coi là chết.')
+        parser.add_argument('--once', action='store_true', help='Xử lý hết hàng đợi hiện tại rồi thoát.')
+        parser.add_argument('--sync', action='store_true', help='Chạy trong process hiện tại, không dùng pool.')
+
+    def handle(self, *args, **options):
+        from app.tasks import claim_jobs, process_pending_jobs, requeue_stale_jobs
+
+        stale_after = timedelta(seconds=options['stale_after'])
+        requeued = requeue_stale_jobs(stale_after)
+        if requeued:
+            self.stdout.write(f'Đưa lại {requeued} job bị treo vào hàng đợi.')
+
+        if options['sync']:
+            while True:
+                statuses = process_pending_jobs()
+                self.report(statuses)
+                if not statuses:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+
+        processes = max(options['processes'], 1)
+        # Không để process con thừa hưởng kết nối DB đang mở của process cha
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker) as pool:
+            while True:
+                job_ids = claim_jobs(processes * 2)
+                if not job_ids:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                futures = [pool.submit(_run_job, pk) for pk in job_ids]
+                wait(futures)
+                self.report([self.result(future) for future in futures])
+
+    def result(self, future):
+        try:
+            return future.result()
+        except Exception as exc:  # Lỗi ngoài dự kiến trong process con không được làm dừng worker
+            self.stderr.write(repr(exc))
+            return 'error'
+
+    def report(self, statuses):
+        if statuses:
+            summary = ', '.join(f'{status}={statuses.count(status)}' for status in sorted(set(map(str, statuses))))
+            self.stdout.write(f'Đã xử lý {len(statuses)} job ({summary})')
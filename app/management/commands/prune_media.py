@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app.blobs import prune_unreferenced
+
+
+class Command(BaseCommand):
+    help = (
+        "Xóa các file ảnh (MediaBlob) không còn món đồ nào dùng, ví dụ ảnh import chưa được "
+        "món đồ nào trỏ tới (chạy định kỳ, ví dụ cron mỗi ngày)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Chỉ xóa blob tạo cách đây hơn số giờ này.')
+
+    def handle(self, *args, **options):
+        deleted = prune_unreferenced(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} file ảnh không còn được dùng.'))
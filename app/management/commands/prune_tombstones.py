@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Tombstone
+from app.sync import sync_settings
+
+
+class Command(BaseCommand):
+    help = "Xóa các Tombstone cũ hơn SYNC['TOMBSTONE_RETENTION_DAYS'] ngày (chạy định kỳ, ví dụ cron mỗi ngày)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Ghi đè số ngày giữ lại trong settings.')
+
+    def handle(self, *args, **options):
+        days = options['days'] or sync_settings()['TOMBSTONE_RETENTION_DAYS']
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} tombstone cũ hơn {days} ngày.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.recommend import rebuild_cooccurrence
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại thống kê cặp món đồ mặc cùng nhau (ItemCooccurrence) từ các bộ đồ, "
+        "dùng khi thống kê bị lệch, ví dụ sau khi sửa bảng trung gian bằng SQL trực tiếp."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Số dòng bảng trung gian đọc mỗi lượt.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_cooccurrence(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Đã ghi {total} cặp món đồ.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Dựng lại chỉ mục tìm kiếm (SearchDocument và bảng FTS5 trên SQLite) từ món đồ/bộ đồ, "
+        "dùng khi chỉ mục bị lệch, ví dụ sau khi sửa dữ liệu bằng SQL trực tiếp."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Số dòng đọc/ghi mỗi lượt.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_index(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Đã đánh chỉ mục {total} món đồ/bộ đồ.'))
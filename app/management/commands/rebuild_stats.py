@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại thống kê tủ đồ (WardrobeStat) và số món đồ của bộ đồ (Outfit.item_count), "
+        "dùng khi số đếm bị lệch, ví dụ sau khi sửa bảng bằng SQL trực tiếp hoặc queryset.update()."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats_fixed, outfits_fixed = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã sửa {stats_fixed} dòng thống kê và item_count của {outfits_fixed} bộ đồ.'
+        ))
@@ -0,0 +1,225 @@
+"""
+Phục vụ file ảnh (MEDIA_URL) khi chạy production, chỉ cho chủ món đồ (hoặc staff) xem.
+
+- Ảnh gốc và rendition đặt tên theo hash nội dung (app/storage.py, app/images.py) không bao
+  giờ đổi nội dung: ETag chính là hash, Cache-Control `immutable` một năm. File tên cũ
+  dùng ETag theo mtime/kích thước và client phải hỏi lại (`no-cache`).
+- If-None-Match/If-Modified-Since -> 304 mà không mở file.
+- Range một đoạn (`bytes=a-b`, `bytes=a-`, `bytes=-n`) -> 206; nhiều đoạn thì trả cả file.
+- MEDIA_SERVING['OFFLOAD'] = 'x-accel-redirect' (nginx) hoặc 'x-sendfile' (Apache/lighttpd):
+  Django chỉ kiểm tra quyền rồi để web server gửi file (kể cả Range). Không offload thì
+  FileResponse gửi file; gunicorn dùng sendfile() (zero-copy) cho response cả file.
+- Dưới ASGI, Django đọc hết iterator sync của FileResponse vào bộ nhớ rồi mới gửi;
+  stream_file_async() thay bằng iterator async đọc từng block trên thread pool.
+
+Quyết định cho phép (user, file) được cache theo phiên bản dữ liệu của user như response
+cache (app/cache.py), nên xóa/đổi ảnh món đồ là mất quyền ngay.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from .cache import cache_settings, get_cache, get_version, user_version_key
+from .images import RENDITION_DIR, RENDITION_SIZES
+from .models import ClothingItem
+
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{64})\.\w+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+BLOCK_SIZE = 64 * 1024
+
+
+def media_settings():
+    options = {'OFFLOAD': None, 'ACCEL_REDIRECT_PREFIX': '/protected-media/', 'MAX_AGE': 0}
+    options.update(getattr(settings, 'MEDIA_SERVING', {}))
+    return options
+
+
+# --- Quyền truy cập ------------------------------------------------------------------------
+
+def _owns_file(user, name):
+    items = ClothingItem.objects.filter(user=user)
+    if name.startswith(RENDITION_DIR):
+        query = Q()
+        for size_name in RENDITION_SIZES:
+            query |= Q(**{f'renditions__{size_name}': name})
+        return items.filter(query).exists()
+    return items.filter(image=name).exists()
+
+
+def can_access(user, name):
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    options = cache_settings()
+    if not options['ENABLED']:
+        return _owns_file(user, name)
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    key = f'media:{user.pk}:{get_version(user_version_key(user.pk))}:{digest}'
+    cache = get_cache()
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = _owns_file(user, name)
+        cache.set(key, allowed, options['TIMEOUT'])
+    return allowed
+
+
+# --- Response ------------------------------------------------------------------------------
+
+def validators(name, stat):
+    """
+    (ETag, Last-Modified, Cache-Control) của file.
+    """
+    match = HASHED_NAME.search(name)
+    last_modified = int(stat.st_mtime)
+    if match:
+        return quote_etag(match.group(1)), last_modified, f'private, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    etag = quote_etag(f'{int(stat.st_mtime_ns):x}-{stat.st_size:x}')
+    max_age = media_settings()['MAX_AGE']
+    return etag, last_modified, f'private, max-age={max_age}' if max_age else 'private, no-cache'
+
+
+def parse_range(header, size):
+    """
+    (start, end) (end tính cả) của header Range một đoạn; None nếu không có/không dùng được
+    (nhiều đoạn, sai cú pháp) -> trả cả file. ValueError nếu đoạn nằm ngoài file (416).
+    """
+    match = RANGE.match(header.replace(' ', '')) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:  # bytes=-n: n byte cuối
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        if start >= size:
+            raise ValueError(header)
+        return None
+    return start, end
+
+
+class FileRange:
+    """
+    Đọc tối đa `length` byte từ vị trí hiện tại của file (FileResponse đọc tới khi hết).
+    Không có fileno() nên server không dùng sendfile() cho cả file.
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return if_range == http_date(last_modified)
+
+
+def serve_file(request, name):
+    """
+    Response cho file `name` (đường dẫn tương đối trong MEDIA_ROOT). Quyền truy cập
+    phải được kiểm tra trước.
+    """
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+
+    etag, last_modified, cache_control = validators(name, stat)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, name, path, stat.st_size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _file_response(request, name, path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    options = media_settings()
+    offload = (options['OFFLOAD'] or '').lower()
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = options['ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + name
+        else:
+            response['X-Sendfile'] = path
+        return response
+
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is not None and not _range_applies(request, etag, last_modified):
+        byte_range = None
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(open(path, 'rb'), start, length), content_type=content_type)
+        response.status_code = status.HTTP_206_PARTIAL_CONTENT
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+async def _read_blocks(file, block_size):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while True:
+        block = await read(block_size)
+        if not block:
+            break
+        yield block
+
+
+def stream_file_async(response):
+    """
+    Cho FileResponse (kể cả FileRange) stream bằng iterator async dưới ASGI: mỗi block được
+    đọc trên thread pool, không chặn event loop và không giữ cả file trong bộ nhớ.
+    File vẫn được đóng khi response đóng. Response khác được trả lại nguyên vẹn.
+    """
+    if isinstance(response, FileResponse) and response.file_to_stream is not None and not response.is_async:
+        response.streaming_content = _read_blocks(response.file_to_stream, response.block_size)
+    return response
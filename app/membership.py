@@ -0,0 +1,63 @@
+"""
+Thêm/bớt món đồ trong bộ đồ theo tập ID: kiểm tra quyền sở hữu bằng một query,
+rồi để add()/remove()/set() của ManyToManyField ghi phần chênh lệch trên bảng trung gian
+(vẫn gửi m2m_changed nên updated_at và cache được cập nhật như cũ).
+"""
+from .models import ClothingItem, Outfit
+
+OutfitItems = Outfit.clothing_items.through
+
+
+def unique_ids(ids):
+    return list(dict.fromkeys(ids))
+
+
+def split_owned_item_ids(user, ids):
+    """
+    Tách `ids` thành (ID món đồ thuộc user, ID không tồn tại hoặc của người khác) trong một query.
+    """
+    ids = unique_ids(ids)
+    owned = set(ClothingItem.objects.filter(user=user, pk__in=ids).values_list('pk', flat=True))
+    return [pk for pk in ids if pk in owned], [pk for pk in ids if pk not in owned]
+
+
+def member_item_ids(outfit, ids=None):
+    """
+    ID các món đồ đang nằm trong bộ đồ (giới hạn trong `ids` nếu có), đọc thẳng bảng trung gian.
+    """
+    rows = OutfitItems.objects.filter(outfit_id=outfit.pk)
+    if ids is not None:
+        rows = rows.filter(clothingitem_id__in=ids)
+    return set(rows.values_list('clothingitem_id', flat=True))
+
+
+def add_outfit_items(outfit, ids):
+    """
+    Thêm các món đồ chưa có trong bộ đồ, trả về tập ID thực sự được thêm.
+    """
+    added = set(ids) - member_item_ids(outfit, ids)
+    if added:
+        outfit.clothing_items.add(*added)
+    return added
+
+
+def remove_outfit_items(outfit, ids):
+    """
+    Bỏ các món đồ đang có trong bộ đồ, trả về tập ID thực sự bị bỏ.
+    """
+    removed = member_item_ids(outfit, ids)
+    if removed:
+        outfit.clothing_items.remove(*removed)
+    return removed
+
+
+def set_outfit_items(outfit, ids):
+    """
+    Thay toàn bộ danh sách món đồ: chỉ xóa/thêm phần khác nhau, không gửi signal nếu không đổi gì.
+    """
+    current = member_item_ids(outfit)
+    removed, added = current - set(ids), set(ids) - current
+    if removed:
+        outfit.clothing_items.remove(*removed)
+    if added:
+        outfit.clothing_items.add(*added)
@@ -0,0 +1,78 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import timing
+from .media import stream_file_async
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware chạy được cả sync lẫn async.
+
+    Bản gốc chỉ có sync: dưới ASGI, Django phải chuyển mọi request (không chỉ file tĩnh)
+    qua sync_to_async(thread_sensitive=True), tức là một thread duy nhất cho cả process,
+    và gọi view async qua async_to_sync. Bản này phục vụ file tĩnh trên thread pool rồi
+    để request khác đi thẳng vào view async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return stream_file_async(response)
+
+
+class TimingMiddleware:
+    """
+    Đo thời gian, số query, số byte của các request /api/ (app/timing.py): header
+    Server-Timing, histogram cho /metrics và log request chậm. Đặt đầu MIDDLEWARE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not timing.should_time(request):
+            return self.get_response(request)
+        timings, token = timing.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.end_request(token)
+        timing.finish_request(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        if not timing.should_time(request):
+            return await self.get_response(request)
+        timings, token = timing.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.end_request(token)
+        timing.finish_request(request, response, timings)
+        return response
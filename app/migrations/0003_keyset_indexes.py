@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_remove_clothingitem_image_url_clothingitem_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clothingitem',
+            index=models.Index(fields=['user', '-last_modified', '-id'], name='item_user_lastmod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outfit',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='outfit_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clothingitem',
+            index=models.Index(fields=['user', '-date_added'], name='item_user_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingitem',
+            index=models.Index(fields=['brand'], name='item_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingitem',
+            index=models.Index(fields=['color'], name='item_color_idx'),
+        ),
+        # Bảng trung gian của Outfit.clothing_items được Django tự tạo nên không khai báo
+        # index qua Meta được. Index (clothingitem_id, outfit_id) giúp tra ngược
+        # "món đồ này nằm trong những bộ đồ nào" chỉ bằng index, không cần đọc bảng.
+        migrations.RunSQL(
+            sql='CREATE INDEX outfit_items_item_outfit_idx ON app_outfit_clothing_items (clothingitem_id, outfit_id)',
+            reverse_sql='DROP INDEX outfit_items_item_outfit_idx',
+        ),
+    ]
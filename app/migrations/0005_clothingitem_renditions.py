@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingitem',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Các bản thu nhỏ'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_clothingitem_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingitem',
+            name='image_status',
+            field=models.CharField(choices=[('processing', 'Đang xử lý'), ('ready', 'Sẵn sàng'), ('failed', 'Lỗi')], default='ready', editable=False, max_length=20, verbose_name='Trạng thái ảnh'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Chờ xử lý'), ('running', 'Đang chạy'), ('done', 'Xong'), ('failed', 'Lỗi')], default='pending', max_length=20, verbose_name='Trạng thái')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Số lần thử')),
+                ('error', models.TextField(blank=True, verbose_name='Lỗi')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Lần cập nhật cuối')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='app.clothingitem', verbose_name='Món đồ')),
+            ],
+            options={
+                'verbose_name': 'Job xử lý ảnh',
+                'verbose_name_plural': 'Các job xử lý ảnh',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='imagejob_status_created_idx')],
+            },
+        ),
+    ]
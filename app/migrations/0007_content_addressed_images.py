@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:01
+
+import app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_image_processing_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Đường dẫn file')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Số tham chiếu')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+            ],
+            options={
+                'verbose_name': 'File ảnh',
+                'verbose_name_plural': 'Các file ảnh',
+            },
+        ),
+        migrations.AlterField(
+            model_name='clothingitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.get_image_storage, upload_to='clothing_images/', verbose_name='Ảnh'),
+        ),
+    ]
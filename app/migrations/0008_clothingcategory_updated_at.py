@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingcategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Lần cập nhật cuối'),
+            preserve_default=False,
+        ),
+    ]
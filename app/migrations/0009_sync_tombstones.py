@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0008_clothingcategory_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('category', 'Loại quần áo'), ('clothing_item', 'Món đồ'), ('outfit', 'Bộ đồ')], max_length=20, verbose_name='Loại dữ liệu')),
+                ('object_id', models.BigIntegerField(verbose_name='ID')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời điểm xóa')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Bản ghi đã xóa',
+                'verbose_name_plural': 'Các bản ghi đã xóa',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import unicodedata
+
+
+# Bảng FTS5 contentless: chỉ giữ index, trigger ghi vào đó mỗi khi app_searchdocument đổi.
+# Xóa trên bảng contentless phải gửi lại đúng giá trị cũ nên trigger dùng OLD.*.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE app_searchdocument_fts USING fts5(body, scope, content='')",
+    """CREATE TRIGGER app_searchdocument_fts_ai AFTER INSERT ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(rowid, body, scope)
+        VALUES (new.id, new.body, 'u' || new.user_id || ' ' || new.kind);
+    END""",
+    """CREATE TRIGGER app_searchdocument_fts_ad AFTER DELETE ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(app_searchdocument_fts, rowid, body, scope)
+        VALUES ('delete', old.id, old.body, 'u' || old.user_id || ' ' || old.kind);
+    END""",
+    """CREATE TRIGGER app_searchdocument_fts_au AFTER UPDATE ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(app_searchdocument_fts, rowid, body, scope)
+        VALUES ('delete', old.id, old.body, 'u' || old.user_id || ' ' || old.kind);
+        INSERT INTO app_searchdocument_fts(rowid, body, scope)
+        VALUES (new.id, new.body, 'u' || new.user_id || ' ' || new.kind);
+    END""",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS app_searchdocument_fts_au',
+    'DROP TRIGGER IF EXISTS app_searchdocument_fts_ad',
+    'DROP TRIGGER IF EXISTS app_searchdocument_fts_ai',
+    'DROP TABLE IF EXISTS app_searchdocument_fts',
+]
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX searchdoc_body_gin_idx ON app_searchdocument USING gin (to_tsvector('simple'::regconfig, body))",
+]
+POSTGRESQL_REVERSE = ['DROP INDEX IF EXISTS searchdoc_body_gin_idx']
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def normalize(text):
+    # Bản sao của app.search.normalize tại thời điểm viết migration
+    text = unicodedata.normalize('NFKD', (text or '').casefold().replace('đ', 'd'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def build_documents(apps, schema_editor):
+    ClothingItem = apps.get_model('app', 'ClothingItem')
+    Outfit = apps.get_model('app', 'Outfit')
+    SearchDocument = apps.get_model('app', 'SearchDocument')
+    sources = [
+        (ClothingItem, 'item', ('name', 'brand', 'color', 'notes')),
+        (Outfit, 'outfit', ('name', 'description')),
+    ]
+    for model, kind, fields in sources:
+        rows = model.objects.values_list('pk', 'user_id', *fields).iterator(chunk_size=2000)
+        SearchDocument.objects.bulk_create(
+            (
+                SearchDocument(user_id=user_id, kind=kind, object_id=pk, body=normalize(' '.join(text)))
+                for pk, user_id, *text in rows
+            ),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0009_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('item', 'Món đồ'), ('outfit', 'Bộ đồ')], max_length=10, verbose_name='Loại dữ liệu')),
+                ('object_id', models.BigIntegerField(verbose_name='ID')),
+                ('body', models.TextField(blank=True, verbose_name='Nội dung')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Chỉ mục tìm kiếm',
+                'verbose_name_plural': 'Các chỉ mục tìm kiếm',
+                'indexes': [models.Index(fields=['user', 'kind'], name='searchdoc_user_kind_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdoc_kind_object_uniq'),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_vendor_sql({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+from itertools import groupby
+
+
+def build_cooccurrence(apps, schema_editor):
+    # Như app.recommend.rebuild_cooccurrence, với model lịch sử
+    Outfit = apps.get_model('app', 'Outfit')
+    ItemCooccurrence = apps.get_model('app', 'ItemCooccurrence')
+    rows = (
+        Outfit.clothing_items.through.objects.order_by('outfit_id')
+        .values_list('outfit_id', 'outfit__user_id', 'clothingitem_id')
+        .iterator(chunk_size=2000)
+    )
+    counts, owners = Counter(), {}
+    for (_, user_id), group in groupby(rows, key=lambda row: row[:2]):
+        members = sorted({row[2] for row in group})
+        for index, item_a in enumerate(members):
+            for item_b in members[index:]:
+                counts[item_a, item_b] += 1
+                owners[item_a, item_b] = user_id
+    ItemCooccurrence.objects.bulk_create(
+        (ItemCooccurrence(user_id=owners[key], item_a_id=key[0], item_b_id=key[1], count=count)
+         for key, count in counts.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0010_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Số bộ đồ')),
+                ('item_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.clothingitem', verbose_name='Món đồ A')),
+                ('item_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.clothingitem', verbose_name='Món đồ B')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Cặp món đồ mặc cùng nhau',
+                'verbose_name_plural': 'Các cặp món đồ mặc cùng nhau',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='itemcooccurrence',
+            constraint=models.UniqueConstraint(fields=('item_a', 'item_b'), name='cooccurrence_pair_uniq'),
+        ),
+        migrations.RunPython(build_cooccurrence, migrations.RunPython.noop),
+    ]
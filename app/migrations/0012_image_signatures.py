@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0011_item_cooccurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageSignature',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='image_signature', serialize=False, to='app.clothingitem', verbose_name='Món đồ')),
+                ('source', models.CharField(max_length=255, verbose_name='Ảnh gốc')),
+                ('phash', models.BigIntegerField(verbose_name='pHash')),
+                ('dhash', models.BigIntegerField(verbose_name='dHash')),
+                ('histogram', models.BinaryField(max_length=64, verbose_name='Histogram màu')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Dấu vân tay ảnh',
+                'verbose_name_plural': 'Các dấu vân tay ảnh',
+            },
+        ),
+    ]
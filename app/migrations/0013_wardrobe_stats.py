@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+
+
+def build_stats(apps, schema_editor):
+    # Như app.stats.rebuild_stats, với model lịch sử
+    ClothingItem = apps.get_model('app', 'ClothingItem')
+    Outfit = apps.get_model('app', 'Outfit')
+    WardrobeStat = apps.get_model('app', 'WardrobeStat')
+    counts = Counter()
+    for dimension, column in (('category', 'category_id'), ('color', 'color'), ('brand', 'brand')):
+        rows = ClothingItem.objects.order_by().values_list('user_id', column).annotate(count=models.Count('id'))
+        for user_id, value, count in rows:
+            counts[user_id, dimension, '' if value is None else str(value)] += count
+    WardrobeStat.objects.bulk_create(
+        (WardrobeStat(user_id=user_id, dimension=dimension, value=value, count=count)
+         for (user_id, dimension, value), count in counts.items()),
+        batch_size=500,
+    )
+    item_counts = Counter(Outfit.clothing_items.through.objects.values_list('outfit_id', flat=True).iterator())
+    for outfit_id, count in item_counts.items():
+        Outfit.objects.filter(pk=outfit_id).update(item_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0012_image_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số món đồ'),
+        ),
+        migrations.CreateModel(
+            name='WardrobeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('category', 'Loại'), ('color', 'Màu sắc'), ('brand', 'Thương hiệu')], max_length=10, verbose_name='Thuộc tính')),
+                ('value', models.CharField(blank=True, max_length=100, verbose_name='Giá trị')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Số món đồ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Người dùng')),
+            ],
+            options={
+                'verbose_name': 'Thống kê tủ đồ',
+                'verbose_name_plural': 'Các thống kê tủ đồ',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='wardrobestat',
+            constraint=models.UniqueConstraint(fields=('user', 'dimension', 'value'), name='wardrobestat_user_dim_value_uniq'),
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,13 @@
 # app/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 
+from .storage import get_image_storage
+
 class ClothingCategory(models.Model):
     name = models.CharField(_("Tên loại"), max_length=100, unique=True)
+    updated_at = models.DateTimeField(_("Lần cập nhật cuối"), auto_now=True)
 
     def __str__(self):
         return self.name
@@ -38,10 +41,26 @@ class ClothingItem(models.Model):
     image = models.ImageField(
         _("Ảnh"),
         upload_to='clothing_images/', # Ảnh sẽ được lưu vào thư mục media/clothing_images/
+        storage=get_image_storage, # Lưu theo hash nội dung, ảnh trùng chỉ giữ một bản (app/storage.py)
         blank=True,
         null=True
     )
     # END THAY ĐỔI
+    # Các bản thu nhỏ của ảnh (app/images.py): {'source': <ảnh gốc>, 'thumb': <path>, 'medium': <path>}
+    renditions = models.JSONField(_("Các bản thu nhỏ"), default=dict, blank=True, editable=False)
+
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PROCESSING, _("Đang xử lý")),
+        (IMAGE_READY, _("Sẵn sàng")),
+        (IMAGE_FAILED, _("Lỗi")),
+    ]
+    # Trạng thái xử lý ảnh nền (app/tasks.py)
+    image_status = models.CharField(
+        _("Trạng thái ảnh"), max_length=20, choices=IMAGE_STATUS_CHOICES, default=IMAGE_READY, editable=False
+    )
 
     notes = models.TextField(_("Ghi chú"), blank=True)
     date_added = models.DateTimeField(_("Ngày thêm"), auto_now_add=True)
@@ -50,6 +69,19 @@ class ClothingItem(models.Model):
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ghi nhớ ảnh lúc load để signal biết ảnh có bị thay khi save (đếm tham chiếu MediaBlob)
+        image = instance.__dict__.get('image')
+        instance._loaded_image_name = getattr(image, 'name', image) or ''
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Thống kê tủ đồ được cập nhật trong signal post_save: cùng transaction với lần ghi này
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     # Tùy chọn: Thêm một property để lấy URL đầy đủ của ảnh
     @property
     def image_full_url(self):
@@ -61,6 +93,14 @@ class ClothingItem(models.Model):
         verbose_name = _("Món đồ")
         verbose_name_plural = _("Các món đồ")
         ordering = ['-last_modified']
+        indexes = [
+            # Phục vụ danh sách theo user và phân trang keyset (last_modified, id)
+            models.Index(fields=['user', '-last_modified', '-id'], name='item_user_lastmod_idx'),
+            models.Index(fields=['user', '-date_added'], name='item_user_added_idx'),
+            # Admin lọc theo brand và color
+            models.Index(fields=['brand'], name='item_brand_idx'),
+            models.Index(fields=['color'], name='item_color_idx'),
+        ]
 
 # Model Outfit giữ nguyên
 class Outfit(models.Model):
@@ -70,11 +110,225 @@ class Outfit(models.Model):
     clothing_items = models.ManyToManyField(ClothingItem, related_name='outfits', verbose_name=_("Các món đồ"), blank=True)
     created_at = models.DateTimeField(_("Ngày tạo"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Lần cập nhật cuối"), auto_now=True)
+    # Số món đồ trong bộ đồ, cập nhật theo thay đổi thành viên (app/stats.py)
+    item_count = models.PositiveIntegerField(_("Số món đồ"), default=0, editable=False)
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        # item_count chỉ được ghi bằng UPDATE từ app/stats.py: save() của một instance
+        # load từ trước không ghi đè số đếm đã đổi kể từ đó
+        if update_fields is None and not force_insert and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'item_count'
+            ]
+        super().save(force_insert=force_insert, force_update=force_update, using=using, update_fields=update_fields)
+
     class Meta:
         verbose_name = _("Bộ đồ")
         verbose_name_plural = _("Các bộ đồ")
-        ordering = ['-updated_at']
\ No newline at end of file
+        ordering = ['-updated_at']
+        indexes = [
+            # Phục vụ danh sách theo user và phân trang keyset (updated_at, id)
+            models.Index(fields=['user', '-updated_at', '-id'], name='outfit_user_updated_idx'),
+        ]
+
+class ImageJob(models.Model):
+    """
+    Hàng đợi xử lý ảnh lưu trong DB: mỗi dòng là một lần cần kiểm tra ảnh và tạo rendition
+    cho một món đồ. Worker (lệnh `process_images`) nhận job bằng UPDATE có điều kiện.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, _("Chờ xử lý")),
+        (RUNNING, _("Đang chạy")),
+        (DONE, _("Xong")),
+        (FAILED, _("Lỗi")),
+    ]
+
+    item = models.ForeignKey(ClothingItem, on_delete=models.CASCADE, related_name='image_jobs', verbose_name=_("Món đồ"))
+    status = models.CharField(_("Trạng thái"), max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(_("Số lần thử"), default=0)
+    error = models.TextField(_("Lỗi"), blank=True)
+    created_at = models.DateTimeField(_("Ngày tạo"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Lần cập nhật cuối"), auto_now=True)
+
+    def __str__(self):
+        return f"ImageJob #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = _("Job xử lý ảnh")
+        verbose_name_plural = _("Các job xử lý ảnh")
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='imagejob_status_created_idx'),
+        ]
+
+
+class MediaBlob(models.Model):
+    """
+    Đếm số món đồ đang dùng một file ảnh (lưu theo hash nội dung).
+    Khi số tham chiếu về 0, file gốc và các rendition của nó bị xóa (app/blobs.py); blob về 0
+    mà chưa bị xóa được dọn bởi `prune_media`.
+    """
+    name = models.CharField(_("Đường dẫn file"), max_length=255, unique=True)
+    ref_count = models.IntegerField(_("Số tham chiếu"), default=0)
+    created_at = models.DateTimeField(_("Ngày tạo"), auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    class Meta:
+        verbose_name = _("File ảnh")
+        verbose_name_plural = _("Các file ảnh")
+
+
+class Tombstone(models.Model):
+    """
+    Ghi lại việc xóa món đồ/bộ đồ/category để endpoint đồng bộ (/api/sync/) báo cho client
+    xóa bản sao cục bộ. Dòng cũ hơn SYNC['TOMBSTONE_RETENTION_DAYS'] bị xóa bởi `prune_tombstones`.
+    """
+    CATEGORY = 'category'
+    CLOTHING_ITEM = 'clothing_item'
+    OUTFIT = 'outfit'
+    MODEL_CHOICES = [
+        (CATEGORY, _("Loại quần áo")),
+        (CLOTHING_ITEM, _("Món đồ")),
+        (OUTFIT, _("Bộ đồ")),
+    ]
+
+    # Không dùng ràng buộc FK: tombstone của món đồ được tạo ngay trong lúc xóa cascade
+    # cả user, khi user đó cũng sắp bị xóa. Category dùng chung nên user là NULL.
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+        related_name='+', verbose_name=_("Người dùng"),
+    )
+    model = models.CharField(_("Loại dữ liệu"), max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField(_("ID"))
+    deleted_at = models.DateTimeField(_("Thời điểm xóa"), auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        verbose_name = _("Bản ghi đã xóa")
+        verbose_name_plural = _("Các bản ghi đã xóa")
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+        ]
+
+
+class SearchDocument(models.Model):
+    """
+    Chỉ mục tìm kiếm toàn văn của món đồ/bộ đồ (app/search.py): `body` là phần chữ đã
+    chuẩn hóa (chữ thường, bỏ dấu). Được ghi lại mỗi khi object được lưu. Trên SQLite
+    bảng FTS5 `app_searchdocument_fts` được trigger giữ đồng bộ, trên PostgreSQL có
+    index GIN trên to_tsvector(body) (migration 0010).
+    """
+    ITEM = 'item'
+    OUTFIT = 'outfit'
+    KIND_CHOICES = [
+        (ITEM, _("Món đồ")),
+        (OUTFIT, _("Bộ đồ")),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name=_("Người dùng"))
+    kind = models.CharField(_("Loại dữ liệu"), max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(_("ID"))
+    body = models.TextField(_("Nội dung"), blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+    class Meta:
+        verbose_name = _("Chỉ mục tìm kiếm")
+        verbose_name_plural = _("Các chỉ mục tìm kiếm")
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdoc_kind_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind'], name='searchdoc_user_kind_idx'),
+        ]
+
+
+class ItemCooccurrence(models.Model):
+    """
+    Số bộ đồ của user chứa đồng thời hai món đồ (item_a <= item_b; cặp (i, i) là số bộ đồ
+    chứa i). Cập nhật theo phần chênh lệch khi thành viên bộ đồ đổi, dùng cho gợi ý bộ đồ
+    (app/recommend.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name=_("Người dùng"))
+    item_a = models.ForeignKey(ClothingItem, on_delete=models.CASCADE, related_name='+', verbose_name=_("Món đồ A"))
+    item_b = models.ForeignKey(ClothingItem, on_delete=models.CASCADE, related_name='+', verbose_name=_("Món đồ B"))
+    count = models.PositiveIntegerField(_("Số bộ đồ"), default=0)
+
+    def __str__(self):
+        return f"{self.item_a_id} + {self.item_b_id}: {self.count}"
+
+    class Meta:
+        verbose_name = _("Cặp món đồ mặc cùng nhau")
+        verbose_name_plural = _("Các cặp món đồ mặc cùng nhau")
+        constraints = [
+            models.UniqueConstraint(fields=['item_a', 'item_b'], name='cooccurrence_pair_uniq'),
+        ]
+
+
+class ImageSignature(models.Model):
+    """
+    Dấu vân tay thị giác của ảnh món đồ (app/similarity.py): pHash, dHash 64 bit (lưu dạng
+    số có dấu) và histogram màu 4x4x4 (64 byte). `source` là ảnh đã dùng để tính,
+    giống renditions['source'].
+    """
+    item = models.OneToOneField(
+        ClothingItem, on_delete=models.CASCADE, primary_key=True, related_name='image_signature',
+        verbose_name=_("Món đồ"),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name=_("Người dùng"))
+    source = models.CharField(_("Ảnh gốc"), max_length=255)
+    phash = models.BigIntegerField(_("pHash"))
+    dhash = models.BigIntegerField(_("dHash"))
+    histogram = models.BinaryField(_("Histogram màu"), max_length=64)
+
+    def __str__(self):
+        return f"{self.item_id}: {self.phash & 0xFFFFFFFFFFFFFFFF:016x}"
+
+    class Meta:
+        verbose_name = _("Dấu vân tay ảnh")
+        verbose_name_plural = _("Các dấu vân tay ảnh")
+
+
+class WardrobeStat(models.Model):
+    """
+    Số món đồ của user theo từng category (value là ID, '' nếu không có), màu, thương hiệu.
+    Cập nhật theo phần chênh lệch khi món đồ được tạo/sửa/xóa (app/stats.py), lệnh
+    `rebuild_stats` tính lại từ bảng món đồ.
+    """
+    CATEGORY = 'category'
+    COLOR = 'color'
+    BRAND = 'brand'
+    DIMENSION_CHOICES = [
+        (CATEGORY, _("Loại")),
+        (COLOR, _("Màu sắc")),
+        (BRAND, _("Thương hiệu")),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name=_("Người dùng"))
+    dimension = models.CharField(_("Thuộc tính"), max_length=10, choices=DIMENSION_CHOICES)
+    value = models.CharField(_("Giá trị"), max_length=100, blank=True)
+    count = models.PositiveIntegerField(_("Số món đồ"), default=0)
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+    class Meta:
+        verbose_name = _("Thống kê tủ đồ")
+        verbose_name_plural = _("Các thống kê tủ đồ")
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'dimension', 'value'], name='wardrobestat_user_dim_value_uniq'),
+        ]
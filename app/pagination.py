@@ -0,0 +1,134 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Phân trang theo keyset (seek) trên cặp (timestamp, id) giảm dần.
+    Không chạy COUNT(*) và không dùng OFFSET, nên chi phí mỗi trang
+    không đổi dù client cuộn sâu đến đâu (cần index (user, -timestamp, -id)).
+    Chỉ hỗ trợ đi tiếp (`next`), phù hợp với kiểu cuộn vô hạn của app.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, timestamp_field):
+        self.timestamp_field = timestamp_field
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, obj):
+        """
+        Cursor là base64 của "<timestamp iso>|<id>" của dòng cuối trang trước.
+        `obj` là instance model hoặc dict của queryset values() (app/fastpath.py).
+        """
+        if isinstance(obj, dict):
+            timestamp, pk = obj[self.timestamp_field], obj['id']
+        else:
+            timestamp, pk = getattr(obj, self.timestamp_field), obj.pk
+        raw = f'{timestamp.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def seek(self, queryset, request):
+        """
+        Queryset của trang hiện tại (đã sắp xếp, lọc theo cursor, lấy dư 1 dòng để biết còn
+        trang sau hay không). Lấy dòng xong gọi set_page(); view async (app/asyncviews.py)
+        đọc queryset này bằng async for.
+        """
+        self.request = request
+        self.limit = self.get_page_size(request)
+        field = self.timestamp_field
+
+        queryset = queryset.order_by(f'-{field}', '-id')
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            timestamp, pk = self.decode_cursor(encoded)
+            # Điều kiện `<=` tách riêng để DB dùng được range seek trên index;
+            # chỉ OR thuần thì SQLite chỉ seek được theo user rồi quét tiếp.
+            queryset = queryset.filter(
+                Q(**{f'{field}__lte': timestamp}),
+                Q(**{f'{field}__lt': timestamp}) | Q(id__lt=pk),
+            )
+
+        return queryset[:self.limit + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.limit
+        self.page = results[:self.limit]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.seek(queryset, request)))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin cho ViewSet: bật KeysetPagination khi client gửi `?pagination=keyset`
+    (hoặc đã có `cursor` trong query). Mặc định vẫn dùng PageNumberPagination
+    để không phá vỡ client cũ.
+    """
+    keyset_timestamp_field = None
+    keyset_query_param = 'pagination'
+    keyset_query_value = 'keyset'
+
+    def use_keyset_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get(self.keyset_query_param) == self.keyset_query_value
+            or KeysetPagination.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        request = getattr(self, 'request', None)
+        if not hasattr(self, '_paginator') and request is not None and self.use_keyset_pagination():
+            self._paginator = KeysetPagination(self.keyset_timestamp_field)
+        return super().paginator
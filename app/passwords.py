@@ -0,0 +1,178 @@
+"""
+Băm/kiểm tra mật khẩu cho đăng nhập và đăng ký ngoài luồng xử lý request.
+
+- PBKDF2 (và argon2/bcrypt) tốn hàng trăm ms CPU mỗi lần. Các phép băm chạy trên một pool
+  giới hạn MAX_WORKERS phép cùng lúc mỗi process: thread (hashlib nhả GIL khi băm) hoặc
+  process cho hasher giữ GIL. Tối đa MAX_PENDING request được chờ pool; request chờ quá
+  QUEUE_TIMEOUT giây nhận 503 kèm Retry-After thay vì giữ worker.
+- AuthRateThrottle giới hạn số lần đăng nhập/đăng ký của mỗi IP (RATE), AuthGlobalRateThrottle
+  là trần chung cho mọi client (GLOBAL_RATE); cả hai đếm trong cache mặc định, dùng chung giữa
+  các worker nếu cache là Redis/file. Với thời gian băm t giây, GLOBAL_RATE r/s dùng khoảng r*t
+  CPU, phần còn lại để dành cho các API món đồ/bộ đồ.
+- Django tự băm lại mật khẩu khi tham số của hasher đổi (thêm một lần băm và một UPDATE
+  ngay lúc đăng nhập). Ở đây việc đó là tùy chọn (UPGRADE_HASHES), cũng chạy trên pool và
+  chỉ ghi nếu mật khẩu chưa bị đổi trong lúc đó.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def auth_settings():
+    options = {
+        'EXECUTOR': 'thread', 'MAX_WORKERS': 2, 'MAX_PENDING': 16, 'QUEUE_TIMEOUT': 2.0,
+        'RATE': None, 'GLOBAL_RATE': None, 'UPGRADE_HASHES': False,
+    }
+    options.update(getattr(settings, 'AUTH_HASHING', {}))
+    return options
+
+
+class AuthBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many login attempts in progress, please retry shortly.'
+    default_code = 'auth_busy'
+    wait = 1  # DRF thêm header Retry-After
+
+
+def _check_password(password, encoded):
+    """
+    (mật khẩu đúng?, hash cần băm lại theo tham số mới?) — setter của check_password chỉ
+    được gọi khi mật khẩu đúng và hash đã cũ.
+    """
+    outdated = []
+    correct = check_password(password, encoded, setter=lambda raw: outdated.append(True))
+    return correct, bool(outdated)
+
+
+class HashingPool:
+    """
+    Pool băm mật khẩu dùng chung trong process, tạo lại khi EXECUTOR/MAX_WORKERS đổi.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self._executor = None
+        self._slots = None
+
+    def _get(self):
+        options = auth_settings()
+        config = (options['EXECUTOR'], options['MAX_WORKERS'], options['MAX_PENDING'])
+        with self._lock:
+            if config != self._config:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                executor, workers, pending = config
+                if executor == 'process':
+                    # spawn: không fork một process đang có thread và kết nối DB
+                    self._executor = ProcessPoolExecutor(
+                        workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hashing')
+                self._slots = threading.BoundedSemaphore(pending)
+                self._config = config
+            return self._executor, self._slots, options['QUEUE_TIMEOUT']
+
+    def run(self, function, *args):
+        executor, slots, timeout = self._get()
+        if not slots.acquire(timeout=timeout):
+            raise AuthBusy()
+        try:
+            return executor.submit(function, *args).result()
+        finally:
+            slots.release()
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password):
+    return hashing_pool.run(make_password, password)
+
+
+def verify_password(user, password):
+    """
+    Như user.check_password(password), nhưng băm trên pool và chỉ nâng cấp hash khi
+    UPGRADE_HASHES bật.
+    """
+    encoded = user.password
+    correct, outdated = hashing_pool.run(_check_password, password, encoded)
+    if correct and outdated and auth_settings()['UPGRADE_HASHES']:
+        upgraded = hash_password(password)
+        # Không ghi đè nếu mật khẩu vừa được đổi ở request khác
+        if type(user)._default_manager.filter(pk=user.pk, password=encoded).update(password=upgraded):
+            user.password = upgraded
+    return correct
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend băm mật khẩu qua hashing_pool (dùng cho AuthTokenSerializer, admin, ...).
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Vẫn băm một lần để thời gian trả lời không lộ username có tồn tại hay không
+            hash_password(password)
+            return None
+        if verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+class AuthRateThrottle(SimpleRateThrottle):
+    """
+    Giới hạn số request đăng nhập/đăng ký của mỗi client (theo IP), theo AUTH_HASHING['RATE'].
+    """
+    scope = 'auth'
+
+    def get_rate(self):
+        return auth_settings()['RATE']
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AuthGlobalRateThrottle(AuthRateThrottle):
+    """
+    Trần chung cho mọi client (AUTH_HASHING['GLOBAL_RATE']): giữ CPU băm mật khẩu trong giới hạn
+    kể cả khi request đến từ nhiều IP.
+    """
+    scope = 'auth_global'
+
+    def get_rate(self):
+        return auth_settings()['GLOBAL_RATE']
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': 'all'}
+
+
+_request_executor = None
+_request_executor_lock = threading.Lock()
+
+
+def request_executor():
+    """
+    Executor chạy view đăng nhập/đăng ký dưới ASGI (app/asyncviews.py), MAX_PENDING thread:
+    request chờ băm không chiếm thread sync duy nhất của process.
+    """
+    global _request_executor
+    with _request_executor_lock:
+        if _request_executor is None:
+            _request_executor = ThreadPoolExecutor(auth_settings()['MAX_PENDING'], thread_name_prefix='auth-request')
+        return _request_executor
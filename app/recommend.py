@@ -0,0 +1,287 @@
+"""
+Gợi ý bộ đồ (GET /api/outfits/recommend/) từ thống kê "món đồ nào hay được mặc cùng nhau"
+trong các bộ đồ sẵn có của user.
+
+ItemCooccurrence giữ số bộ đồ chứa mỗi cặp món đồ và được cập nhật theo phần chênh lệch
+khi thành viên bộ đồ đổi (app/signals.py), nên request gợi ý chỉ đọc bảng đó cùng các
+cột category/màu/thương hiệu của món đồ, không quét lại các bộ đồ.
+
+Điểm của món đồ ứng viên j so với tập đang chọn S (NumPy, trên toàn bộ tủ đồ):
+- đồng xuất hiện: sum_{i in S} C[i, j] / sqrt(C[i, i] * C[j, j])
+- đặc trưng: x_j · M · sum_{i in S} x_i, với x là vector one-hot (category, màu, thương hiệu)
+  và M là ma trận đồng xuất hiện giữa các đặc trưng (chuẩn hóa tương tự), nhờ đó cả món
+  đồ chưa nằm trong bộ đồ nào cũng được gợi ý.
+Bộ đồ được dựng tham lam từ một món đồ gốc, mỗi category tối đa một món.
+"""
+import functools
+from collections import Counter
+from itertools import chain, groupby
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .membership import OutfitItems
+from .models import ClothingItem, ItemCooccurrence
+
+FEATURE_GROUPS = 3  # category, màu, thương hiệu
+
+
+def recommend_settings():
+    options = {'MAX_SUGGESTIONS': 10, 'DEFAULT_SIZE': 4, 'MAX_SIZE': 8, 'FEATURE_WEIGHT': 0.5, 'MAX_FEATURES': 256}
+    options.update(getattr(settings, 'RECOMMEND', {}))
+    return options
+
+
+# --- Thống kê đồng xuất hiện ---------------------------------------------------------------
+
+def _pair(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+def outfit_members(outfit_ids):
+    """
+    {outfit_id: tập ID món đồ} đọc thẳng bảng trung gian trong một query.
+    """
+    members = {pk: set() for pk in outfit_ids}
+    rows = OutfitItems.objects.filter(outfit_id__in=list(members)).values_list('outfit_id', 'clothingitem_id')
+    for outfit_id, item_id in rows:
+        members[outfit_id].add(item_id)
+    return members
+
+
+def _pairs_with(new, kept):
+    """
+    Các cặp (kể cả cặp (i, i)) có ít nhất một món trong `new`, món còn lại trong `new` hoặc `kept`.
+    """
+    new = sorted(new)
+    for index, item in enumerate(new):
+        for other in chain(kept, new[index:]):
+            yield _pair(item, other)
+
+
+def membership_deltas(before, after):
+    """
+    Thay đổi số đếm của từng cặp khi các bộ đồ đổi thành viên từ `before` sang `after`
+    ({outfit_id: tập ID món đồ}; bộ đồ bị xóa có tập rỗng trong `after`).
+    """
+    deltas = Counter()
+    for outfit_id, old in before.items():
+        new = after.get(outfit_id, set())
+        kept = old & new
+        deltas.update(_pairs_with(new - old, kept))
+        deltas.subtract(_pairs_with(old - new, kept))
+    return {key: value for key, value in deltas.items() if value}
+
+
+def retry_on_conflict(function):
+    """
+    Chạy `function` trong một savepoint, chạy lại một lần nếu gặp IntegrityError: hai
+    transaction cùng tạo lần đầu một dòng thống kê (select_for_update không khóa được dòng
+    chưa có) thì bên sau vi phạm ràng buộc unique; lần chạy lại thấy và khóa dòng bên kia
+    vừa tạo.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            with transaction.atomic():
+                return function(*args, **kwargs)
+        except IntegrityError:
+            with transaction.atomic():
+                return function(*args, **kwargs)
+    return wrapper
+
+
+@retry_on_conflict
+def apply_deltas(user_id, deltas):
+    """
+    Cộng `deltas` vào ItemCooccurrence: khóa các dòng liên quan, sửa/tạo bằng bulk,
+    xóa cặp về 0.
+    """
+    if not deltas:
+        return
+    ids = {pk for key in deltas for pk in key}
+    rows = ItemCooccurrence.objects.select_for_update().filter(item_a_id__in=ids, item_b_id__in=ids)
+    existing = {(row.item_a_id, row.item_b_id): row for row in rows}
+    changed, created, removed = [], [], []
+    for (item_a, item_b), delta in deltas.items():
+        row = existing.get((item_a, item_b))
+        if row is None:
+            if delta > 0:
+                created.append(ItemCooccurrence(user_id=user_id, item_a_id=item_a, item_b_id=item_b, count=delta))
+        elif row.count + delta > 0:
+            row.count += delta
+            changed.append(row)
+        else:
+            removed.append(row.pk)
+    if changed:
+        ItemCooccurrence.objects.bulk_update(changed, ['count'], batch_size=500)
+    if created:
+        ItemCooccurrence.objects.bulk_create(created, batch_size=500)
+    if removed:
+        ItemCooccurrence.objects.filter(pk__in=removed).delete()
+
+
+def rebuild_cooccurrence(chunk_size=2000):
+    """
+    Tính lại toàn bộ bảng từ bảng trung gian (lệnh `rebuild_recommendations`).
+    Trả về số cặp đã ghi.
+    """
+    ItemCooccurrence.objects.all().delete()
+    rows = (
+        OutfitItems.objects.order_by('outfit_id')
+        .values_list('outfit_id', 'outfit__user_id', 'clothingitem_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    counts, owners = Counter(), {}
+    for (_, user_id), group in groupby(rows, key=lambda row: row[:2]):
+        for key in _pairs_with({row[2] for row in group}, ()):
+            counts[key] += 1
+            owners[key] = user_id
+    ItemCooccurrence.objects.bulk_create(
+        (ItemCooccurrence(user_id=owners[key], item_a_id=key[0], item_b_id=key[1], count=count)
+         for key, count in counts.items()),
+        batch_size=500,
+    )
+    return len(counts)
+
+
+# --- Gợi ý ---------------------------------------------------------------------------------
+
+class WardrobeModel:
+    """
+    Đặc trưng và thống kê của tủ đồ một user dưới dạng mảng NumPy (2 query).
+    Món đồ được đánh chỉ số theo thứ tự ID trong `ids`.
+    """
+    def __init__(self, user):
+        options = recommend_settings()
+        rows = list(
+            ClothingItem.objects.filter(user=user).order_by('pk').values_list('pk', 'category_id', 'color', 'brand')
+        )
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.categories = np.array([row[1] or -1 for row in rows], dtype=np.int64)
+        n = len(rows)
+
+        # Mỗi món đồ có tối đa một đặc trưng mỗi nhóm; chỉ giữ MAX_FEATURES đặc trưng phổ biến nhất,
+        # đặc trưng thiếu/bị bỏ trỏ tới cột cuối (luôn bằng 0).
+        values = [
+            [('category', row[1]) if row[1] else None,
+             ('color', row[2].casefold()) if row[2] else None,
+             ('brand', row[3].casefold()) if row[3] else None]
+            for row in rows
+        ]
+        frequent = Counter(value for row in values for value in row if value).most_common(options['MAX_FEATURES'])
+        vocabulary = {value: index for index, (value, _) in enumerate(frequent)}
+        self.dimensions = len(vocabulary)
+        self.features = np.array(
+            [[vocabulary.get(value, self.dimensions) for value in row] for row in values], dtype=np.int64
+        ).reshape(n, FEATURE_GROUPS)
+
+        pairs = np.array(
+            list(ItemCooccurrence.objects.filter(user=user).values_list('item_a_id', 'item_b_id', 'count')),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        a = np.searchsorted(self.ids, pairs[:, 0])
+        b = np.searchsorted(self.ids, pairs[:, 1])
+        counts = pairs[:, 2].astype(np.float64)
+        diagonal = a == b
+        self.usage = np.zeros(n)
+        self.usage[a[diagonal]] = counts[diagonal]
+        a, b, counts = a[~diagonal], b[~diagonal], counts[~diagonal]
+        weights = counts / np.sqrt(np.maximum(self.usage[a] * self.usage[b], 1))
+
+        # Danh sách kề đối xứng sắp theo nguồn: hàng xóm của i là targets[offsets[i]:offsets[i + 1]]
+        sources = np.concatenate([a, b])
+        order = np.argsort(sources, kind='stable')
+        self.targets = np.concatenate([b, a])[order]
+        self.weights = np.concatenate([weights, weights])[order]
+        self.offsets = np.searchsorted(sources[order], np.arange(n + 1))
+
+        self.feature_matrix = self._feature_matrix(a, b, weights)
+
+    def _feature_matrix(self, a, b, weights):
+        """
+        M[f, g]: tổng trọng số các cặp món đồ có đặc trưng f và g, đối xứng, chuẩn hóa
+        theo bậc của đặc trưng. Thêm một hàng/cột 0 cho đặc trưng thiếu.
+        """
+        size = self.dimensions + 1
+        matrix = np.zeros(size * size)
+        for g in range(FEATURE_GROUPS):
+            for h in range(FEATURE_GROUPS):
+                index = self.features[a, g] * size + self.features[b, h]
+                matrix += np.bincount(index, weights=weights, minlength=size * size)
+        matrix = matrix.reshape(size, size)
+        matrix += matrix.T
+        matrix[-1, :] = matrix[:, -1] = 0
+        degree = np.sqrt(matrix.sum(axis=1))
+        degree[degree == 0] = 1
+        return matrix / np.outer(degree, degree)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, item_id):
+        index = int(np.searchsorted(self.ids, item_id))
+        return index if index < len(self.ids) and self.ids[index] == item_id else None
+
+    def contribution(self, index, feature_weight):
+        """
+        Điểm mà món đồ `index` góp cho mọi món đồ khác khi được thêm vào bộ đồ.
+        """
+        scores = np.zeros(len(self.ids))
+        start, end = self.offsets[index], self.offsets[index + 1]
+        scores[self.targets[start:end]] += self.weights[start:end]
+        if feature_weight and self.dimensions:
+            affinity = self.feature_matrix[:, self.features[index]].sum(axis=1)
+            scores += feature_weight * affinity[self.features].sum(axis=1)
+        return scores
+
+    def build_outfit(self, seed, size, banned):
+        """
+        Dựng một bộ đồ tham lam từ món đồ `seed`: mỗi bước thêm món có điểm cao nhất,
+        khác category với các món đã chọn. Trả về (chỉ số các món, điểm).
+        """
+        feature_weight = recommend_settings()['FEATURE_WEIGHT']
+        chosen = [seed]
+        scores = self.contribution(seed, feature_weight)
+        available = ~banned
+        total = 0.0
+        while len(chosen) < size:
+            available[chosen[-1]] = False
+            if self.categories[chosen[-1]] >= 0:
+                available &= self.categories != self.categories[chosen[-1]]
+            candidates = np.where(available, scores, -np.inf)
+            best = int(np.argmax(candidates))
+            if not np.isfinite(candidates[best]) or candidates[best] <= 0:
+                break
+            chosen.append(best)
+            total += float(candidates[best])
+            scores += self.contribution(best, feature_weight)
+        return chosen, total
+
+    def recommend(self, count, size, seed_id=None):
+        """
+        Tối đa `count` bộ đồ khác nhau. Có `seed_id`: mọi bộ đồ bắt đầu từ món đó, các món
+        đã dùng ở gợi ý trước bị loại để có lựa chọn khác. Không có: bắt đầu lần lượt từ
+        những món được mặc nhiều nhất.
+        """
+        if not len(self):
+            return []
+        banned = np.zeros(len(self), dtype=bool)
+        if seed_id is not None:
+            seeds = [self.index_of(seed_id)] * count
+        else:
+            seeds = [int(i) for i in np.argsort(-self.usage, kind='stable') if self.usage[i] > 0]
+        suggestions, seen = [], set()
+        for seed in seeds:
+            if len(suggestions) == count:
+                break
+            chosen, score = self.build_outfit(seed, size, banned.copy())
+            key = frozenset(chosen)
+            if len(chosen) < 2 or key in seen:
+                continue
+            seen.add(key)
+            if seed_id is not None:
+                banned[chosen[1:]] = True
+            suggestions.append(([int(self.ids[i]) for i in chosen], round(score, 4)))
+        return suggestions
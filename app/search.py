@@ -0,0 +1,207 @@
+"""
+Tìm kiếm toàn văn trong tủ đồ của một user (`/api/clothing-items/search/`, `/api/outfits/search/`).
+
+Mỗi món đồ/bộ đồ có một dòng SearchDocument chứa phần chữ đã chuẩn hóa (chữ thường,
+bỏ dấu tiếng Việt), được ghi lại khi object được lưu (app/signals.py, app/bulk.py).
+Truy vấn đi qua index riêng của từng database:
+- SQLite: bảng FTS5 contentless `app_searchdocument_fts`, trigger trên app_searchdocument
+  giữ đồng bộ. Cột `scope` chứa "u<user_id> <kind>" để FTS tự giao với tập của user,
+  không phải lọc kết quả của mọi user.
+- PostgreSQL: index GIN trên to_tsvector('simple', body).
+- Database khác: LIKE trên body (không có index).
+
+Mỗi từ trong `q` được tìm theo tiền tố ("ao so" khớp "Áo sơ mi"), các từ kết hợp bằng AND.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Count
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from .catalog import category_catalog
+from .models import ClothingItem, Outfit, SearchDocument
+
+FTS_TABLE = 'app_searchdocument_fts'
+TSVECTOR = "to_tsvector('simple'::regconfig, body)"
+
+# Các field chữ được đánh chỉ mục của từng model
+SEARCH_FIELDS = {
+    ClothingItem: ('name', 'brand', 'color', 'notes'),
+    Outfit: ('name', 'description'),
+}
+KINDS = {ClothingItem: SearchDocument.ITEM, Outfit: SearchDocument.OUTFIT}
+
+
+def search_settings():
+    options = {'FACET_LIMIT': 20, 'MAX_TERMS': 8}
+    options.update(getattr(settings, 'SEARCH', {}))
+    return options
+
+
+def normalize(text):
+    """
+    Chữ thường, bỏ dấu ("Áo Sơ Mi Đỏ" -> "ao so mi do") để tìm không cần gõ dấu.
+    """
+    text = unicodedata.normalize('NFKD', (text or '').casefold().replace('đ', 'd'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def query_terms(text):
+    return re.findall(r'\w+', normalize(text))[:search_settings()['MAX_TERMS']]
+
+
+def document_body(instance):
+    return normalize(' '.join(getattr(instance, field) or '' for field in SEARCH_FIELDS[type(instance)]))
+
+
+def affects_index(instance, update_fields):
+    return update_fields is None or bool(set(update_fields) & set(SEARCH_FIELDS[type(instance)]))
+
+
+def index_objects(instances):
+    """
+    Ghi (upsert) SearchDocument của các món đồ/bộ đồ cùng loại trong một query.
+    """
+    if not instances:
+        return
+    kind = KINDS[type(instances[0])]
+    SearchDocument.objects.bulk_create(
+        [
+            SearchDocument(user_id=instance.user_id, kind=kind, object_id=instance.pk, body=document_body(instance))
+            for instance in instances
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['user', 'body'],
+    )
+
+
+def unindex_object(instance):
+    unindex_objects(type(instance), [instance.pk])
+
+
+def unindex_objects(model, pks):
+    """
+    Xóa SearchDocument của các món đồ/bộ đồ cùng loại trong một query.
+    """
+    SearchDocument.objects.filter(kind=KINDS[model], object_id__in=pks).delete()
+
+
+def rebuild_index(chunk_size=2000):
+    """
+    Dựng lại toàn bộ chỉ mục từ dữ liệu gốc (lệnh `rebuild_search_index`).
+    Trả về số dòng đã ghi.
+    """
+    SearchDocument.objects.all().delete()
+    if connection.vendor == 'sqlite':
+        # Bảng FTS contentless không tự kiểm tra được: xóa sạch để bỏ mọi dòng lệch
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+    total = 0
+    for model in SEARCH_FIELDS:
+        chunk = []
+        for instance in model.objects.only('user', *SEARCH_FIELDS[model]).iterator(chunk_size=chunk_size):
+            chunk.append(instance)
+            if len(chunk) == chunk_size:
+                index_objects(chunk)
+                total, chunk = total + len(chunk), []
+        index_objects(chunk)
+        total += len(chunk)
+    return total
+
+
+def matching_ids(user, kind, text):
+    """
+    Subquery ID các object loại `kind` của user khớp mọi từ trong `text`,
+    None nếu `text` không có từ nào (không lọc).
+    """
+    terms = query_terms(text)
+    if not terms:
+        return None
+    documents = SearchDocument.objects.filter(user=user, kind=kind)
+    if connection.vendor == 'sqlite':
+        phrase = ' AND '.join(f'body:"{term}"*' for term in terms)
+        match = f'scope:"u{user.pk} {kind}" AND {phrase}'
+        documents = documents.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        documents = documents.filter(
+            RawSQL(f"{TSVECTOR} @@ to_tsquery('simple'::regconfig, %s)", [tsquery], output_field=BooleanField())
+        )
+    else:
+        for term in terms:
+            documents = documents.filter(body__contains=term)
+    return documents.values('object_id')
+
+
+class ItemSearch:
+    """
+    Tham số tìm món đồ: `q` (chữ), và các bộ lọc facet `category` (ID), `brand`, `color`;
+    mỗi bộ lọc có thể lặp lại để chọn nhiều giá trị (OR trong cùng facet, AND giữa các facet).
+    """
+    facet_fields = {'category': 'category_id', 'brand': 'brand', 'color': 'color'}
+
+    def __init__(self, user, text='', filters=None):
+        self.user = user
+        self.text = text
+        self.filters = filters or {}
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        filters = {name: params.getlist(name) for name in cls.facet_fields if params.getlist(name)}
+        if 'category' in filters:
+            try:
+                filters['category'] = [int(pk) for pk in filters['category']]
+            except ValueError:
+                raise ValidationError({'category': 'Expected category ids.'})
+        return cls(request.user, params.get('q', ''), filters)
+
+    def apply(self, queryset, exclude=None):
+        """
+        Lọc `queryset` (món đồ của user) theo chữ và các facet, trừ facet `exclude`.
+        """
+        ids = matching_ids(self.user, SearchDocument.ITEM, self.text)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        for name, values in self.filters.items():
+            if name != exclude:
+                queryset = queryset.filter(**{f'{self.facet_fields[name]}__in': values})
+        return queryset
+
+    def facets(self):
+        """
+        Số món đồ theo từng giá trị của mỗi facet, tính trên kết quả tìm với các bộ lọc
+        của facet khác (để vẫn thấy các lựa chọn còn lại của facet đang lọc).
+        """
+        limit = search_settings()['FACET_LIMIT']
+        base = ClothingItem.objects.filter(user=self.user)
+        names = category_catalog.get().names
+        result = {}
+        for name, column in self.facet_fields.items():
+            rows = (
+                self.apply(base, exclude=name).order_by()
+                .values(column).annotate(count=Count('id')).order_by('-count', column)
+            )
+            if name == 'category':
+                result[name] = [
+                    {'id': row[column], 'name': names.get(row[column]), 'count': row['count']}
+                    for row in rows.filter(category__isnull=False)[:limit]
+                ]
+            else:
+                result[name] = [
+                    {'value': row[column], 'count': row['count']}
+                    for row in rows.exclude(**{column: ''})[:limit]
+                ]
+        return result
+
+
+def search_outfits(queryset, user, text):
+    ids = matching_ids(user, SearchDocument.OUTFIT, text)
+    return queryset if ids is None else queryset.filter(pk__in=ids)
@@ -2,6 +2,12 @@
 
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.validators import validate_image_file_extension
+from .catalog import category_catalog
+from .images import rendition_url, rendition_urls
+from .membership import set_outfit_items, split_owned_item_ids
+from .passwords import hash_password
+from .sparse import SparseFieldsetMixin
 from .models import ClothingCategory, ClothingItem, Outfit
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,15 +27,31 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email'),
-            password=validated_data['password'], # create_user sẽ hash password
+        # Như create_user, nhưng mật khẩu được băm trên pool giới hạn (app/passwords.py)
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email')),
+            password=hash_password(validated_data['password']),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', '')
         )
+        user.save()
         return user
 
+
+def user_summary(user):
+    """
+    Thông tin cơ bản của user, giống UserSerializer(user).data (không có password) nhưng không
+    phải dựng lại ModelSerializer cho mỗi lần đăng nhập.
+    """
+    return {
+        'id': user.pk,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+    }
+
 class ClothingCategorySerializer(serializers.ModelSerializer):
     """
     Serializer cho ClothingCategory model.
@@ -38,29 +60,73 @@ class ClothingCategorySerializer(serializers.ModelSerializer):
         model = ClothingCategory
         fields = ['id', 'name']
 
+class CatalogCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField kiểm tra ID category bằng category_catalog (app/catalog.py) thay vì query.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        category = category_catalog.category(pk)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
+class CatalogCategoryDetailField(serializers.ReadOnlyField):
+    """
+    category_detail ({id, name}) hoặc category_name (name_only=True) của món đồ, tra theo
+    category_id trong category_catalog: không cần join hay query bảng category.
+    """
+    def __init__(self, name_only=False, **kwargs):
+        self.name_only = name_only
+        super().__init__(source='category_id', **kwargs)
+
+    def to_representation(self, value):
+        category = category_catalog.get().by_id.get(value)
+        if category is None:
+            category = category_catalog.category(value)
+            if category is None:
+                return None
+        if self.name_only:
+            return category.name
+        return {'id': category.pk, 'name': category.name}
+
+
 class ClothingItemSerializer(serializers.ModelSerializer):
     """
     Serializer cho ClothingItem model, hỗ trợ upload ảnh.
     """
-    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    category_name = CatalogCategoryDetailField(name_only=True)
     # Cho phép client gửi category_id khi tạo/cập nhật.
-    category = serializers.PrimaryKeyRelatedField(
+    category = CatalogCategoryField(
         queryset=ClothingCategory.objects.all(),
         allow_null=True,
         required=False, # Cho phép không có category
         write_only=True # Chỉ dùng để ghi, khi đọc sẽ dùng category_detail
     )
-    category_detail = ClothingCategorySerializer(source='category', read_only=True)
+    category_detail = CatalogCategoryDetailField()
     user_username = serializers.CharField(source='user.username', read_only=True)
 
     # Trường này sẽ trả về URL đầy đủ của ảnh để hiển thị
     image_display_url = serializers.SerializerMethodField(read_only=True)
+    # URL theo từng kích thước: {'thumb': ..., 'medium': ..., 'original': ...}
+    image_urls = serializers.SerializerMethodField(read_only=True)
     
     # Trường 'image' (ImageField) sẽ được dùng để upload file.
     # DRF sẽ tự động xử lý việc nhận file upload.
     # Khi đọc, nó sẽ trả về đường dẫn tương đối của file ảnh.
     # `required=False` và `allow_null=True` cho phép tạo item mà không cần ảnh.
-    image = serializers.ImageField(required=False, allow_null=True, use_url=False) # use_url=False để nó trả về path, ta sẽ build full URL bằng SerializerMethodField
+    # Chỉ kiểm tra nhanh phần mở rộng ở đây; việc giải mã/kiểm tra đầy đủ ảnh chạy nền
+    # trong worker (app/tasks.py), kết quả thể hiện qua `image_status`.
+    image = serializers.FileField(
+        required=False, allow_null=True, use_url=False, # use_url=False để nó trả về path, ta sẽ build full URL bằng SerializerMethodField
+        validators=[validate_image_file_extension],
+    )
 
 
     class Meta:
@@ -71,11 +137,14 @@ class ClothingItemSerializer(serializers.ModelSerializer):
             'color', 'brand',
             'image',                # Dùng để upload và có thể trả về path
             'image_display_url',    # Dùng để hiển thị URL đầy đủ khi GET
+            'image_urls',           # URL ảnh thu nhỏ theo từng kích thước
+            'image_status',         # processing / ready / failed
             'notes', 'date_added', 'last_modified'
         ]
         read_only_fields = [
             'user_username', 'date_added', 'last_modified',
-            'category_name', 'category_detail', 'image_display_url'
+            'category_name', 'category_detail', 'image_display_url', 'image_urls',
+            'image_status',
         ]
         # Trường 'image' có thể được ghi (upload) và đọc (lấy path).
         # Nếu chỉ muốn ghi, có thể thêm 'image': {'write_only': True} vào extra_kwargs
@@ -93,6 +162,48 @@ class ClothingItemSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
+    def get_image_urls(self, obj):
+        """
+        URL đầy đủ của các rendition (thumb, medium) và ảnh gốc.
+        """
+        request = self.context.get('request')
+        build_url = request.build_absolute_uri if request else str
+        return rendition_urls(obj, build_url)
+
+
+class ClothingItemListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Bản gọn của món đồ cho danh sách/lưới ảnh (`?fields=`/`?expand=`): category chỉ là ID,
+    ảnh chỉ có URL thumbnail.
+    """
+    thumbnail = serializers.SerializerMethodField()
+
+    field_columns = {'thumbnail': ['image', 'renditions']}
+
+    class Meta:
+        model = ClothingItem
+        fields = ['id', 'name', 'category', 'color', 'brand', 'image_status', 'thumbnail', 'last_modified']
+        read_only_fields = fields
+
+    def get_thumbnail(self, obj):
+        request = self.context.get('request')
+        return rendition_url(obj, 'thumb', request.build_absolute_uri if request else str)
+
+
+class OutfitListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Bản gọn của bộ đồ: `clothing_items` là danh sách ID, hoặc danh sách món đồ gọn
+    khi `?expand=clothing_items`.
+    """
+    clothing_items = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    expandable_fields = {'clothing_items': (ClothingItemListSerializer, {'many': True, 'read_only': True})}
+
+    class Meta:
+        model = Outfit
+        fields = ['id', 'name', 'description', 'clothing_items', 'item_count', 'created_at', 'updated_at']
+        read_only_fields = fields
+
 
 class OutfitSerializer(serializers.ModelSerializer):
     """
@@ -103,9 +214,9 @@ class OutfitSerializer(serializers.ModelSerializer):
     # ClothingItemSerializer đã được cập nhật để xử lý ảnh, nên ở đây cũng sẽ hiển thị ảnh đúng
     clothing_items_details = ClothingItemSerializer(source='clothing_items', many=True, read_only=True)
     
-    clothing_items = serializers.PrimaryKeyRelatedField(
-        queryset=ClothingItem.objects.all(),
-        many=True,
+    # Danh sách ID món đồ, kiểm tra quyền sở hữu trong validate_clothing_items (một query cho cả danh sách)
+    clothing_items = serializers.ListField(
+        child=serializers.IntegerField(),
         write_only=True,
         required=False
     )
@@ -116,36 +227,83 @@ class OutfitSerializer(serializers.ModelSerializer):
             'id', 'user_username', 'name', 'description',
             'clothing_items',           # Dùng để ghi (gửi list ID)
             'clothing_items_details',   # Dùng để đọc (hiển thị chi tiết items, bao gồm ảnh)
+            'item_count',               # Số món đồ, giữ sẵn trong bảng (app/stats.py)
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['user_username', 'created_at', 'updated_at', 'clothing_items_details']
+        read_only_fields = ['user_username', 'created_at', 'updated_at', 'clothing_items_details', 'item_count']
+
+    def validate_clothing_items(self, value):
+        """
+        Chỉ chấp nhận ID món đồ thuộc về user hiện tại.
+        """
+        owned, invalid = split_owned_item_ids(self.context['request'].user, value)
+        if invalid:
+            raise serializers.ValidationError(
+                [f'Invalid pk "{pk}" - object does not exist.' for pk in invalid]
+            )
+        return owned
 
     def create(self, validated_data):
         user = self.context['request'].user
-        items_data = validated_data.pop('clothing_items', [])
+        item_ids = validated_data.pop('clothing_items', [])
         outfit = Outfit.objects.create(user=user, **validated_data)
-        valid_items_to_add = []
-        for item in items_data:
-            if item.user == user:
-                valid_items_to_add.append(item)
-        if valid_items_to_add:
-            outfit.clothing_items.set(valid_items_to_add)
+        if item_ids:
+            set_outfit_items(outfit, item_ids)
         return outfit
 
     def update(self, instance, validated_data):
-        user = self.context['request'].user
-        items_data = validated_data.pop('clothing_items', None)
-        
+        item_ids = validated_data.pop('clothing_items', None)
+
         # Cập nhật các trường của instance outfit
         instance.name = validated_data.get('name', instance.name)
         instance.description = validated_data.get('description', instance.description)
         # Không cập nhật user ở đây, vì owner không nên thay đổi
         instance.save()
 
-        if items_data is not None: # Nếu có gửi danh sách items mới
-            valid_items_to_set = []
-            for item in items_data:
-                if item.user == user: # Đảm bảo item thuộc về user
-                    valid_items_to_set.append(item)
-            instance.clothing_items.set(valid_items_to_set) # .set() sẽ thay thế toàn bộ items cũ
-        return instance
\ No newline at end of file
+        if item_ids is not None: # Nếu có gửi danh sách items mới
+            # Chỉ thêm/xóa phần chênh lệch so với danh sách hiện tại
+            set_outfit_items(instance, item_ids)
+        return instance
+
+
+class OutfitItemIdsSerializer(serializers.Serializer):
+    """
+    Body của các action add-items/remove-items: { "clothing_item_ids": [<id>, ...] }
+    """
+    clothing_item_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
+class OutfitSyncSerializer(serializers.ModelSerializer):
+    """
+    Bộ đồ gọn cho endpoint đồng bộ: thành viên là danh sách ID món đồ
+    (chi tiết món đồ được đồng bộ riêng).
+    """
+    clothing_items = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Outfit
+        fields = ['id', 'name', 'description', 'clothing_items', 'created_at', 'updated_at']
+
+
+class ClothingItemImportSerializer(serializers.ModelSerializer):
+    """
+    Kiểm tra các field chữ của một dòng món đồ khi import tủ đồ (app/transfer.py);
+    category và ảnh được ánh xạ riêng.
+    """
+    # auto_now_add nên ModelSerializer coi là chỉ đọc; ngày trong bản sao lưu được ghi lại sau khi tạo
+    date_added = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = ClothingItem
+        fields = ['name', 'color', 'brand', 'notes', 'date_added']
+
+
+class OutfitImportSerializer(serializers.ModelSerializer):
+    """
+    Kiểm tra một dòng bộ đồ khi import tủ đồ; thành viên nằm ở các dòng riêng.
+    """
+    created_at = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Outfit
+        fields = ['name', 'description', 'created_at']
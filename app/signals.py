@@ -0,0 +1,300 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import blobs, recommend, search, stats
+from .cache import invalidate_all, invalidate_user
+from .catalog import category_catalog
+from .timing import record_query
+from .authentication import token_cache
+from .models import ClothingCategory, ClothingItem, ImageSignature, Outfit, Tombstone
+
+# Gửi từ CustomObtainAuthToken/RegisterView sau khi cấp token cho user,
+# tham số: token
+token_issued = Signal()
+
+# pk các món đồ mà bulk_delete_items (app/bulk.py) tự cập nhật thống kê, chỉ mục và tombstone theo lô
+_bulk_deleted_items = ContextVar('bulk_deleted_items', default=frozenset())
+
+
+@contextmanager
+def bulk_deleting_items(pks):
+    """
+    Trong khối này, receiver xóa từng món đồ bỏ qua các món trong `pks`.
+    """
+    token = _bulk_deleted_items.set(frozenset(pks))
+    try:
+        yield
+    finally:
+        _bulk_deleted_items.reset(token)
+
+
+def _deletes_user(origin):
+    # Xóa user (instance hoặc queryset): thống kê, bộ đồ, chỉ mục của user bị xóa theo cascade,
+    # tombstone của user bị drop_user_tombstones xóa ngay sau đó
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def _handled_in_bulk(sender, instance, origin):
+    return _deletes_user(origin) or (sender is ClothingItem and instance.pk in _bulk_deleted_items.get())
+
+
+@receiver(token_issued)
+def prime_token_cache(sender, token, **kwargs):
+    """
+    Nạp sẵn token vừa cấp vào cache để request đầu tiên sau đăng nhập
+    không phải tra DB.
+    """
+    token_cache.set(token.key, token)
+
+
+@receiver(setting_changed)
+def reconfigure_token_cache(sender, setting, **kwargs):
+    if setting == 'TOKEN_AUTH_CACHE':
+        token_cache.configure(**token_cache.options_from_settings())
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Đo query cho Server-Timing/metrics (app/timing.py); không làm gì khi không có request đang đo
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    User bị sửa (bị khóa, đổi quyền staff, ...) thì bỏ các token đã cache của user đó.
+    """
+    if created:
+        return
+    keys = Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    token_cache.delete_user(instance.pk, keys)
+
+
+def _saves_image(update_fields):
+    return update_fields is None or 'image' in update_fields
+
+
+@receiver(pre_save, sender=ClothingItem)
+def remember_previous_image(sender, instance, update_fields=None, **kwargs):
+    if not _saves_image(update_fields):
+        return
+    if instance.pk is None:
+        previous = ''
+    elif hasattr(instance, '_loaded_image_name'):
+        previous = instance._loaded_image_name
+    else:
+        previous = ClothingItem.objects.filter(pk=instance.pk).values_list('image', flat=True).first() or ''
+    instance._previous_image_name = previous
+    # File vừa upload (FileField.pre_save sẽ ghi vào storage), để blobs.acquire() ghi lại nếu cần
+    image = instance.image
+    instance._uploaded_image = image if image and not image._committed else None
+
+
+@receiver(post_save, sender=ClothingItem)
+def count_image_references(sender, instance, update_fields=None, **kwargs):
+    """
+    Cập nhật số tham chiếu MediaBlob khi món đồ được gán ảnh mới hoặc bỏ ảnh.
+    """
+    if not _saves_image(update_fields):
+        return
+    previous = getattr(instance, '_previous_image_name', '')
+    current = instance.image.name or ''
+    uploaded = getattr(instance, '_uploaded_image', None)
+    instance._uploaded_image = None
+    if current != previous:
+        blobs.acquire(current, uploaded.file if uploaded is not None else None)
+        old_renditions = instance.renditions if instance.renditions.get('source') == previous else None
+        blobs.release(previous, old_renditions)
+        if previous:
+            # Dấu vân tay của ảnh cũ không còn đúng; worker xử lý ảnh sẽ tính lại cho ảnh mới
+            ImageSignature.objects.filter(item_id=instance.pk).delete()
+    instance._loaded_image_name = current
+
+
+@receiver(post_delete, sender=ClothingItem)
+def release_image(sender, instance, **kwargs):
+    blobs.release(instance.image.name or '', instance.renditions)
+
+
+def _saves_stats(update_fields):
+    return update_fields is None or bool(stats.STAT_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=ClothingItem)
+def remember_previous_stat_values(sender, instance, update_fields=None, **kwargs):
+    # Đọc lại từ DB và khóa dòng (ClothingItem.save chạy trong transaction), không dùng giá trị
+    # lúc load: request khác có thể đã sửa món đồ kể từ đó
+    if not _saves_stats(update_fields):
+        return
+    previous = None if instance._state.adding else stats.locked_item_values([instance.pk]).get(instance.pk)
+    instance._previous_stat_values = previous
+
+
+@receiver(post_save, sender=ClothingItem)
+def count_item_stats(sender, instance, update_fields=None, **kwargs):
+    """
+    Cập nhật thống kê tủ đồ (app/stats.py) theo category/màu/thương hiệu trước và sau khi lưu.
+    """
+    if not _saves_stats(update_fields):
+        return
+    previous = getattr(instance, '_previous_stat_values', None)
+    current = stats.item_values(instance)
+    stats.apply_item_deltas(instance.user_id, stats.item_deltas([previous] if previous else [], [current]))
+
+
+@receiver(pre_delete, sender=ClothingItem)
+def uncount_deleted_item(sender, instance, origin=None, **kwargs):
+    if _handled_in_bulk(sender, instance, origin):
+        return
+    values = stats.locked_item_values([instance.pk]).get(instance.pk)
+    if values is not None:
+        stats.apply_item_deltas(instance.user_id, stats.item_deltas(before=[values]))
+    stats.forget_memberships(instance)
+
+
+@receiver(m2m_changed, sender=Outfit.clothing_items.through)
+def touch_outfit_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Thêm/bớt món đồ cũng là sửa bộ đồ: cập nhật updated_at để ETag, thứ tự danh sách
+    và đồng bộ nhận ra thay đổi.
+    """
+    if reverse and action == 'pre_clear':
+        # item.outfits.clear(): post_clear không kèm pk_set nên ghi lại trước
+        instance._cleared_outfit_ids = list(instance.outfits.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        outfit_ids = [instance.pk]
+    elif action == 'post_clear':
+        outfit_ids = getattr(instance, '_cleared_outfit_ids', [])
+    else:
+        outfit_ids = pk_set
+    if outfit_ids:
+        Outfit.objects.filter(pk__in=outfit_ids).update(updated_at=timezone.now())
+        invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Outfit.clothing_items.through)
+def update_membership_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Cập nhật thống kê cặp món đồ cho gợi ý bộ đồ (app/recommend.py) theo phần chênh lệch
+    thành viên trước/sau thay đổi của các bộ đồ bị ảnh hưởng, và item_count của chúng.
+    """
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        if not reverse:
+            outfit_ids = [instance.pk]
+        elif action == 'pre_clear':
+            outfit_ids = list(instance.outfits.values_list('pk', flat=True))
+        else:
+            outfit_ids = pk_set
+        instance._members_before = recommend.outfit_members(outfit_ids or [])
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        before = getattr(instance, '_members_before', {})
+        after = recommend.outfit_members(before)
+        recommend.apply_deltas(instance.user_id, recommend.membership_deltas(before, after))
+        stats.set_item_counts({outfit_id: len(item_ids) for outfit_id, item_ids in after.items()})
+        if not reverse:
+            instance.item_count = len(after[instance.pk])
+
+
+@receiver(pre_delete, sender=Outfit)
+def forget_outfit_cooccurrence(sender, instance, origin=None, **kwargs):
+    # Xóa bộ đồ xóa luôn các dòng bảng trung gian mà không gửi m2m_changed
+    if _deletes_user(origin):
+        return
+    before = recommend.outfit_members([instance.pk])
+    recommend.apply_deltas(instance.user_id, recommend.membership_deltas(before, {}))
+
+
+@receiver(post_save, sender=ClothingItem)
+@receiver(post_delete, sender=ClothingItem)
+@receiver(post_save, sender=Outfit)
+@receiver(post_delete, sender=Outfit)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """
+    Món đồ/bộ đồ đổi thì bỏ cache response của chủ sở hữu (tăng phiên bản, app/cache.py).
+    """
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=ClothingItem)
+@receiver(post_save, sender=Outfit)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    """
+    Ghi lại chỉ mục tìm kiếm khi tên/thương hiệu/màu/ghi chú/mô tả có thể đã đổi (app/search.py).
+    """
+    if search.affects_index(instance, update_fields):
+        search.index_objects([instance])
+
+
+@receiver(post_delete, sender=ClothingItem)
+@receiver(post_delete, sender=Outfit)
+def remove_search_document(sender, instance, origin=None, **kwargs):
+    if _handled_in_bulk(sender, instance, origin):
+        return
+    search.unindex_object(instance)
+
+
+@receiver(post_save, sender=ClothingCategory)
+@receiver(post_delete, sender=ClothingCategory)
+def invalidate_all_responses(sender, instance, **kwargs):
+    # Category nằm trong response của mọi user
+    invalidate_all()
+
+
+@receiver(post_save, sender=ClothingCategory)
+@receiver(post_delete, sender=ClothingCategory)
+def invalidate_category_catalog(sender, instance, **kwargs):
+    category_catalog.invalidate()
+    # Lần nữa sau commit: worker khác có thể đã nạp lại bảng trước khi transaction này commit
+    transaction.on_commit(category_catalog.invalidate)
+
+
+@receiver(post_delete, sender=ClothingItem)
+@receiver(post_delete, sender=Outfit)
+@receiver(post_delete, sender=ClothingCategory)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Ghi lại việc xóa cho endpoint đồng bộ (app/sync.py).
+    """
+    if _handled_in_bulk(sender, instance, origin):
+        return
+    model = {
+        ClothingItem: Tombstone.CLOTHING_ITEM,
+        Outfit: Tombstone.OUTFIT,
+        ClothingCategory: Tombstone.CATEGORY,
+    }[sender]
+    Tombstone.objects.create(user_id=getattr(instance, 'user_id', None), model=model, object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=ClothingCategory)
+def touch_items_of_deleted_category(sender, instance, **kwargs):
+    """
+    Xóa category đặt category=NULL cho các món đồ bằng UPDATE không qua save():
+    cập nhật last_modified để các món đồ đó cũng có mặt trong lần đồng bộ sau.
+    """
+    ClothingItem.objects.filter(category=instance).update(last_modified=timezone.now())
+    stats.uncategorize(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def drop_user_tombstones(sender, instance, **kwargs):
+    # Chạy sau khi cascade đã xóa (và ghi tombstone cho) món đồ/bộ đồ của user
+    Tombstone.objects.filter(user_id=instance.pk).delete()
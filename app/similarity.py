@@ -0,0 +1,297 @@
+"""
+Phát hiện ảnh trùng và tìm món đồ giống nhau về hình ảnh.
+
+Mỗi ảnh món đồ có một ImageSignature (tính trong worker xử lý ảnh, app/tasks.py):
+- pHash: DCT 32x32 của ảnh xám, so 8x8 hệ số tần số thấp với trung vị -> 64 bit,
+- dHash: so sánh độ sáng các điểm kề nhau trên ảnh xám 9x8 -> 64 bit,
+- histogram màu RGB 4x4x4 chuẩn hóa về 0..255 (64 byte).
+
+Tra cứu theo user trên mảng NumPy, không so từng cặp ảnh:
+- Ảnh trùng (`duplicate_groups`): khoảng cách Hamming của pHash và dHash đều
+  <= DUPLICATE_DISTANCE và histogram màu gần nhau (cùng mẫu áo khác màu không phải ảnh trùng).
+  pHash được chia thành DUPLICATE_DISTANCE + 1 dải bit; theo nguyên lý Dirichlet hai hash lệch
+  nhau không quá chừng ấy bit phải trùng khít ít nhất một dải, nên chỉ các ảnh cùng giá trị
+  dải mới được so với nhau (multi-index hashing). Trong mỗi nhóm cùng giá trị dải, ảnh chỉ
+  được so với các ảnh đại diện (ảnh đầu tiên của mỗi cụm trùng trong nhóm, tối đa
+  MAX_BUCKET_REPRESENTATIVES), không sinh mọi cặp: nhóm lớn (nhiều ảnh nền trắng, ảnh chụp
+  lại nhiều lần) tốn O(số ảnh x số cụm) thay vì O(số ảnh²).
+- Ảnh giống (`similar_items`): ứng viên là các ảnh trùng pHash với ảnh cần tìm ở ít nhất một
+  trong SIMILAR_BANDS dải (tìm nhị phân trên từng dải đã sắp xếp, mọi ảnh lệch dưới
+  SIMILAR_BANDS bit đều có mặt); khoảng cách kết hợp pHash (Hamming) và histogram (giao
+  histogram) chỉ tính cho các ứng viên rồi lấy `limit` ảnh gần nhất. Ít ứng viên hơn `limit`
+  (tủ đồ nhỏ) thì xét mọi ảnh.
+
+`signature_index(user)` giữ SignatureIndex (cùng các bảng dải đã sắp xếp) trong process theo
+phiên bản dữ liệu của user (app/cache.py), chỉ dựng lại khi món đồ của user đổi.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .cache import cache_settings, get_version, user_version_key
+from .models import ImageSignature
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+HISTOGRAM_BINS = 4
+HISTOGRAM_LENGTH = HISTOGRAM_BINS ** 3
+BITS = HASH_SIZE * HASH_SIZE
+
+
+def similarity_settings():
+    options = {
+        'DUPLICATE_DISTANCE': 5, 'DUPLICATE_COLOR_DISTANCE': 0.15, 'HASH_WEIGHT': 0.6, 'MAX_SIMILAR': 50,
+        'MAX_BUCKET_REPRESENTATIVES': 64, 'SIMILAR_BANDS': 8, 'INDEX_CACHE_SIZE': 256,
+    }
+    options.update(getattr(settings, 'IMAGE_SIMILARITY', {}))
+    return options
+
+
+# --- Tính dấu vân tay -----------------------------------------------------------------------
+
+def _dct_matrix(size):
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+DCT = _dct_matrix(DCT_SIZE)
+
+
+def _bits_to_int(bits):
+    """
+    64 bit (mảng bool) -> số nguyên có dấu 64 bit để lưu vào BigIntegerField.
+    """
+    return int(np.packbits(bits.astype(np.uint8)).view('>i8')[0])
+
+
+def phash(gray):
+    pixels = np.asarray(gray.resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (DCT @ pixels @ DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # Bỏ hệ số DC (độ sáng trung bình) khỏi trung vị
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def dhash(gray):
+    pixels = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int((pixels[:, 1:] > pixels[:, :-1]).ravel())
+
+
+def color_histogram(image):
+    pixels = np.asarray(image.convert('RGB').resize((64, 64)), dtype=np.uint8).reshape(-1, 3)
+    bins = (pixels // (256 // HISTOGRAM_BINS)).astype(np.int64)
+    index = (bins[:, 0] * HISTOGRAM_BINS + bins[:, 1]) * HISTOGRAM_BINS + bins[:, 2]
+    counts = np.bincount(index, minlength=HISTOGRAM_LENGTH).astype(np.float64)
+    return np.round(counts / counts.max() * 255).astype(np.uint8).tobytes()
+
+
+def compute_signature(name, storage):
+    """
+    (phash, dhash, histogram) của file ảnh `name`. JPEG được giải mã thẳng ở độ phân giải thấp.
+    """
+    with storage.open(name, 'rb') as image_file:
+        image = Image.open(image_file)
+        image.draft('RGB', (DCT_SIZE * 4, DCT_SIZE * 4))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Nền trong suốt -> trắng, để ảnh tách nền và ảnh chụp trên nền trắng giống nhau
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        image = background
+    gray = image.convert('L')
+    return phash(gray), dhash(gray), color_histogram(image)
+
+
+def update_signature(item):
+    """
+    Đảm bảo ImageSignature khớp với ảnh hiện tại của món đồ. Ảnh cùng nội dung (cùng
+    file, app/storage.py) dùng lại dấu vân tay đã tính.
+    """
+    if not item.image:
+        ImageSignature.objects.filter(item_id=item.pk).delete()
+        return None
+    name = item.image.name
+    current = ImageSignature.objects.filter(item_id=item.pk, source=name).first()
+    if current is not None:
+        return current
+    existing = ImageSignature.objects.filter(source=name).values_list('phash', 'dhash', 'histogram').first()
+    if existing is not None:
+        values = (existing[0], existing[1], bytes(existing[2]))
+    else:
+        values = compute_signature(name, item.image.storage)
+    signature, _ = ImageSignature.objects.update_or_create(
+        item_id=item.pk,
+        defaults=dict(zip(('phash', 'dhash', 'histogram'), values), user_id=item.user_id, source=name),
+    )
+    return signature
+
+
+# --- Tra cứu ---------------------------------------------------------------------------------
+
+def _popcount(values):
+    """
+    Số bit 1 của từng phần tử uint64.
+    """
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class SignatureIndex:
+    """
+    Dấu vân tay ảnh của một user dưới dạng mảng NumPy (một query).
+    """
+    def __init__(self, user):
+        rows = list(
+            ImageSignature.objects.filter(user=user).order_by('item_id')
+            .values_list('item_id', 'phash', 'dhash', 'histogram')
+        )
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.phash = np.array([row[1] for row in rows], dtype=np.int64).view(np.uint64)
+        self.dhash = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+        histograms = b''.join(bytes(row[3]) for row in rows)
+        self.histograms = np.frombuffer(histograms, dtype=np.uint8).reshape(-1, HISTOGRAM_LENGTH).astype(np.float64)
+        norms = self.histograms.sum(axis=1, keepdims=True)
+        self.histograms /= np.where(norms == 0, 1, norms)
+        self._band_tables_cache = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _band_tables(self, bands):
+        """
+        [(bit đầu, mask, giá trị dải đã sắp xếp, chỉ số ảnh theo thứ tự đó)] khi chia pHash
+        thành `bands` dải; tính một lần cho mỗi số dải.
+        """
+        tables = self._band_tables_cache.get(bands)
+        if tables is None:
+            tables = []
+            edges = np.linspace(0, BITS, bands + 1).astype(int)
+            for start, end in zip(edges[:-1], edges[1:]):
+                mask = np.uint64((1 << (end - start)) - 1)
+                keys = (self.phash >> np.uint64(start)) & mask
+                order = np.argsort(keys, kind='stable')
+                tables.append((np.uint64(start), mask, keys[order], order))
+            self._band_tables_cache[bands] = tables
+        return tables
+
+    def _band_buckets(self, distance):
+        """
+        Các nhóm chỉ số (>= 2 ảnh) có cùng giá trị ở một dải pHash.
+        """
+        for _, _, sorted_keys, order in self._band_tables(distance + 1):
+            # Ranh giới các nhóm cùng giá trị dải
+            bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+            for group in np.split(order, bounds):
+                if len(group) > 1:
+                    yield np.sort(group)
+
+    def _band_neighbors(self, index, bands):
+        """
+        Chỉ số các ảnh (kể cả `index`) cùng giá trị với ảnh `index` ở ít nhất một dải pHash.
+        """
+        found = []
+        for start, mask, sorted_keys, order in self._band_tables(bands):
+            key = (self.phash[index] >> start) & mask
+            found.append(order[np.searchsorted(sorted_keys, key, 'left'):np.searchsorted(sorted_keys, key, 'right')])
+        return np.unique(np.concatenate(found))
+
+    def _color_distance(self, a, b):
+        return 1 - np.minimum(self.histograms[a], self.histograms[b]).sum(axis=-1)
+
+    def _close(self, index, others, distance, color_distance):
+        return (
+            (_popcount(self.phash[others] ^ self.phash[index]) <= distance)
+            & (_popcount(self.dhash[others] ^ self.dhash[index]) <= distance)
+            & (self._color_distance(others, index) <= color_distance)
+        )
+
+    def duplicate_groups(self, distance=None):
+        """
+        Các nhóm ID món đồ có ảnh gần như trùng nhau (thành phần liên thông), nhóm lớn trước.
+        """
+        options = similarity_settings()
+        if distance is None:
+            distance = options['DUPLICATE_DISTANCE']
+        color_distance, max_representatives = options['DUPLICATE_COLOR_DISTANCE'], options['MAX_BUCKET_REPRESENTATIVES']
+        if len(self) < 2:
+            return []
+        parent = list(range(len(self)))
+        linked = np.zeros(len(self), dtype=bool)
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for bucket in self._band_buckets(distance):
+            representatives = np.empty(0, dtype=np.int64)
+            for index in bucket:
+                matches = representatives[self._close(index, representatives, distance, color_distance)]
+                if len(matches):
+                    linked[index] = True
+                    linked[matches] = True
+                    for match in matches:
+                        parent[find(int(match))] = find(int(index))
+                elif len(representatives) < max_representatives:
+                    representatives = np.append(representatives, index)
+        groups = {}
+        for index in np.flatnonzero(linked):
+            groups.setdefault(find(int(index)), []).append(int(self.ids[index]))
+        return sorted(groups.values(), key=lambda group: (-len(group), group[0]))
+
+    def similar_items(self, item_id, limit):
+        """
+        [(ID món đồ, khoảng cách 0..1)] của `limit` ảnh gần ảnh của `item_id` nhất.
+        None nếu món đồ chưa có dấu vân tay.
+        """
+        index = int(np.searchsorted(self.ids, item_id))
+        if index >= len(self.ids) or self.ids[index] != item_id:
+            return None
+        options = similarity_settings()
+        weight = options['HASH_WEIGHT']
+        candidates = self._band_neighbors(index, options['SIMILAR_BANDS'])
+        if len(candidates) <= limit:
+            candidates = np.arange(len(self.ids))
+        candidates = candidates[candidates != index]
+        limit = min(limit, len(candidates))
+        if limit <= 0:
+            return []
+        hash_distance = _popcount(self.phash[candidates] ^ self.phash[index]) / BITS
+        color_distance = self._color_distance(candidates, index)
+        distances = weight * hash_distance + (1 - weight) * color_distance
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return [(int(self.ids[candidates[i]]), round(float(distances[i]), 4)) for i in nearest]
+
+
+_indexes = OrderedDict()  # user_id -> (phiên bản dữ liệu, SignatureIndex)
+_indexes_lock = threading.Lock()
+
+
+def signature_index(user):
+    """
+    SignatureIndex của user, dùng lại trong process khi phiên bản dữ liệu của user (app/cache.py)
+    chưa đổi. Phiên bản chỉ được tăng khi cache response bật, nên khi tắt thì luôn dựng mới.
+    """
+    if not cache_settings()['ENABLED']:
+        return SignatureIndex(user)
+    # Đọc phiên bản trước khi dựng: thay đổi trong lúc dựng làm lần sau dựng lại
+    version = get_version(user_version_key(user.pk))
+    with _indexes_lock:
+        cached = _indexes.get(user.pk)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(user.pk)
+            return cached[1]
+    index = SignatureIndex(user)
+    with _indexes_lock:
+        _indexes[user.pk] = (version, index)
+        _indexes.move_to_end(user.pk)
+        while len(_indexes) > similarity_settings()['INDEX_CACHE_SIZE']:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,112 @@
+"""
+Sparse fieldset cho các endpoint đọc: `?fields=id,name,thumbnail` chỉ trả các field đã chọn,
+`?expand=clothing_items` lồng bản gọn của quan hệ thay vì chỉ trả ID.
+Field lồng chọn bằng dấu chấm (`fields=id,clothing_items.thumbnail`), tự bật expand tương ứng.
+
+Khi có `fields`/`expand`, ViewSet dùng serializer gọn (`compact_serializer_class`) và
+queryset chỉ lấy các cột mà những field được chọn cần (only()).
+"""
+
+
+def parse_sparse_params(query_params):
+    """
+    Trả về (fields, expand): fields là dict {tên field: tập field lồng} hoặc None nếu
+    client không chọn; expand là tập tên quan hệ cần lồng.
+    """
+    raw_fields = [f.strip() for f in query_params.get('fields', '').split(',') if f.strip()]
+    expand = {e.strip() for e in query_params.get('expand', '').split(',') if e.strip()}
+    fields = None
+    if raw_fields:
+        fields = {}
+        for name in raw_fields:
+            top, _, nested = name.partition('.')
+            fields.setdefault(top, set())
+            if nested:
+                fields[top].add(nested)
+                expand.add(top)
+    return fields, expand
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin cho ModelSerializer gọn.
+
+    - `expandable_fields`: {tên: (serializer gọn lồng vào, kwargs)} dùng khi được expand.
+    - `field_columns`: {tên field: [cột model]} cho field không trùng tên cột; field
+      không có trong dict được coi là cần đúng cột cùng tên.
+    """
+    expandable_fields = {}
+    field_columns = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields = fields
+        self.expand = expand or set()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.expand & set(self.expandable_fields):
+            if self.requested_fields is not None and name not in self.requested_fields:
+                continue
+            serializer_class, kwargs = self.expandable_fields[name]
+            nested = (self.requested_fields or {}).get(name) or None
+            fields[name] = serializer_class(fields=dict.fromkeys(nested, set()) if nested else None, **kwargs)
+        if self.requested_fields is not None:
+            fields = {name: field for name, field in fields.items() if name in self.requested_fields}
+        return fields
+
+    @classmethod
+    def selected_names(cls, fields):
+        names = list(cls.Meta.fields)
+        return [name for name in names if name in fields] if fields is not None else names
+
+    @classmethod
+    def columns_for(cls, fields):
+        """
+        Các cột model cần để serialize `fields` (None = mọi field), luôn gồm 'id'.
+        """
+        columns = {'id'}
+        for name in cls.selected_names(fields):
+            if name in cls.expandable_fields:
+                continue  # Quan hệ được prefetch riêng
+            columns.update(cls.field_columns.get(name, [name]))
+        return sorted(columns)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Mixin cho ViewSet: với GET có `?fields=`/`?expand=`, dùng `compact_serializer_class`
+    và truyền lựa chọn field vào serializer. Queryset nên dùng `sparse_columns()` để chỉ
+    lấy các cột cần thiết.
+    """
+    compact_serializer_class = None
+
+    @property
+    def sparse_params(self):
+        if not hasattr(self, '_sparse_params'):
+            request = getattr(self, 'request', None)
+            params = (None, set())
+            if request is not None and request.method in ('GET', 'HEAD'):
+                query_params = getattr(request, 'query_params', request.GET)
+                if 'fields' in query_params or 'expand' in query_params:
+                    params = parse_sparse_params(query_params)
+            self._sparse_params = params
+        return self._sparse_params
+
+    def use_compact_serializer(self):
+        fields, expand = self.sparse_params
+        return fields is not None or bool(expand)
+
+    def get_serializer_class(self):
+        if self.use_compact_serializer():
+            return self.compact_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.use_compact_serializer():
+            kwargs['fields'], kwargs['expand'] = self.sparse_params
+        return super().get_serializer(*args, **kwargs)
+
+    def sparse_columns(self, *always):
+        fields, _ = self.sparse_params
+        return sorted(set(self.compact_serializer_class.columns_for(fields)) | set(always))
@@ -0,0 +1,196 @@
+"""
+Thống kê tủ đồ cho màn hình chính (GET /api/stats/) và số món đồ của từng bộ đồ.
+
+WardrobeStat giữ số món đồ của mỗi user theo category/màu/thương hiệu, Outfit.item_count giữ
+số thành viên của bộ đồ. Cả hai được cộng/trừ theo phần chênh lệch trong cùng transaction với
+thay đổi: signals (app/signals.py) cho save/delete/m2m, gọi trực tiếp ở các đường ghi bulk
+(app/bulk.py, app/transfer.py). Đọc thống kê là một query trên các dòng của user, không phụ
+thuộc số món đồ.
+
+Lệnh `rebuild_stats` tính lại từ bảng món đồ/bảng trung gian và sửa phần bị lệch (ví dụ
+sau khi sửa DB bằng SQL tay hoặc queryset.update()).
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .catalog import category_catalog
+from .membership import OutfitItems
+from .models import ClothingItem, Outfit, WardrobeStat
+from .recommend import retry_on_conflict
+
+# Cột của ClothingItem theo từng thuộc tính thống kê
+DIMENSION_COLUMNS = {
+    WardrobeStat.CATEGORY: 'category_id',
+    WardrobeStat.COLOR: 'color',
+    WardrobeStat.BRAND: 'brand',
+}
+# Field mà save(update_fields=...) phải có thì thống kê mới có thể đổi
+STAT_FIELDS = {'category', 'category_id', 'color', 'brand'}
+
+
+def _stat_value(value):
+    return '' if value is None else str(value)
+
+
+def item_values(item):
+    return item.category_id, item.color, item.brand
+
+
+def locked_item_values(pks):
+    """
+    {pk: item_values()} đang có trong DB, khóa các dòng tới hết transaction: hai lần sửa
+    đồng thời cùng một món đồ không cùng trừ một giá trị cũ.
+    """
+    rows = ClothingItem.objects.select_for_update().filter(pk__in=pks).values_list('pk', 'category_id', 'color', 'brand')
+    return {pk: tuple(values) for pk, *values in rows}
+
+
+def item_keys(values):
+    return [(dimension, _stat_value(value)) for dimension, value in zip(DIMENSION_COLUMNS, values)]
+
+
+def item_deltas(before=(), after=()):
+    """
+    Thay đổi số đếm {(thuộc tính, giá trị): delta} khi các món đồ đổi từ `before` sang
+    `after` (list các bộ giá trị item_values(); món đồ mới/bị xóa chỉ có ở một bên).
+    """
+    deltas = Counter()
+    for values in before:
+        deltas.subtract(item_keys(values))
+    for values in after:
+        deltas.update(item_keys(values))
+    return {key: value for key, value in deltas.items() if value}
+
+
+@retry_on_conflict
+def apply_item_deltas(user_id, deltas):
+    """
+    Cộng `deltas` vào WardrobeStat của user: khóa các dòng liên quan, sửa/tạo bằng bulk,
+    xóa dòng về 0 (như recommend.apply_deltas, kể cả việc chạy lại khi hai bên cùng tạo dòng).
+    """
+    if not deltas:
+        return
+    rows = WardrobeStat.objects.select_for_update().filter(
+        user_id=user_id, dimension__in={dimension for dimension, _ in deltas},
+        value__in={value for _, value in deltas},
+    )
+    existing = {(row.dimension, row.value): row for row in rows}
+    changed, created, removed = [], [], []
+    for (dimension, value), delta in deltas.items():
+        row = existing.get((dimension, value))
+        if row is None:
+            if delta > 0:
+                created.append(WardrobeStat(user_id=user_id, dimension=dimension, value=value, count=delta))
+        elif row.count + delta > 0:
+            row.count += delta
+            changed.append(row)
+        else:
+            removed.append(row.pk)
+    if changed:
+        WardrobeStat.objects.bulk_update(changed, ['count'], batch_size=500)
+    if created:
+        WardrobeStat.objects.bulk_create(created, batch_size=500)
+    if removed:
+        WardrobeStat.objects.filter(pk__in=removed).delete()
+
+
+def uncategorize(category_id):
+    """
+    Category bị xóa: món đồ của nó thành không có category (SET_NULL bằng UPDATE, không qua save()).
+    """
+    key = (WardrobeStat.CATEGORY, _stat_value(category_id))
+    rows = WardrobeStat.objects.filter(dimension=key[0], value=key[1]).values_list('user_id', 'count')
+    for user_id, count in rows:
+        apply_item_deltas(user_id, {key: -count, (WardrobeStat.CATEGORY, ''): count})
+
+
+def set_item_counts(counts):
+    """
+    Ghi item_count theo {outfit_id: số món đồ}, một UPDATE cho mỗi số đếm khác nhau.
+    """
+    by_count = defaultdict(list)
+    for outfit_id, count in counts.items():
+        by_count[count].append(outfit_id)
+    for count, outfit_ids in by_count.items():
+        Outfit.objects.filter(pk__in=outfit_ids).update(item_count=count)
+
+
+def forget_memberships(item):
+    """
+    Món đồ sắp bị xóa: các dòng bảng trung gian bị xóa theo mà không gửi m2m_changed.
+    """
+    Outfit.objects.filter(clothing_items=item, item_count__gt=0).update(item_count=F('item_count') - 1)
+
+
+def forget_items(user_id, pks):
+    """
+    Như uncount/forget_memberships cho nhiều món đồ của user sắp bị xóa cùng lúc
+    (bulk_delete_items): một query khóa, một apply_item_deltas và một UPDATE item_count
+    đếm lại từ bảng trung gian, không phụ thuộc số món đồ.
+    """
+    values = locked_item_values(pks)
+    apply_item_deltas(user_id, item_deltas(before=values.values()))
+    memberships = OutfitItems.objects.filter(clothingitem_id__in=pks)
+    remaining = OutfitItems.objects.filter(outfit_id=OuterRef('pk')).exclude(clothingitem_id__in=pks).order_by()
+    remaining = remaining.values('outfit_id').annotate(count=Count('pk')).values('count')
+    Outfit.objects.filter(pk__in=memberships.values('outfit_id')).update(item_count=Coalesce(Subquery(remaining), 0))
+
+
+def wardrobe_stats(user):
+    """
+    {'total_items', 'categories': [{id, name, count}], 'colors'/'brands': [{value, count}]}
+    của `user`, đọc từ WardrobeStat (một query) và category_catalog. Giá trị trống (không có
+    category/màu/thương hiệu) chỉ được tính vào total_items.
+    """
+    names = category_catalog.get().names
+    result = {'total_items': 0, 'categories': [], 'colors': [], 'brands': []}
+    rows = WardrobeStat.objects.filter(user=user).order_by('-count', 'value').values_list('dimension', 'value', 'count')
+    for dimension, value, count in rows:
+        if dimension == WardrobeStat.CATEGORY:
+            result['total_items'] += count
+            if value:
+                result['categories'].append({'id': int(value), 'name': names.get(int(value)), 'count': count})
+        elif value:
+            result[f'{dimension}s'].append({'value': value, 'count': count})
+    return result
+
+
+def rebuild_stats():
+    """
+    Tính lại WardrobeStat và Outfit.item_count, chỉ ghi những chỗ khác với hiện tại.
+    Trả về (số dòng thống kê đã sửa, số bộ đồ đã sửa item_count).
+    """
+    expected = Counter()
+    for dimension, column in DIMENSION_COLUMNS.items():
+        rows = ClothingItem.objects.order_by().values_list('user_id', column).annotate(count=Count('id'))
+        for user_id, value, count in rows:
+            expected[user_id, dimension, _stat_value(value)] += count
+
+    changed, removed = [], []
+    for row in WardrobeStat.objects.all().iterator():
+        count = expected.pop((row.user_id, row.dimension, row.value), 0)
+        if count == 0:
+            removed.append(row.pk)
+        elif count != row.count:
+            row.count = count
+            changed.append(row)
+    created = [
+        WardrobeStat(user_id=user_id, dimension=dimension, value=value, count=count)
+        for (user_id, dimension, value), count in expected.items()
+    ]
+    WardrobeStat.objects.filter(pk__in=removed).delete()
+    WardrobeStat.objects.bulk_update(changed, ['count'], batch_size=500)
+    WardrobeStat.objects.bulk_create(created, batch_size=500)
+
+    actual = Counter(
+        OutfitItems.objects.order_by().values_list('outfit_id', flat=True).iterator()
+    )
+    drifted = {
+        pk: actual[pk]
+        for pk, item_count in Outfit.objects.values_list('pk', 'item_count').iterator()
+        if actual[pk] != item_count
+    }
+    set_item_counts(drifted)
+    return len(removed) + len(changed) + len(created), len(drifted)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def hash_file(content):
+    """
+    SHA-256 của một File/UploadedFile, đọc theo từng chunk.
+    """
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Lưu file theo hash nội dung: `<thư mục upload_to>/<2 ký tự đầu>/<sha256><đuôi file>`.
+    Upload trùng nội dung sẽ dùng lại file đã có thay vì tạo bản sao có hậu tố ngẫu nhiên.
+
+    Hash được lấy từ `content.content_hash` nếu upload handler (app/uploadhandlers.py)
+    đã tính sẵn trong lúc nhận file, ngược lại đọc lại file để tính.
+    Việc xóa file không còn món đồ nào dùng do MediaBlob (đếm tham chiếu) đảm nhận.
+    """
+
+    def content_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        stem, extension = os.path.splitext(filename)
+        if stem == digest:  # Tên đã là hash (ví dụ rendition), giữ nguyên
+            return name
+        return os.path.join(directory, digest[:2], digest + extension.lower()).replace('\\', '/')
+
+    def get_available_name(self, name, max_length=None):
+        # Tên thật được quyết định trong _save() theo nội dung, không cần tìm tên trống
+        return name
+
+    def _save(self, name, content):
+        """
+        Ghi ra file tạm cùng thư mục rồi os.link vào tên theo hash: hai upload cùng nội dung
+        ghi đồng thời thì một bên thấy FileExistsError và dùng file của bên kia (FileSystemStorage
+        sẽ thử lại mãi với cùng một tên). Việc file có thật còn đó hay không được kiểm tra lại
+        trong blobs.acquire(), khi đang giữ khóa dòng MediaBlob.
+        """
+        digest = getattr(content, 'content_hash', None) or hash_file(content)
+        name = self.content_name(name, digest)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as destination:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    destination.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            try:
+                os.link(temp_path, full_path)
+            except FileExistsError:
+                pass  # Request khác vừa ghi cùng nội dung
+        finally:
+            os.unlink(temp_path)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return content_addressed_storage
@@ -0,0 +1,212 @@
+"""
+Đồng bộ theo thay đổi (delta sync) cho app mobile: `/api/sync/?since=<token>` chỉ trả
+các category, món đồ, bộ đồ (kèm danh sách món đồ thành viên) được tạo/sửa, và các
+bản ghi bị xóa (Tombstone), kể từ lần đồng bộ trước.
+
+Token là chuỗi opaque (base64 JSON). Trong một lượt đồng bộ, các trang dùng chung mốc
+trên `until` (thời điểm bắt đầu lượt) và đi lần lượt qua từng nguồn theo keyset
+(timestamp, id) tăng dần. Token của lượt sau lùi lại OVERLAP_SECONDS so với `until`
+để không bỏ sót transaction ghi timestamp trước `until` nhưng commit sau đó; client
+upsert theo id nên nhận trùng vài dòng là vô hại.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import ClothingCategory, ClothingItem, Outfit, Tombstone
+from .serializers import ClothingCategorySerializer, ClothingItemSerializer, OutfitSyncSerializer
+
+
+def sync_settings():
+    options = {'PAGE_SIZE': 500, 'MAX_PAGE_SIZE': 2000, 'OVERLAP_SECONDS': 5, 'TOMBSTONE_RETENTION_DAYS': 90}
+    options.update(getattr(settings, 'SYNC', {}))
+    return options
+
+
+class SyncToken:
+    """
+    Vị trí đồng bộ. `since` None nghĩa là đồng bộ lần đầu (lấy toàn bộ).
+    `until`, `source`, `last` chỉ có khi đang ở giữa một lượt nhiều trang.
+    """
+    invalid_message = 'Invalid sync token'
+
+    def __init__(self, since=None, until=None, source=0, last=None):
+        self.since = since
+        self.until = until
+        self.source = source
+        self.last = last  # (timestamp, id) của dòng cuối trang trước trong nguồn `source`
+
+    def encode(self):
+        raw = {'s': self.since.isoformat() if self.since else None}
+        if self.until is not None:
+            raw.update({'u': self.until.isoformat(), 'p': self.source})
+            if self.last:
+                raw.update({'t': self.last[0].isoformat(), 'i': self.last[1]})
+        return base64.urlsafe_b64encode(json.dumps(raw, separators=(',', ':')).encode()).decode('ascii')
+
+    @classmethod
+    def decode(cls, encoded):
+        if not encoded:
+            return cls()
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            parse = lambda value: datetime.fromisoformat(value) if value else None
+            last = (parse(raw['t']), int(raw['i'])) if 't' in raw else None
+            return cls(parse(raw['s']), parse(raw.get('u')), int(raw.get('p', 0)), last)
+        except (TypeError, ValueError, KeyError, AttributeError, UnicodeError, binascii.Error):
+            raise NotFound(cls.invalid_message)
+
+    def is_expired(self):
+        """
+        Tombstone cũ đã bị dọn: token quá hạn không còn biết được các lần xóa, client phải đồng bộ lại từ đầu.
+        """
+        retention = timedelta(days=sync_settings()['TOMBSTONE_RETENTION_DAYS'])
+        return self.since is not None and self.since < timezone.now() - retention
+
+
+class ChangeSource:
+    """
+    Một loại dữ liệu được đồng bộ: queryset theo user, cột timestamp và cách serialize.
+    """
+    def __init__(self, key, timestamp_field, get_queryset, serialize, deletions=False):
+        self.key = key
+        self.timestamp_field = timestamp_field
+        self.get_queryset = get_queryset
+        self.serialize = serialize
+        self.deletions = deletions
+
+    def changes(self, user, token, until):
+        field = self.timestamp_field
+        queryset = self.get_queryset(user).filter(**{f'{field}__lte': until})
+        if token.since is not None:
+            queryset = queryset.filter(**{f'{field}__gt': token.since})
+        if token.last:
+            timestamp, pk = token.last
+            # Như KeysetPagination: `>=` tách riêng để DB seek được trên index
+            queryset = queryset.filter(
+                Q(**{f'{field}__gte': timestamp}),
+                Q(**{f'{field}__gt': timestamp}) | Q(id__gt=pk),
+            )
+        return queryset.order_by(field, 'id')
+
+
+def _items(user):
+    return ClothingItem.objects.filter(user=user).select_related('user')
+
+
+def _outfits(user):
+    members = ClothingItem.objects.only('id')
+    return Outfit.objects.filter(user=user).prefetch_related(Prefetch('clothing_items', queryset=members))
+
+
+def _tombstones(user):
+    return Tombstone.objects.filter(Q(user=user) | Q(user__isnull=True))
+
+
+def _serialize_tombstones(rows, context):
+    return [{'model': row.model, 'id': row.object_id} for row in rows]
+
+
+SOURCES = [
+    ChangeSource(
+        'categories', 'updated_at', lambda user: ClothingCategory.objects.all(),
+        lambda rows, context: ClothingCategorySerializer(rows, many=True).data,
+    ),
+    ChangeSource(
+        'clothing_items', 'last_modified', _items,
+        lambda rows, context: ClothingItemSerializer(rows, many=True, context=context).data,
+    ),
+    ChangeSource(
+        'outfits', 'updated_at', _outfits,
+        lambda rows, context: OutfitSyncSerializer(rows, many=True).data,
+    ),
+    ChangeSource('deleted', 'deleted_at', _tombstones, _serialize_tombstones, deletions=True),
+]
+
+
+def _applicable(source, token):
+    # Lần đồng bộ đầu tiên client chưa có gì để xóa
+    return not (source.deletions and token.since is None)
+
+
+def next_sync_token(until):
+    return SyncToken(since=until - timedelta(seconds=sync_settings()['OVERLAP_SECONDS']))
+
+
+def sync_page(user, token, page_size, context):
+    """
+    Một trang thay đổi, tối đa `page_size` dòng gộp từ các nguồn. Trả về (dữ liệu, token tiếp theo,
+    còn trang sau hay không). Khi hết trang, token là mốc cho lượt đồng bộ kế tiếp.
+    """
+    until = token.until or timezone.now()
+    data = {source.key: [] for source in SOURCES}
+    remaining = page_size
+    for index in range(token.source, len(SOURCES)):
+        source = SOURCES[index]
+        if not _applicable(source, token):
+            continue
+        position = token if index == token.source else SyncToken(token.since)
+        rows = list(source.changes(user, position, until)[:remaining + 1])
+        has_more = len(rows) > remaining
+        rows = rows[:remaining]
+        data[source.key] = source.serialize(rows, context)
+        remaining -= len(rows)
+        if has_more:
+            last = rows[-1]
+            last = (getattr(last, source.timestamp_field), last.pk)
+            return data, SyncToken(token.since, until, index, last), True
+        if remaining == 0 and index + 1 < len(SOURCES):
+            return data, SyncToken(token.since, until, index + 1), True
+    return data, next_sync_token(until), False
+
+
+def stream_changes(user, token, context, chunk_size=500):
+    """
+    Toàn bộ thay đổi dạng NDJSON (mỗi dòng một bản ghi), đọc DB theo từng chunk bằng
+    iterator() nên bộ nhớ không tăng theo kích thước tủ đồ. Dòng cuối chứa token
+    cho lần đồng bộ sau.
+    """
+    # Stream luôn đi hết một lượt, nên chỉ dùng mốc `since` của token (bỏ qua vị trí trang nếu có)
+    token = SyncToken(token.since)
+    until = timezone.now()
+    for source in SOURCES:
+        if not _applicable(source, token):
+            continue
+        chunk = []
+        rows = source.changes(user, token, until)
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield from _ndjson_lines(source, chunk, context)
+                chunk = []
+        yield from _ndjson_lines(source, chunk, context)
+    yield json.dumps({'type': 'token', 'since': next_sync_token(until).encode()}) + '\n'
+
+
+def _ndjson_lines(source, rows, context):
+    for record in source.serialize(rows, context):
+        yield json.dumps({'type': source.key, 'data': record}, cls=JSONEncoder) + '\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Cho phép chọn `?format=ndjson` / `Accept: application/x-ndjson` trên SyncView.
+    Dữ liệu đồng bộ được stream trực tiếp (stream_changes); renderer này chỉ dùng
+    cho các response thường như lỗi.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=JSONEncoder).encode() + b'\n'
@@ -0,0 +1,160 @@
+"""
+Xử lý ảnh nền: API chỉ lưu file gốc rồi trả về ngay, việc kiểm tra ảnh và
+tạo rendition do worker (`python manage.py process_images`) làm sau.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .images import update_item_fields, update_renditions
+from .models import ClothingItem, ImageJob
+from .similarity import update_signature
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def processing_is_async():
+    return getattr(settings, 'IMAGE_PROCESSING_ASYNC', True)
+
+
+def schedule_image_processing(item):
+    """
+    Gọi sau khi lưu món đồ. Nếu ảnh chưa có rendition tương ứng thì đưa vào hàng đợi
+    (hoặc xử lý luôn khi IMAGE_PROCESSING_ASYNC=False, ví dụ khi dev/test).
+    """
+    if not item.image:
+        if item.renditions:  # Ảnh đã bị gỡ: bỏ các rendition cũ
+            update_renditions(item)
+        return
+    if item.renditions.get('source') == item.image.name:
+        return
+    if not processing_is_async():
+        try:
+            process_item_image(item)
+        except InvalidImage:
+            logger.info('Invalid image for clothing item #%s', item.pk)
+        return
+    with transaction.atomic():
+        update_item_fields(item, image_status=ClothingItem.IMAGE_PROCESSING)
+        if not ImageJob.objects.filter(item=item, status=ImageJob.PENDING).exists():
+            ImageJob.objects.create(item=item)
+
+
+def schedule_bulk_image_processing(items):
+    """
+    Như schedule_image_processing cho các món đồ vừa bulk_create/bulk_update
+    (image_status đã được đặt là processing trước khi ghi): tạo job bằng một bulk_create.
+    """
+    items = [item for item in items if item.renditions.get('source') != item.image.name]
+    if not items:
+        return
+    if not processing_is_async():
+        for item in items:
+            try:
+                process_item_image(item)
+            except InvalidImage:
+                logger.info('Invalid image for clothing item #%s', item.pk)
+        return
+    pending = set(
+        ImageJob.objects.filter(item__in=items, status=ImageJob.PENDING).values_list('item_id', flat=True)
+    )
+    ImageJob.objects.bulk_create([ImageJob(item=item) for item in items if item.pk not in pending])
+
+
+def verify_image(item):
+    """
+    Kiểm tra đầy đủ file ảnh (việc này trước đây chạy ngay trong request upload).
+    """
+    try:
+        with item.image.storage.open(item.image.name, 'rb') as f:
+            Image.open(f).verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        raise InvalidImage(str(exc)) from exc
+
+
+def process_item_image(item):
+    """
+    Kiểm tra ảnh, tạo rendition và dấu vân tay ảnh (app/similarity.py) cho một món đồ,
+    cập nhật image_status.
+    """
+    try:
+        with timed('image'):  # Khi chạy ngay trong request (IMAGE_PROCESSING_ASYNC=False)
+            if item.image:
+                verify_image(item)
+            update_renditions(item)
+            update_signature(item)
+    except InvalidImage:
+        update_item_fields(item, image_status=ClothingItem.IMAGE_FAILED)
+        raise
+    update_item_fields(item, image_status=ClothingItem.IMAGE_READY)
+
+
+def claim_jobs(limit):
+    """
+    Nhận tối đa `limit` job đang chờ. UPDATE có điều kiện status=pending đảm bảo
+    mỗi job chỉ được một worker nhận, chạy được trên cả SQLite lẫn PostgreSQL.
+    """
+    claimed = []
+    candidates = ImageJob.objects.filter(status=ImageJob.PENDING).values_list('pk', flat=True)[:limit]
+    for pk in candidates:
+        updated = ImageJob.objects.filter(pk=pk, status=ImageJob.PENDING).update(
+            status=ImageJob.RUNNING, attempts=F('attempts') + 1, updated_at=timezone.now()
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Đưa các job 'running' quá lâu (worker chết giữa chừng) về lại hàng đợi.
+    """
+    return ImageJob.objects.filter(
+        status=ImageJob.RUNNING, updated_at__lt=timezone.now() - older_than
+    ).update(status=ImageJob.PENDING)
+
+
+def run_image_job(job_id):
+    """
+    Chạy một job đã được claim. Hàm ở mức module để ProcessPoolExecutor pickle được.
+    """
+    try:
+        job = ImageJob.objects.select_related('item').get(pk=job_id)
+    except ImageJob.DoesNotExist:  # Món đồ đã bị xóa trong lúc chờ
+        return None
+    try:
+        process_item_image(job.item)
+    except InvalidImage as exc:
+        job.status, job.error = ImageJob.FAILED, str(exc)
+    except Exception as exc:
+        logger.exception('Image job #%s failed', job_id)
+        job.error = repr(exc)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = ImageJob.FAILED
+            update_item_fields(job.item, image_status=ClothingItem.IMAGE_FAILED)
+        else:
+            job.status = ImageJob.PENDING
+    else:
+        job.status, job.error = ImageJob.DONE, ''
+    updated = ImageJob.objects.filter(pk=job_id).update(status=job.status, error=job.error, updated_at=timezone.now())
+    if not updated:  # Món đồ (và job) bị xóa trong lúc xử lý
+        return None
+    return job.status
+
+
+def process_pending_jobs(limit=100):
+    """
+    Xử lý tuần tự các job đang chờ trong process hiện tại (dùng cho --sync và test).
+    """
+    return [run_image_job(pk) for pk in claim_jobs(limit)]
@@ -1,3 +1,1713 @@
+import hashlib
+import io
+import json
+import shutil
+import tarfile
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, include, path, re_path
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from PIL import Image, ImageDraw
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import asyncviews, blobs, stats, tasks, urls as app_urls
+from .authentication import TokenCache, get_or_create_token, token_cache
+from .cache import cache_stats
+from .catalog import CategoryCatalog, category_catalog
+from .loadtest.dataset import Scale, build_dataset
+from .loadtest.report import compare, summarize
+from .loadtest.runner import ClientTransport, replay
+from .loadtest.scenarios import SCENARIOS
+from .models import (
+    ClothingCategory, ClothingItem, ImageJob, ImageSignature, ItemCooccurrence, MediaBlob, Outfit, SearchDocument,
+    WardrobeStat,
+)
+from .recommend import retry_on_conflict
+from .similarity import SignatureIndex, signature_index
+from .sync import SyncToken
+from .tasks import process_pending_jobs
+from .timing import request_metrics
+
+
+class WardrobeTestMixin:
+    """
+    Tạo user, category và dữ liệu mẫu dùng chung cho các test API.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret-pass-123')
+        self.other = User.objects.create_user(username='bob', password='secret-pass-123')
+        self.categories = [
+            ClothingCategory.objects.create(name=f'Category {i}') for i in range(3)
+        ]
+        category_catalog.get()  # Số query đếm trong test không gồm lần nạp catalog đầu tiên
+        # SECURE_SSL_REDIRECT bật khi DEBUG=False, nên mọi request test đều đi qua HTTPS
+        self.client = APIClient(HTTP_X_FORWARDED_PROTO='https')
+        self.client.force_authenticate(user=self.user)
+
+    def make_items(self, count, user=None):
+        user = user or self.user
+        return [
+            ClothingItem.objects.create(
+                user=user,
+                name=f'Item {i}',
+                category=self.categories[i % len(self.categories)],
+                color='red',
+                brand='Brand',
+            )
+            for i in range(count)
+        ]
+
+    def make_outfit(self, items, name='Outfit'):
+        outfit = Outfit.objects.create(user=self.user, name=name)
+        outfit.clothing_items.set(items)
+        return outfit
+
+    def count_queries(self, method, url, data=None, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, **kwargs)
+        self.assertLess(response.status_code, 300, response.content)
+        return len(ctx.captured_queries)
+
+
+class QueryBudgetTests(WardrobeTestMixin, TestCase):
+    """
+    Số query của các đường đọc không được tăng theo kích thước dữ liệu (N+1).
+    """
+    def assertConstantQueries(self, build, request):
+        """
+        Chạy `request` với dữ liệu nhỏ và lớn, số query phải bằng nhau.
+        Lần gọi đầu chỉ để làm nóng các cache trong process (bảng category, app/fastpath.py).
+        """
+        request(build(2))
+        small = request(build(2))
+        large = request(build(8))
+        self.assertEqual(small, large, 'Số query tăng theo kích thước dữ liệu')
+
+    def test_clothing_item_list(self):
+        def build(n):
+            ClothingItem.objects.all().delete()
+            self.make_items(n)
+        self.assertConstantQueries(build, lambda _: self.count_queries('get', '/api/clothing-items/'))
+
+    def test_clothing_item_retrieve(self):
+        item = self.make_items(1)[0]
+        queries = self.count_queries('get', f'/api/clothing-items/{item.pk}/')
+        # 1 query lấy món đồ (đã join category, user) + 2 query aggregate cho ETag
+        self.assertLessEqual(queries, 3)
+
+    def test_outfit_list(self):
+        def build(n):
+            Outfit.objects.all().delete()
+            items = self.make_items(n)
+            for i in range(n):
+                self.make_outfit(items, name=f'Outfit {i}')
+        self.assertConstantQueries(build, lambda _: self.count_queries('get', '/api/outfits/'))
+
+    def test_outfit_retrieve(self):
+        def build(n):
+            return self.make_outfit(self.make_items(n))
+        self.assertConstantQueries(
+            build, lambda outfit: self.count_queries('get', f'/api/outfits/{outfit.pk}/')
+        )
+
+    def test_bulk_delete(self):
+        def build(n):
+            items = self.make_items(n + 1)
+            self.make_outfit(items)
+            return [item.pk for item in items[1:]]
+        self.assertConstantQueries(
+            build, lambda ids: self.count_queries('post', '/api/clothing-items/bulk-delete/', {'ids': ids}, format='json')
+        )
+        self.assertEqual(SearchDocument.objects.count(), ClothingItem.objects.count() + Outfit.objects.count())
+        self.assertEqual(stats.rebuild_stats(), (0, 0))  # Thống kê và item_count không bị lệch
+
+    def test_outfit_add_item(self):
+        def build(n):
+            items = self.make_items(n + 1)
+            return self.make_outfit(items[:-1]), items[-1]
+        self.assertConstantQueries(
+            build,
+            lambda args: self.count_queries(
+                'post', f'/api/outfits/{args[0].pk}/add-item/', {'clothing_item_id': args[1].pk}
+            ),
+        )
+
+    def test_outfit_remove_item(self):
+        def build(n):
+            items = self.make_items(n)
+            return self.make_outfit(items), items[0]
+        self.assertConstantQueries(
+            build,
+            lambda args: self.count_queries(
+                'post', f'/api/outfits/{args[0].pk}/remove-item/', {'clothing_item_id': args[1].pk}
+            ),
+        )
+
+
+    def test_outfit_create_with_items(self):
+        self.assertConstantQueries(
+            lambda n: [item.pk for item in self.make_items(n)],
+            lambda ids: self.count_queries('post', '/api/outfits/', {'name': 'New', 'clothing_items': ids}, format='json'),
+        )
+
+    def test_outfit_update_items(self):
+        def build(n):
+            items = self.make_items(2 * n)
+            return self.make_outfit(items[:n]), [item.pk for item in items[n // 2:]]
+        self.assertConstantQueries(
+            build,
+            lambda args: self.count_queries(
+                'patch', f'/api/outfits/{args[0].pk}/', {'clothing_items': args[1]}, format='json'
+            ),
+        )
+
+    def test_outfit_add_items(self):
+        def build(n):
+            items = self.make_items(2 * n)
+            return self.make_outfit(items[:n]), [item.pk for item in items]
+        self.assertConstantQueries(
+            build,
+            lambda args: self.count_queries(
+                'post', f'/api/outfits/{args[0].pk}/add-items/', {'clothing_item_ids': args[1]}, format='json'
+            ),
+        )
+
+    def test_outfit_remove_items(self):
+        def build(n):
+            items = self.make_items(n)
+            return self.make_outfit(items), [item.pk for item in items[:n // 2]]
+        self.assertConstantQueries(
+            build,
+            lambda args: self.count_queries(
+                'post', f'/api/outfits/{args[0].pk}/remove-items/', {'clothing_item_ids': args[1]}, format='json'
+            ),
+        )
+
+
+class KeysetPaginationTests(WardrobeTestMixin, TestCase):
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_clothing_items_walk_all_pages(self):
+        items = self.make_items(25)
+        # Nhiều dòng trùng last_modified: thứ tự phải dựa thêm vào id
+        ClothingItem.objects.filter(pk__in=[i.pk for i in items[:12]]).update(
+            last_modified=items[0].last_modified
+        )
+        expected = list(
+            ClothingItem.objects.filter(user=self.user)
+            .order_by('-last_modified', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('/api/clothing-items/?pagination=keyset'), expected)
+
+    def test_outfits_walk_all_pages(self):
+        for i in range(13):
+            self.make_outfit([], name=f'Outfit {i}')
+        expected = list(
+            Outfit.objects.filter(user=self.user)
+            .order_by('-updated_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('/api/outfits/?pagination=keyset'), expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/clothing-items/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_is_default(self):
+        self.make_items(3)
+        response = self.client.get('/api/clothing-items/')
+        self.assertEqual(response.data['count'], 3)
+
+
+@override_settings(TOKEN_AUTH_CACHE={'SHARED_CACHE_ALIAS': 'default'})
+class CachedTokenAuthenticationTests(WardrobeTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient(HTTP_X_FORWARDED_PROTO='https')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/clothing-items/')
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_second_request_needs_no_auth_query(self):
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_login_primes_cache(self):
+        self.token.delete()
+        response = APIClient(HTTP_X_FORWARDED_PROTO='https').post(
+            '/api/auth/login/', {'username': 'alice', 'password': 'secret-pass-123'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+        self.assertEqual(self.auth_queries(), [])
+        token, created = get_or_create_token(self.user)
+        self.assertEqual((created, token.created), (False, Token.objects.get(user=self.user).created))
+
+    @override_settings(TOKEN_AUTH_CACHE={})
+    def test_no_process_cache_without_shared_tier(self):
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(len(self.auth_queries()), 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.auth_queries()
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/clothing-items/').status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.auth_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/clothing-items/').status_code, 401)
+
+    def test_revocation_reaches_other_workers(self):
+        caches['default'].clear()
+        worker, other_worker = TokenCache(shared_cache_alias='default'), TokenCache(shared_cache_alias='default')
+        worker.set(self.token.key, self.token)
+        self.assertIsNotNone(other_worker.get(self.token.key))  # Giờ nằm trong LRU của other_worker
+        worker.delete(self.token.key, self.user.pk)
+        self.assertIsNone(other_worker.get(self.token.key))
+
+        worker.set(self.token.key, self.token)
+        self.assertIsNotNone(other_worker.get(self.token.key))
+        worker.delete_user(self.user.pk, [self.token.key])
+        self.assertIsNone(other_worker.get(self.token.key))
+
+
+class AuthHashingTests(WardrobeTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_X_FORWARDED_PROTO='https')
+        caches['default'].clear()
+
+    def login(self, password='secret-pass-123', **extra):
+        return self.client.post('/api/auth/login/', {'username': 'alice', 'password': password}, **extra)
+
+    def test_login_and_register_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 2)  # SELECT user + upsert token
+        self.assertEqual(response.data['user']['username'], 'alice')
+        self.assertEqual(self.login().data['token'], response.data['token'])
+        self.assertEqual(self.login('wrong').status_code, 400)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                '/api/auth/register/', {'username': 'carol', 'email': 'c@example.com', 'password': 'another-pass-456'}
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(Token.objects.get(user__username='carol').key, response.data['token'])
+        self.assertEqual(set(response.data['user']), {'id', 'username', 'email', 'first_name', 'last_name'})
+        self.assertTrue(User.objects.get(username='carol').check_password('another-pass-456'))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_hash_upgrade_is_opt_in(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('secret-pass-123', hasher='md5'))
+        self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).password.startswith('md5$'))
+        with override_settings(AUTH_HASHING={'UPGRADE_HASHES': True}):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_rate_limit_and_busy_pool(self):
+        with override_settings(AUTH_HASHING={'RATE': '2/min'}):
+            self.assertEqual([self.login().status_code for _ in range(3)], [200, 200, 429])
+            self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+        caches['default'].clear()
+        with override_settings(AUTH_HASHING={'RATE': '2/min', 'GLOBAL_RATE': '3/min'}):
+            statuses = [self.login(REMOTE_ADDR=f'10.0.0.{n}').status_code for n in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        with override_settings(AUTH_HASHING={'MAX_PENDING': 0, 'QUEUE_TIMEOUT': 0}):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.login().status_code, 200)
+
+
+class CategoryCatalogTests(WardrobeTestMixin, TestCase):
+    def category_queries(self, method, url, data=None, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format='json', **kwargs)
+        self.assertLess(response.status_code, 300, response.content)
+        return response, [q['sql'] for q in ctx.captured_queries if 'app_clothingcategory' in q['sql']]
+
+    def test_items_and_categories_need_no_category_query(self):
+        category = self.categories[1]
+        response, queries = self.category_queries('post', '/api/clothing-items/', {'name': 'Áo', 'category': category.pk})
+        self.assertEqual(queries, [])
+        self.assertEqual(response.data['category_detail'], {'id': category.pk, 'name': category.name})
+        item_id = response.data['id']
+        with override_settings(FAST_READ_PATH=False):
+            response, queries = self.category_queries('get', f'/api/clothing-items/{item_id}/')
+            self.assertEqual((queries, response.data['category_name']), ([], category.name))
+            response, queries = self.category_queries('get', '/api/clothing-items/')
+            self.assertEqual((queries, response.data['results'][0]['category_detail']['name']), ([], category.name))
+        response, queries = self.category_queries('get', '/api/categories/')
+        self.assertEqual(queries, [])
+        self.assertEqual([c['name'] for c in response.data['results']], ['Category 0', 'Category 1', 'Category 2'])
+        response, queries = self.category_queries('get', f'/api/categories/{category.pk}/')
+        self.assertEqual((queries, response.data), ([], {'id': category.pk, 'name': category.name}))
+
+        response = self.client.post('/api/clothing-items/', {'name': 'Áo', 'category': 999999}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['category'][0].code, 'does_not_exist')
+        self.assertEqual(self.client.get('/api/categories/999999/').status_code, 404)
+
+    def test_save_and_delete_refresh_catalog(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        category = self.categories[0]
+        category.name = 'Áo khoác'
+        category.save()
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Áo khoác', [c['name'] for c in response.data['results']])
+        self.categories[2].delete()
+        self.assertEqual(self.client.get('/api/categories/').data['count'], 2)
+
+    @override_settings(CATEGORY_CATALOG={'VERSION_CACHE_ALIAS': 'default', 'MAX_AGE': None})
+    def test_other_workers_reload_on_version_change(self):
+        other_worker = CategoryCatalog()
+        self.assertEqual(len(other_worker.get().categories), 3)
+        ClothingCategory.objects.create(name='Mới')
+        self.assertIn('Mới', other_worker.get().names.values())
+        # Sửa không qua save(): chỉ thấy khi hết MAX_AGE
+        ClothingCategory.objects.filter(name='Mới').update(name='Mới hơn')
+        self.assertIn('Mới', other_worker.get().names.values())
+        with override_settings(CATEGORY_CATALOG={'VERSION_CACHE_ALIAS': 'default', 'MAX_AGE': 0}):
+            self.assertIn('Mới hơn', other_worker.get().names.values())
+
+
+class MediaTestMixin(WardrobeTestMixin):
+    """
+    Ghi file upload vào thư mục tạm thay vì media/ của repo.
+    """
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_image_file(self, name='photo.jpg', size=(1200, 900), color=(200, 30, 30)):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'  # Make
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class RenditionTests(MediaTestMixin, TestCase):
+    def test_upload_creates_renditions(self):
+        response = self.client.post(
+            '/api/clothing-items/', {'name': 'Shirt', 'image': self.make_image_file()}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        urls = response.data['image_urls']
+        self.assertEqual(set(urls), {'thumb', 'medium', 'original'})
+
+        item = ClothingItem.objects.get(pk=response.data['id'])
+        for size_name, max_side in (('thumb', 200), ('medium', 800)):
+            with default_storage.open(item.renditions[size_name]) as f:
+                rendition = Image.open(f)
+                self.assertLessEqual(max(rendition.size), max_side)
+                self.assertFalse(rendition.getexif())
+            self.assertIn(item.renditions[size_name].rsplit('/', 1)[-1], urls[size_name])
+
+    def test_same_content_reuses_rendition_files(self):
+        first = self.client.post(
+            '/api/clothing-items/', {'name': 'A', 'image': self.make_image_file('a.jpg')}, format='multipart'
+        )
+        second = self.client.post(
+            '/api/clothing-items/', {'name': 'B', 'image': self.make_image_file('b.jpg')}, format='multipart'
+        )
+        self.assertEqual(first.data['image_urls']['thumb'], second.data['image_urls']['thumb'])
+
+    def test_item_without_image(self):
+        response = self.client.post('/api/clothing-items/', {'name': 'No image'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['image_urls'])
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class ImageProcessingQueueTests(MediaTestMixin, TestCase):
+    def upload(self, upload):
+        response = self.client.post('/api/clothing-items/', {'name': 'Shirt', 'image': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def test_upload_returns_before_processing(self):
+        response = self.upload(self.make_image_file())
+        self.assertEqual(response.data['image_status'], 'processing')
+        # Chưa có rendition: thumb tạm dùng ảnh gốc
+        self.assertEqual(response.data['image_urls']['thumb'], response.data['image_urls']['original'])
+        self.assertEqual(ImageJob.objects.filter(status=ImageJob.PENDING).count(), 1)
+
+        self.assertEqual(process_pending_jobs(), [ImageJob.DONE])
+        response = self.client.get(f'/api/clothing-items/{response.data["id"]}/')
+        self.assertEqual(response.data['image_status'], 'ready')
+        self.assertNotEqual(response.data['image_urls']['thumb'], response.data['image_urls']['original'])
+
+    def test_corrupt_image_is_marked_failed(self):
+        response = self.upload(SimpleUploadedFile('broken.jpg', b'not really a jpeg', content_type='image/jpeg'))
+        self.assertEqual(process_pending_jobs(), [ImageJob.FAILED])
+        item = ClothingItem.objects.get(pk=response.data['id'])
+        self.assertEqual(item.image_status, ClothingItem.IMAGE_FAILED)
+
+    def test_decompression_bomb_fails_without_retry(self):
+        response = self.upload(self.make_image_file())
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 10):
+            self.assertEqual(process_pending_jobs(), [ImageJob.FAILED])
+        self.assertEqual(ImageJob.objects.get(item_id=response.data['id']).attempts, 1)
+
+    def test_item_deleted_while_processing(self):
+        self.upload(self.make_image_file())
+        with mock.patch.object(tasks, 'process_item_image', side_effect=lambda item: item.delete()):
+            self.assertEqual(process_pending_jobs(), [None])
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_rejects_non_image_extension(self):
+        response = self.client.post(
+            '/api/clothing-items/',
+            {'name': 'Shirt', 'image': SimpleUploadedFile('notes.txt', b'hello')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ContentAddressedStorageTests(MediaTestMixin, TestCase):
+    def upload(self, name):
+        response = self.client.post(
+            '/api/clothing-items/', {'name': name, 'image': self.make_image_file(f'{name}.jpg')}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return ClothingItem.objects.get(pk=response.data['id'])
+
+    def test_duplicate_uploads_share_one_blob(self):
+        first, second = self.upload('first'), self.upload('second')
+        self.assertEqual(first.image.name, second.image.name)
+        digest = hashlib.sha256(default_storage.open(first.image.name).read()).hexdigest()
+        self.assertEqual(first.image.name, f'clothing_images/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).ref_count, 2)
+
+    def test_blob_deleted_with_last_reference(self):
+        first, second = self.upload('first'), self.upload('second')
+        name, thumb = first.image.name, first.renditions['thumb']
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/clothing-items/{second.pk}/')
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(thumb))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_replacing_image_releases_old_blob(self):
+        item = self.upload('first')
+        old_name = item.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/clothing-items/{item.pk}/',
+                {'image': self.make_image_file('new.jpg', color=(10, 200, 10))},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(default_storage.exists(old_name))
+        item.refresh_from_db()
+        self.assertEqual(MediaBlob.objects.get(name=item.image.name).ref_count, 1)
+
+    def test_reused_blob_survives_pending_delete(self):
+        item = self.upload('first')
+        name = item.image.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            item.delete()
+        self.upload('second')  # Cùng nội dung, trước khi file của món đã xóa bị dọn
+        for callback in callbacks:
+            callback()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+        # File bị xóa giữa lúc lưu vào storage và lúc acquire(): được ghi lại từ upload
+        default_storage.delete(name)
+        blobs.acquire(name, self.make_image_file('again.jpg'))
+        self.assertTrue(default_storage.exists(name))
+
+
+class ConditionalRequestTests(WardrobeTestMixin, TestCase):
+    def test_list_not_modified(self):
+        self.make_items(3)
+        response = self.client.get('/api/clothing-items/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get('/api/clothing-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        ClothingItem.objects.create(user=self.user, name='New')
+        response = self.client.get('/api/clothing-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_category_renamed(self):
+        item = self.make_items(1)[0]
+        etag = self.client.get(f'/api/clothing-items/{item.pk}/')['ETag']
+        item.category.name = 'Renamed'
+        item.category.save()
+        response = self.client.get(f'/api/clothing-items/{item.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_outfit_etag_changes_on_membership_change(self):
+        items = self.make_items(2)
+        outfit = self.make_outfit(items[:1])
+        etag = self.client.get(f'/api/outfits/{outfit.pk}/')['ETag']
+        list_etag = self.client.get('/api/outfits/')['ETag']
+        outfit.clothing_items.add(items[1])
+        self.assertEqual(self.client.get(f'/api/outfits/{outfit.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/outfits/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_categories_not_modified(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        self.assertEqual(self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_match_on_write(self):
+        item = self.make_items(1)[0]
+        url = f'/api/clothing-items/{item.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.patch(url, {'name': 'First edit'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+
+        # Bản sửa dựa trên ETag cũ bị từ chối
+        response = self.client.patch(url, {'name': 'Stale edit'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        item.refresh_from_db()
+        self.assertEqual(item.name, 'First edit')
+
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=new_etag).status_code, 204)
+
+    def test_interleaved_writes_with_same_etag(self):
+        item = self.make_items(1)[0]
+        url = f'/api/clothing-items/{item.pk}/'
+        etag = self.client.get(url)['ETag']
+        other = APIClient(HTTP_X_FORWARDED_PROTO='https')
+        other.force_authenticate(user=self.user)
+        responses = {}
+
+        def precondition_then_concurrent_write(request, **kwargs):
+            # Lệnh ghi thứ hai chạy xong ngay sau khi lệnh đầu đã qua kiểm tra If-Match
+            result = get_conditional_response(request, **kwargs)
+            if 'second' not in responses:
+                responses['second'] = None
+                responses['second'] = other.patch(url, {'name': 'Second edit'}, HTTP_IF_MATCH=etag)
+            return result
+
+        with mock.patch('app.conditional.get_conditional_response', precondition_then_concurrent_write):
+            response = self.client.patch(url, {'name': 'First edit'}, HTTP_IF_MATCH=etag)
+        self.assertEqual((responses['second'].status_code, response.status_code), (200, 412))
+        item.refresh_from_db()
+        self.assertEqual(item.name, 'Second edit')
+
+    def test_missing_object_is_404(self):
+        response = self.client.get('/api/clothing-items/999999/', HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300})
+class ResponseCacheTests(WardrobeTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        cache_stats.reset()
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.make_items(3)
+        first = self.count_queries('get', '/api/clothing-items/')
+        second = self.count_queries('get', '/api/clothing-items/')
+        self.assertLess(second, first)
+        self.assertEqual(cache_stats.snapshot()['clothingitem-list'], {'hits': 1, 'misses': 1})
+
+    def test_item_change_invalidates(self):
+        item = self.make_items(1)[0]
+        self.client.get(f'/api/clothing-items/{item.pk}/')
+        item.name = 'Renamed'
+        item.save()
+        response = self.client.get(f'/api/clothing-items/{item.pk}/')
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_response_cached_before_commit_is_not_served(self):
+        item = self.make_items(1)[0]
+        url = f'/api/clothing-items/{item.pk}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            item.name = 'Renamed'
+            item.save()
+            # Request khác đọc dòng chưa commit (tên cũ) và lưu response dưới phiên bản mới
+            ClothingItem.objects.filter(pk=item.pk).update(name='Item 0')
+            self.assertEqual(self.client.get(url).data['name'], 'Item 0')
+            ClothingItem.objects.filter(pk=item.pk).update(name='Renamed')
+        self.assertEqual(self.client.get(url).data['name'], 'Renamed')
+
+    def test_membership_change_invalidates_outfits(self):
+        items = self.make_items(2)
+        outfit = self.make_outfit(items[:1])
+        self.client.get('/api/outfits/')
+        outfit.clothing_items.add(items[1])
+        response = self.client.get('/api/outfits/')
+        self.assertEqual(len(response.data['results'][0]['clothing_items_details']), 2)
+
+    def test_category_change_invalidates_every_user(self):
+        item = self.make_items(1)[0]
+        self.client.get('/api/clothing-items/')
+        item.category.name = 'Renamed'
+        item.category.save()
+        response = self.client.get('/api/clothing-items/')
+        self.assertEqual(response.data['results'][0]['category_name'], 'Renamed')
+
+    def test_users_do_not_share_entries(self):
+        self.make_items(2)
+        self.make_items(1, user=self.other)
+        self.client.get('/api/clothing-items/')
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get('/api/clothing-items/').data['count'], 1)
+
+    def test_stats_endpoint_requires_admin(self):
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 200)
+
+
+class BulkClothingItemTests(MediaTestMixin, TestCase):
+    url = '/api/clothing-items/bulk/'
+
+    def test_bulk_create_reports_each_element(self):
+        payload = [
+            {'name': 'Shirt', 'category': self.categories[0].pk},
+            {'category': self.categories[1].pk},  # Thiếu name
+            {'name': 'Hat', 'category': 999999},
+        ]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 207, response.content)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], [201, 400, 400])
+        self.assertIn('name', results[1]['errors'])
+        self.assertIn('category', results[2]['errors'])
+        self.assertEqual(results[0]['data']['category_detail']['id'], self.categories[0].pk)
+        self.assertEqual(list(ClothingItem.objects.values_list('name', flat=True)), ['Shirt'])
+
+    def test_bulk_create_uses_constant_queries(self):
+        def create(n):
+            return self.count_queries('post', self.url, {'items': [{'name': f'Item {i}'} for i in range(n)]}, format='json')
+        self.assertEqual(create(2), create(20))
+        self.assertEqual(ClothingItem.objects.filter(user=self.user).count(), 22)
+
+    def test_atomic_creates_nothing_on_error(self):
+        response = self.client.post(self.url + '?atomic=true', [{'name': 'Ok'}, {'name': ''}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClothingItem.objects.exists())
+
+    def test_multipart_with_images(self):
+        items = [{'name': 'A', 'image': 'first'}, {'name': 'B', 'image': 'second'}, {'name': 'C'}]
+        data = {
+            'items': json.dumps(items),
+            'first': self.make_image_file('a.jpg'),
+            'second': self.make_image_file('b.jpg'),  # Cùng nội dung với a.jpg
+        }
+        response = self.client.post(self.url, data, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        created = ClothingItem.objects.order_by('name')
+        self.assertEqual([item.image_status for item in created], ['processing', 'processing', 'ready'])
+        self.assertEqual(created[0].image.name, created[1].image.name)
+        self.assertEqual(MediaBlob.objects.get(name=created[0].image.name).ref_count, 2)
+        self.assertEqual(ImageJob.objects.filter(status=ImageJob.PENDING).count(), 2)
+
+        process_pending_jobs()
+        self.assertEqual(set(ClothingItem.objects.values_list('image_status', flat=True)), {'ready'})
+
+    def test_bulk_update(self):
+        items = self.make_items(3)
+        foreign = self.make_items(1, user=self.other)[0]
+        payload = [
+            {'id': items[0].pk, 'color': 'green'},
+            {'id': items[1].pk, 'name': ''},
+            {'id': foreign.pk, 'color': 'green'},
+        ]
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual([r['status'] for r in response.data['results']], [200, 400, 404])
+        items[0].refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(items[0].color, 'green')
+        self.assertEqual(foreign.color, 'red')
+        self.assertGreater(items[0].last_modified, items[2].last_modified)
+
+    def test_bulk_update_swapping_images_keeps_files(self):
+        first, second = [
+            self.client.post(
+                '/api/clothing-items/', {'name': name, 'image': self.make_image_file(name + '.jpg', color=color)},
+                format='multipart',
+            ).data['id']
+            for name, color in (('a', (10, 10, 10)), ('b', (240, 240, 240)))
+        ]
+        names = dict(ClothingItem.objects.values_list('pk', 'image'))
+        data = {
+            'items': json.dumps([{'id': first, 'image': 'new'}, {'id': second, 'image': 'old'}]),
+            'new': self.make_image_file('c.jpg', color=(90, 90, 250)),
+            'old': self.make_image_file('a.jpg', color=(10, 10, 10)),  # Nội dung ảnh cũ của `first`
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, data, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(ClothingItem.objects.get(pk=second).image.name, names[first])
+        self.assertTrue(default_storage.exists(names[first]))
+        self.assertFalse(MediaBlob.objects.filter(name=names[second]).exists())
+        self.assertEqual(MediaBlob.objects.get(name=names[first]).ref_count, 1)
+
+    def test_bulk_delete(self):
+        items = self.make_items(3)
+        foreign = self.make_items(1, user=self.other)[0]
+        response = self.client.post(
+            '/api/clothing-items/bulk-delete/', {'ids': [items[0].pk, items[1].pk, foreign.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.data['results']], [204, 204, 404])
+        self.assertEqual(list(ClothingItem.objects.filter(user=self.user)), [items[2]])
+        self.assertTrue(ClothingItem.objects.filter(pk=foreign.pk).exists())
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_batch_size_limit(self):
+        response = self.client.post(self.url, [{'name': str(i)} for i in range(3)], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SyncTests(WardrobeTestMixin, TestCase):
+    url = '/api/sync/'
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def full_sync(self, since=None, page_size=None):
+        """
+        Đi hết các trang của một lượt đồng bộ, gộp kết quả.
+        """
+        merged = {'categories': [], 'clothing_items': [], 'outfits': [], 'deleted': []}
+        params = {'page_size': page_size} if page_size else {}
+        while True:
+            data = self.sync(since, **params)
+            for key in merged:
+                merged[key] += data[key]
+            since = data['since']
+            if not data['has_more']:
+                return merged, since
+
+    def test_first_sync_returns_everything_across_pages(self):
+        items = self.make_items(7)
+        self.make_items(2, user=self.other)
+        outfit = self.make_outfit(items[:3])
+        data, _ = self.full_sync(page_size=3)
+        self.assertEqual(sorted(i['id'] for i in data['clothing_items']), sorted(i.pk for i in items))
+        self.assertEqual(len(data['categories']), 3)
+        self.assertEqual(data['outfits'][0]['id'], outfit.pk)
+        self.assertEqual(sorted(data['outfits'][0]['clothing_items']), sorted(i.pk for i in items[:3]))
+        self.assertEqual(data['deleted'], [])
+
+    def test_incremental_sync_returns_only_changes(self):
+        items = self.make_items(4)
+        outfit = self.make_outfit(items[:2])
+        _, since = self.full_sync()
+
+        with self.settings(SYNC={'OVERLAP_SECONDS': 0}):
+            _, since = self.full_sync(since)  # Token không lùi mốc để kiểm tra chính xác
+            self.client.patch(f'/api/clothing-items/{items[0].pk}/', {'color': 'blue'}, format='json')
+            self.client.delete(f'/api/clothing-items/{items[1].pk}/')
+            self.client.post(f'/api/outfits/{outfit.pk}/add-item/', {'clothing_item_id': items[3].pk}, format='json')
+            deleted_category = self.categories[2].pk
+            self.categories[2].delete()
+            data, _ = self.full_sync(since)
+
+        self.assertEqual(sorted(i['id'] for i in data['clothing_items']), sorted([items[0].pk, items[2].pk]))
+        self.assertEqual([o['id'] for o in data['outfits']], [outfit.pk])
+        self.assertIn(items[3].pk, data['outfits'][0]['clothing_items'])
+        self.assertEqual(data['categories'], [])
+        self.assertCountEqual(data['deleted'], [
+            {'model': 'clothing_item', 'id': items[1].pk},
+            {'model': 'category', 'id': deleted_category},
+        ])
+
+    def test_other_users_deletions_are_hidden(self):
+        foreign = self.make_items(1, user=self.other)[0]
+        _, since = self.full_sync()
+        foreign.delete()
+        data, _ = self.full_sync(since)
+        self.assertEqual(data['deleted'], [])
+
+    def test_bulk_and_user_deletions(self):
+        items = self.make_items(3)
+        _, since = self.full_sync()
+        with self.settings(SYNC={'OVERLAP_SECONDS': 0}):
+            _, since = self.full_sync(since)
+            ids = [items[0].pk, items[1].pk]
+            self.client.post('/api/clothing-items/bulk-delete/', {'ids': ids}, format='json')
+            data, _ = self.full_sync(since)
+        self.assertCountEqual(data['deleted'], [{'model': 'clothing_item', 'id': pk} for pk in ids])
+
+        self.make_items(3, user=self.other)
+        with CaptureQueriesContext(connection) as ctx:
+            self.other.delete()
+        # Tombstone của user bị xóa không được ghi rồi xóa ngay
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "app_tombstone"')])
+
+    def test_ndjson_stream(self):
+        self.make_items(3)
+        response = self.client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(sum(1 for line in lines if line['type'] == 'clothing_items'), 3)
+        self.assertEqual(lines[-1]['type'], 'token')
+
+    def test_expired_and_invalid_tokens(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'garbage'}).status_code, 404)
+        old = SyncToken(since=timezone.now() - timedelta(days=365)).encode()
+        self.assertEqual(self.client.get(self.url, {'since': old}).status_code, 410)
+
+
+class OutfitMembershipTests(WardrobeTestMixin, TestCase):
+    def test_foreign_items_are_rejected(self):
+        mine = self.make_items(2)
+        foreign = self.make_items(1, user=self.other)[0]
+        response = self.client.post(
+            '/api/outfits/', {'name': 'Mixed', 'clothing_items': [mine[0].pk, foreign.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('clothing_items', response.data)
+        self.assertFalse(Outfit.objects.exists())
+
+        outfit = self.make_outfit(mine[:1])
+        response = self.client.post(
+            f'/api/outfits/{outfit.pk}/add-items/', {'clothing_item_ids': [mine[1].pk, foreign.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['invalid_ids'], [foreign.pk])
+        self.assertEqual(list(outfit.clothing_items.all()), [mine[0]])
+
+    def test_update_applies_only_the_difference(self):
+        items = self.make_items(4)
+        outfit = self.make_outfit(items[:3])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(
+                f'/api/outfits/{outfit.pk}/', {'clothing_items': [items[1].pk, items[2].pk, items[3].pk]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        through = Outfit.clothing_items.through._meta.db_table
+        writes = [q['sql'] for q in ctx.captured_queries if through in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 2)  # Một DELETE cho items[0], một INSERT cho items[3]
+        self.assertEqual(sorted(i['id'] for i in response.data['clothing_items_details']), [i.pk for i in items[1:]])
+
+    def test_batch_actions(self):
+        items = self.make_items(4)
+        outfit = self.make_outfit(items[:1])
+        response = self.client.post(
+            f'/api/outfits/{outfit.pk}/add-items/', {'clothing_item_ids': [i.pk for i in items]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(outfit.clothing_items.count(), 4)
+        response = self.client.post(
+            f'/api/outfits/{outfit.pk}/remove-items/', {'clothing_item_ids': [items[0].pk, items[1].pk, 999999]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(i['id'] for i in response.data['clothing_items_details']), [items[2].pk, items[3].pk])
+
+    def test_single_item_actions_keep_their_responses(self):
+        items = self.make_items(2)
+        outfit = self.make_outfit(items[:1])
+        url = f'/api/outfits/{outfit.pk}'
+        self.assertEqual(self.client.post(f'{url}/add-item/', {'clothing_item_id': items[0].pk}).data,
+                         {'message': 'Clothing item already in this outfit.'})
+        self.assertEqual(self.client.post(f'{url}/remove-item/', {'clothing_item_id': items[1].pk}).status_code, 400)
+        self.assertEqual(self.client.post(f'{url}/remove-item/', {'clothing_item_id': 999999}).status_code, 404)
+
+
+class SparseFieldsetTests(WardrobeTestMixin, TestCase):
+    def test_item_fields(self):
+        self.make_items(2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/clothing-items/', {'fields': 'id,name,thumbnail'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'thumbnail'})
+        select = [q['sql'] for q in ctx.captured_queries if 'app_clothingitem"."name"' in q['sql']][0]
+        self.assertNotIn('"notes"', select)
+        self.assertNotIn('app_clothingcategory', select)
+
+    def test_outfit_grid(self):
+        items = self.make_items(3)
+        outfit = self.make_outfit(items)
+        response = self.client.get(
+            f'/api/outfits/{outfit.pk}/', {'fields': 'id,name,clothing_items.id,clothing_items.thumbnail'}
+        )
+        self.assertEqual(set(response.data), {'id', 'name', 'clothing_items'})
+        self.assertEqual(
+            sorted(response.data['clothing_items'], key=lambda i: i['id']),
+            [{'id': item.pk, 'thumbnail': None} for item in items],
+        )
+
+        response = self.client.get(f'/api/outfits/{outfit.pk}/', {'fields': 'id,clothing_items'})
+        self.assertEqual(sorted(response.data['clothing_items']), [item.pk for item in items])
+
+        response = self.client.get(f'/api/outfits/{outfit.pk}/', {'expand': 'clothing_items'})
+        self.assertIn('category', response.data['clothing_items'][0])
+        self.assertNotIn('notes', response.data['clothing_items'][0])
+
+    def test_outfit_grid_constant_queries(self):
+        def run(n):
+            Outfit.objects.all().delete()
+            for _ in range(n):
+                self.make_outfit(self.make_items(3))
+            return self.count_queries('get', '/api/outfits/', {'fields': 'id,clothing_items.thumbnail'})
+        self.assertEqual(run(2), run(6))
+
+    def test_default_representation_unchanged(self):
+        outfit = self.make_outfit(self.make_items(1))
+        response = self.client.get(f'/api/outfits/{outfit.pk}/')
+        self.assertIn('clothing_items_details', response.data)
+        self.assertIn('category_detail', response.data['clothing_items_details'][0])
+
+
+class FastReadPathTests(WardrobeTestMixin, TestCase):
+    """
+    Đường đọc nhanh (app/fastpath.py) phải trả JSON giống hệt serializer DRF.
+    """
+    def setUp(self):
+        super().setUp()
+        items = self.make_items(5)
+        items[0].category = None
+        items[0].notes = 'Ghi chú'
+        items[0].save()
+        ClothingItem.objects.filter(pk=items[1].pk).update(
+            image='clothing_images/ab/áo thun 1.jpg',
+            renditions={'source': 'clothing_images/ab/áo thun 1.jpg', 'thumb': 'clothing_images/renditions/x_thumb.webp'},
+        )
+        ClothingItem.objects.filter(pk=items[2].pk).update(image='clothing_images/cd/legacy.png')
+        self.make_outfit(items[:3], name='A')
+        self.make_outfit([], name='B')
+
+    def assertSameJson(self, url, params=None):
+        fast = self.client.get(url, params)
+        with self.settings(FAST_READ_PATH=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_clothing_item_list_parity(self):
+        self.assertSameJson('/api/clothing-items/')
+        self.assertSameJson('/api/clothing-items/', {'pagination': 'keyset', 'page_size': 2})
+        cursor = self.client.get('/api/clothing-items/', {'pagination': 'keyset', 'page_size': 2}).data['next']
+        self.assertSameJson(cursor)
+
+    def test_outfit_list_parity(self):
+        self.assertSameJson('/api/outfits/')
+        self.assertSameJson('/api/outfits/', {'pagination': 'keyset', 'page_size': 1})
+
+    def test_category_rename_is_visible(self):
+        self.client.get('/api/clothing-items/')
+        self.categories[1].name = 'Renamed'
+        self.categories[1].save()
+        response = self.client.get('/api/clothing-items/')
+        self.assertIn('Renamed', [item['category_name'] for item in response.data['results']])
+
+
+class SearchTests(WardrobeTestMixin, TestCase):
+    url = '/api/clothing-items/search/'
+
+    def setUp(self):
+        super().setUp()
+        make = lambda user=self.user, **fields: ClothingItem.objects.create(user=user, **fields)
+        self.shirt = make(name='Áo sơ mi trắng', brand='Uniqlo', color='Trắng', category=self.categories[0])
+        self.tee = make(name='Áo thun', brand='Zara', color='Đen', category=self.categories[0])
+        self.jeans = make(name='Quần jean', brand='Uniqlo', color='Xanh', notes='Mặc đi làm', category=self.categories[1])
+        make(user=self.other, name='Áo khoác', brand='Uniqlo')
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(item['id'] for item in response.data['results'])
+
+    def test_text_search_ignores_accents_and_matches_prefixes(self):
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'ao'})), sorted([self.shirt.pk, self.tee.pk]))
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'SO MI'})), [self.shirt.pk])
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'di lam'})), [self.jeans.pk])
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'uniq'})), sorted([self.shirt.pk, self.jeans.pk]))
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'khoac'})), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.client.patch(f'/api/clothing-items/{self.tee.pk}/', {'name': 'Váy hoa'}, format='json')
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'vay'})), [self.tee.pk])
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'thun'})), [])
+        self.client.delete(f'/api/clothing-items/{self.tee.pk}/')
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'vay'})), [])
+
+        response = self.client.post('/api/clothing-items/bulk/', [{'name': 'Giày thể thao'}], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(self.ids(self.client.get(self.url, {'q': 'giay'}))), 1)
+
+    def test_facets_and_filters(self):
+        response = self.client.get(self.url, {'brand': 'Uniqlo'})
+        self.assertEqual(self.ids(response), sorted([self.shirt.pk, self.jeans.pk]))
+        facets = response.data['facets']
+        # Facet đang lọc vẫn đếm trên kết quả chưa lọc theo chính nó
+        self.assertEqual(facets['brand'], [{'value': 'Uniqlo', 'count': 2}, {'value': 'Zara', 'count': 1}])
+        self.assertEqual(
+            facets['category'],
+            [{'id': self.categories[0].pk, 'name': 'Category 0', 'count': 1},
+             {'id': self.categories[1].pk, 'name': 'Category 1', 'count': 1}],
+        )
+
+        response = self.client.get(self.url, {'q': 'ao', 'category': self.categories[0].pk, 'color': 'Đen'})
+        self.assertEqual(self.ids(response), [self.tee.pk])
+        self.assertEqual(self.client.get(self.url, {'category': 'x'}).status_code, 400)
+
+    def test_outfit_search(self):
+        outfit = self.make_outfit([self.shirt], name='Đi biển')
+        outfit.description = 'Mùa hè'
+        outfit.save()
+        self.make_outfit([self.jeans], name='Công sở')
+        response = self.client.get('/api/outfits/search/', {'q': 'mua he'})
+        self.assertEqual(self.ids(response), [outfit.pk])
+        self.assertIn('clothing_items_details', response.data['results'][0])
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'ao'})), [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.ids(self.client.get(self.url, {'q': 'ao'})), sorted([self.shirt.pk, self.tee.pk]))
+
+
+class RecommendationTests(WardrobeTestMixin, TestCase):
+    url = '/api/outfits/recommend/'
+
+    def setUp(self):
+        super().setUp()
+        top, bottom, shoes = self.categories
+        make = lambda name, category, color='': ClothingItem.objects.create(
+            user=self.user, name=name, category=category, color=color,
+        )
+        self.shirt = make('Shirt', top, 'white')
+        self.tee = make('Tee', top, 'black')
+        self.jeans = make('Jeans', bottom, 'blue')
+        self.chinos = make('Chinos', bottom, 'beige')
+        self.sneakers = make('Sneakers', shoes, 'white')
+        self.loafers = make('Loafers', shoes, 'brown')
+
+    def pairs(self):
+        return {
+            (row.item_a_id, row.item_b_id): row.count
+            for row in ItemCooccurrence.objects.filter(user=self.user)
+        }
+
+    def test_statistics_follow_membership_changes(self):
+        casual = self.make_outfit([self.tee, self.jeans, self.sneakers])
+        office = self.make_outfit([self.shirt, self.chinos], name='Office')
+        office.clothing_items.add(self.loafers)
+        casual.clothing_items.remove(self.sneakers)
+        self.jeans.outfits.add(office)
+        self.chinos.outfits.clear()
+        incremental = self.pairs()
+        call_command('rebuild_recommendations', stdout=io.StringIO())
+        self.assertEqual(incremental, self.pairs())
+        self.assertEqual(incremental[self.shirt.pk, self.jeans.pk], 1)
+
+        office.delete()
+        self.assertEqual(self.pairs(), {
+            (self.tee.pk, self.tee.pk): 1, (self.jeans.pk, self.jeans.pk): 1, (self.tee.pk, self.jeans.pk): 1,
+        })
+
+    def test_conflicting_first_insert_is_retried(self):
+        attempts = []
+
+        @retry_on_conflict
+        def add_pair():
+            attempts.append(1)
+            ItemCooccurrence.objects.create(user=self.user, item_a=self.tee, item_b=self.jeans, count=len(attempts))
+            if len(attempts) == 1:  # Như khi request khác vừa tạo cùng cặp
+                raise IntegrityError('duplicate key value violates unique constraint')
+
+        add_pair()
+        self.assertEqual(self.pairs(), {(self.tee.pk, self.jeans.pk): 2})
+
+    def test_recommends_items_worn_together(self):
+        for _ in range(2):
+            self.make_outfit([self.tee, self.jeans, self.sneakers])
+        self.make_outfit([self.shirt, self.chinos, self.loafers])
+        response = self.client.get(self.url, {'item': self.tee.pk, 'count': 2})
+        self.assertEqual(response.status_code, 200, response.content)
+        first = response.data['results'][0]
+        self.assertEqual(first['clothing_items'], [self.tee.pk, self.jeans.pk, self.sneakers.pk])
+        self.assertEqual([item['id'] for item in first['clothing_items_details']], first['clothing_items'])
+        # Gợi ý sau không dùng lại các món đã gợi ý, và mỗi category chỉ một món
+        for suggestion in response.data['results'][1:]:
+            self.assertNotIn(self.jeans.pk, suggestion['clothing_items'])
+            self.assertNotIn(self.shirt.pk, suggestion['clothing_items'])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['clothing_items'][0], self.tee.pk)
+
+    def test_foreign_or_invalid_item(self):
+        foreign = self.make_items(1, user=self.other)[0]
+        self.assertEqual(self.client.get(self.url, {'item': foreign.pk}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'count': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).data, {'results': []})
+
+
+class WardrobeStatsTests(WardrobeTestMixin, TestCase):
+    url = '/api/stats/'
+
+    def counts(self, user=None):
+        return {
+            (row.dimension, row.value): row.count
+            for row in WardrobeStat.objects.filter(user=user or self.user)
+        }
+
+    def assert_rebuild_keeps(self):
+        incremental = self.counts()
+        item_counts = dict(Outfit.objects.values_list('pk', 'item_count'))
+        call_command('rebuild_stats', stdout=io.StringIO())
+        self.assertEqual(self.counts(), incremental)
+        self.assertEqual(dict(Outfit.objects.values_list('pk', 'item_count')), item_counts)
+
+    def test_counts_follow_item_changes(self):
+        shirt, pants, hat = self.make_items(3)
+        top = str(self.categories[0].pk)
+        shirt.color = 'blue'
+        shirt.save()
+        pants.category = None
+        pants.save(update_fields=['category'])
+        hat.delete()
+        self.assertEqual(self.counts(), {
+            ('category', top): 1, ('category', ''): 1, ('color', 'blue'): 1, ('color', 'red'): 1, ('brand', 'Brand'): 2,
+        })
+        self.assert_rebuild_keeps()
+
+        self.client.post('/api/clothing-items/bulk/', [{'name': 'A', 'color': 'blue'}, {'name': 'B'}], format='json')
+        self.client.patch('/api/clothing-items/bulk/', [{'id': shirt.pk, 'brand': 'Other'}], format='json')
+        self.assertEqual(self.counts()['color', 'blue'], 2)
+        self.assertEqual(self.counts()['brand', 'Other'], 1)
+        self.assert_rebuild_keeps()
+
+        self.categories[0].delete()
+        self.assertEqual(self.counts()['category', ''], 4)
+        self.assertNotIn(('category', top), self.counts())
+
+    def test_outfit_item_count(self):
+        items = self.make_items(4)
+        outfit = self.make_outfit(items[:2])
+        self.assertEqual(outfit.item_count, 2)
+        outfit.clothing_items.add(items[2])
+        items[3].outfits.add(outfit)
+        outfit.clothing_items.remove(items[0])
+        items[1].delete()
+        outfit.refresh_from_db()
+        self.assertEqual(outfit.item_count, 2)
+        self.assert_rebuild_keeps()
+
+        stale = Outfit.objects.get(pk=outfit.pk)
+        outfit.clothing_items.clear()
+        stale.name = 'Renamed'
+        stale.save()  # Không ghi đè item_count bằng giá trị cũ
+        response = self.client.get(f'/api/outfits/{outfit.pk}/')
+        self.assertEqual((response.data['name'], response.data['item_count']), ('Renamed', 0))
+
+    def test_endpoint_reads_one_query_and_rebuild_fixes_drift(self):
+        self.make_items(4)
+        self.make_items(2, user=self.other)
+        self.make_outfit(ClothingItem.objects.filter(user=self.user))
+        self.assertEqual(self.count_queries('get', self.url), 1)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_items'], 4)
+        self.assertEqual(response.data['categories'][0], {
+            'id': self.categories[0].pk, 'name': self.categories[0].name, 'count': 2,
+        })
+        self.assertEqual(response.data['colors'], [{'value': 'red', 'count': 4}])
+        self.assertEqual(response.data['brands'], [{'value': 'Brand', 'count': 4}])
+
+        expected = self.counts()
+        ClothingItem.objects.filter(user=self.user).update(color='green')
+        Outfit.objects.update(item_count=0)
+        WardrobeStat.objects.filter(user=self.other).delete()
+        call_command('rebuild_stats', stdout=io.StringIO())
+        expected[('color', 'green')] = expected.pop(('color', 'red'))
+        self.assertEqual(self.counts(), expected)
+        self.assertEqual(self.counts(self.other)['brand', 'Brand'], 2)
+        self.assertEqual(Outfit.objects.get().item_count, 4)
+
+    def test_concurrent_edits_do_not_drift(self):
+        item = self.make_items(1)[0]
+        first, second = ClothingItem.objects.get(pk=item.pk), ClothingItem.objects.get(pk=item.pk)
+        first.color = 'blue'
+        first.save()
+        second.color = 'green'  # Được load trước khi `first` đổi màu
+        second.save()
+        colors = {value: count for (dimension, value), count in self.counts().items() if dimension == 'color'}
+        self.assertEqual(colors, {'green': 1})
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ImageSimilarityTests(MediaTestMixin, TestCase):
+    def make_pattern(self, name, size=(600, 800), flip=False, quality=90, tint=(180, 40, 40)):
+        image = Image.new('RGB', (600, 800), (240, 240, 240))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((150, 100, 450, 500), fill=tint)
+        draw.ellipse((200, 520, 400, 760), fill=(30, 30, 90))
+        if flip:
+            image = image.transpose(Image.FLIP_TOP_BOTTOM)
+        buffer = io.BytesIO()
+        image.resize(size).save(buffer, 'JPEG', quality=quality)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self, image):
+        response = self.client.post('/api/clothing-items/', {'name': image.name, 'image': image}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data['id']
+
+    def test_duplicates_and_similar(self):
+        original = self.upload(self.make_pattern('a.jpg'))
+        rescaled = self.upload(self.make_pattern('b.jpg', size=(300, 400), quality=60))
+        recolored = self.upload(self.make_pattern('c.jpg', tint=(40, 160, 40)))
+        different = self.upload(self.make_pattern('d.jpg', flip=True))
+        self.assertEqual(ImageSignature.objects.filter(user=self.user).count(), 4)
+
+        response = self.client.get('/api/clothing-items/duplicates/')
+        self.assertEqual(response.status_code, 200)
+        groups = [sorted(item['id'] for item in group) for group in response.data['groups']]
+        self.assertEqual(groups, [sorted([original, rescaled])])
+        self.assertIn('thumbnail', response.data['groups'][0][0])
+
+        response = self.client.get(f'/api/clothing-items/{original}/similar/', {'limit': 3})
+        ranked = [item['id'] for item in response.data['results']]
+        self.assertEqual(ranked[0], rescaled)
+        self.assertLess(ranked.index(recolored), ranked.index(different))
+
+    def test_large_bucket_of_identical_photos(self):
+        items = ClothingItem.objects.bulk_create(ClothingItem(user=self.user, name=f'Plain {i}') for i in range(400))
+        histogram = bytes([4] * 64)
+        ImageSignature.objects.bulk_create(
+            ImageSignature(item=item, user=self.user, source='x.jpg', phash=0x0F0F, dhash=1 << (i % 3),
+                           histogram=histogram)
+            for i, item in enumerate(items)
+        )
+        groups = SignatureIndex(self.user).duplicate_groups()
+        self.assertEqual([len(group) for group in groups], [400])
+
+    def test_similar_ranks_band_candidates_only(self):
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(-2 ** 63, 2 ** 63 - 1, size=300, dtype=np.int64)
+        hashes[1] = hashes[0] ^ 0b1011  # Lệch 3 bit so với ảnh đầu
+        items = ClothingItem.objects.bulk_create(ClothingItem(user=self.user, name=f'Item {i}') for i in range(300))
+        ImageSignature.objects.bulk_create(
+            ImageSignature(item=item, user=self.user, source=f'{i}.jpg', phash=int(value), dhash=0,
+                           histogram=bytes([4] * 64))
+            for i, (item, value) in enumerate(zip(items, hashes))
+        )
+        index = SignatureIndex(self.user)
+        self.assertLess(len(index._band_neighbors(0, 8)), 30)
+        self.assertEqual(index.similar_items(items[0].pk, 1)[0][0], items[1].pk)
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300})
+    def test_index_is_reused_until_items_change(self):
+        item_id = self.upload(self.make_pattern('a.jpg'))
+        index = signature_index(self.user)
+        self.assertIs(signature_index(self.user), index)
+        self.client.patch(f'/api/clothing-items/{item_id}/', {'name': 'Renamed'}, format='json')
+        self.assertIsNot(signature_index(self.user), index)
+
+    def test_replacing_image_drops_signature(self):
+        item_id = self.upload(self.make_pattern('a.jpg'))
+        self.client.patch(f'/api/clothing-items/{item_id}/', {'image': None}, format='json')
+        self.assertFalse(ImageSignature.objects.filter(item_id=item_id).exists())
+        self.assertEqual(self.client.get(f'/api/clothing-items/{item_id}/similar/').status_code, 409)
+
+        foreign = self.make_items(1, user=self.other)[0]
+        self.assertEqual(self.client.get(f'/api/clothing-items/{foreign.pk}/similar/').status_code, 404)
+
+
+class WardrobeTransferTests(MediaTestMixin, TestCase):
+    def test_export_and_import_round_trip(self):
+        response = self.client.post(
+            '/api/clothing-items/', {'name': 'Áo có ảnh', 'image': self.make_image_file()}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        items = [ClothingItem.objects.get(pk=response.data['id'])] + self.make_items(4)
+        ClothingItem.objects.filter(pk=items[1].pk).update(date_added=timezone.now() - timedelta(days=400))
+        items[1].refresh_from_db()
+        self.make_outfit(items[:3])
+        self.make_outfit(items[2:], name='Second')
+        Outfit.objects.filter(name='Second').update(created_at=timezone.now() - timedelta(days=30))
+
+        response = self.client.get('/api/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        export = b''.join(response.streaming_content)
+        records = [json.loads(line) for line in export.splitlines()]
+        self.assertEqual([r['type'] for r in records].count('outfit_item'), 6)
+        images = b''.join(self.client.get('/api/export/images/').streaming_content)
+
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post('/api/import/images/', images, content_type='application/x-tar')
+        self.assertEqual(response.data, {'images': 1})
+        with self.settings(WARDROBE_TRANSFER={'CHUNK_SIZE': 2}):
+            response = self.client.post('/api/import/', export, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['clothing_items'], 5)
+        self.assertEqual(response.data['outfit_items'], 6)
+        self.assertEqual(response.data['missing_images'], 0)
+
+        imported = ClothingItem.objects.filter(user=self.other)
+        self.assertEqual(
+            sorted(imported.values_list('name', 'category__name')),
+            sorted(ClothingItem.objects.filter(user=self.user).values_list('name', 'category__name')),
+        )
+        self.assertEqual(imported.get(name='Áo có ảnh').image.name, items[0].image.name)
+        self.assertEqual(MediaBlob.objects.get(name=items[0].image.name).ref_count, 2)
+        second = Outfit.objects.get(user=self.other, name='Second')
+        self.assertEqual(sorted(second.clothing_items.values_list('name', flat=True)), ['Item 1', 'Item 2', 'Item 3'])
+        self.assertEqual(ItemCooccurrence.objects.filter(user=self.other).count(),
+                         ItemCooccurrence.objects.filter(user=self.user).count())
+        self.assertEqual(SearchDocument.objects.filter(user=self.other).count(), 7)
+        self.assertEqual(imported.get(name='Item 0').date_added, items[1].date_added)
+        self.assertEqual(second.created_at, Outfit.objects.get(user=self.user, name='Second').created_at)
+
+    def test_invalid_line_imports_nothing(self):
+        lines = [
+            {'type': 'clothing_item', 'data': {'id': 1, 'name': 'Ok'}},
+            {'type': 'clothing_item', 'data': {'id': 2, 'name': 'x' * 300}},
+        ]
+        body = ''.join(json.dumps(line) + '\n' for line in lines)
+        response = self.client.post('/api/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['line'], '2')
+        self.assertFalse(ClothingItem.objects.filter(user=self.user).exists())
+
+    def make_tar(self, files):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as archive:
+            for name, data in files.items():
+                member = tarfile.TarInfo(name)
+                member.size = len(data)
+                archive.addfile(member, io.BytesIO(data))
+        return buffer.getvalue()
+
+    def test_imported_images_are_checked_and_pruned(self):
+        url = '/api/import/images/'
+        photo = self.make_image_file().read()
+        response = self.client.post(url, self.make_tar({'fake.jpg': b'not an image'}), content_type='application/x-tar')
+        self.assertEqual(response.status_code, 400)
+        with self.settings(WARDROBE_TRANSFER={'MAX_IMPORT_SIZE': len(photo) + 10}):
+            body = self.make_tar({'a.jpg': photo, 'b.jpg': photo})
+            self.assertEqual(self.client.post(url, body, content_type='application/x-tar').status_code, 400)
+
+        response = self.client.post(url, self.make_tar({'a.jpg': photo}), content_type='application/x-tar')
+        self.assertEqual(response.data, {'images': 1})
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+        call_command('prune_media', stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(blob.name))  # Còn trong thời gian chờ
+        MediaBlob.objects.update(created_at=timezone.now() - timedelta(days=2))
+        call_command('prune_media', stdout=io.StringIO())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_repeated_member_lines_across_chunks(self):
+        lines = [
+            {'type': 'clothing_item', 'data': {'id': 1, 'name': 'Shirt'}},
+            {'type': 'outfit', 'data': {'id': 1, 'name': 'Outfit'}},
+            {'type': 'outfit_item', 'data': {'outfit': 1, 'clothing_item': 1}},
+            {'type': 'outfit_item', 'data': {'outfit': 1, 'clothing_item': 1}},
+        ]
+        body = ''.join(json.dumps(line) + '\n' for line in lines)
+        with self.settings(WARDROBE_TRANSFER={'CHUNK_SIZE': 1}):
+            response = self.client.post('/api/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['outfit_items'], 1)
+        self.assertEqual(Outfit.objects.get(user=self.user).item_count, 1)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class MediaServingTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(
+            '/api/clothing-items/', {'name': 'Ảnh', 'image': self.make_image_file()}, format='multipart'
+        )
+        self.item = ClothingItem.objects.get(pk=response.data['id'])
+        self.url = self.item.image.url
+
+    def get(self, url=None, **headers):
+        response = self.client.get(url or self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_owner_gets_immutable_file_and_304(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        with self.item.image.open('rb') as f:
+            self.assertEqual(body, f.read())
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['ETag'].strip('"'), self.item.image.name.rsplit('/', 1)[1].split('.')[0])
+
+        response, body = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+        thumb = default_storage.url(ClothingItem.objects.get(pk=self.item.pk).renditions['thumb'])
+        self.assertEqual(self.get(thumb)[0].status_code, 200)
+
+        for accept in ('image/png', 'image/webp,image/*'):
+            self.assertEqual(self.get(HTTP_ACCEPT=accept)[0].status_code, 200)
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.get(HTTP_ACCEPT='image/webp,image/*')[0].status_code, 404)
+
+    def test_range_requests(self):
+        full = self.get()[1]
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, full[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(full)}')
+        self.assertEqual(self.get(HTTP_RANGE='bytes=-5')[1], full[-5:])
+        self.assertEqual(self.get(HTTP_RANGE=f'bytes={len(full)}-')[0].status_code, 416)
+        # If-Range không khớp: trả cả file
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, full))
+
+    def test_other_users_and_offload(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.get()[0].status_code, 404)
+        self.assertEqual(self.get('/media/../db.sqlite3')[0].status_code, 404)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.get()[0].status_code, 401)
+
+        self.client.force_authenticate(user=self.user)
+        with self.settings(MEDIA_SERVING={'OFFLOAD': 'x-accel-redirect', 'ACCEL_REDIRECT_PREFIX': '/internal/'}):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/internal/{self.item.image.name}')
+        self.assertEqual(body, b'')
+
+
+class LoadTestTests(MediaTestMixin, TestCase):
+    def route_names(self, patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self.route_names(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+
+    def test_every_route_has_a_scenario(self):
+        routes = set(self.route_names(app_urls.urlpatterns)) | {'media'}
+        self.assertEqual({scenario.route for scenario in SCENARIOS}, routes)
+
+    def test_replay_every_scenario(self):
+        dataset = build_dataset(Scale(users=2, categories=3, items=12, outfits=4, items_per_outfit=3, images=2))
+        names = [scenario.name for scenario in SCENARIOS] * 2
+        samples, _ = replay(ClientTransport(), dataset, names)
+        failed = [(sample.scenario, sample.status) for sample in samples if sample.status >= 400]
+        self.assertEqual(failed, [])
+        self.assertTrue(all(sample.queries is not None for sample in samples))
+
+        summary = summarize(samples)
+        baseline = {'meta': {}, 'scenarios': summary}
+        self.assertEqual(compare(summary, baseline), [])
+        worse = json.loads(json.dumps(summary))
+        worse['items-page']['queries'] += 3
+        worse['export']['bytes'] *= 2
+        self.assertEqual(len(compare(worse, baseline)), 2)
+
+        dataset.delete()
+        self.assertFalse(User.objects.filter(username__startswith=dataset.prefix).exists())
+
+
+class AsyncUrlConf:
+    """
+    URLconf như khi chạy dưới ASGI (ASYNC_VIEWS bật).
+    """
+    urlpatterns = [
+        path('api/', include(asyncviews.urlpatterns + app_urls.urlpatterns)),
+        re_path(r'^media/(?P<path>.+)$', asyncviews.media_view),
+    ]
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class AsyncViewTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        response = self.client.post(
+            '/api/clothing-items/', {'name': 'Ảnh', 'image': self.make_image_file()}, format='multipart'
+        )
+        self.image_item = ClothingItem.objects.get(pk=response.data['id'])
+        items = self.make_items(11)
+        self.outfit = self.make_outfit(items[:2] + [self.image_item])
+
+    def async_request(self, method, url, data=None, **kwargs):
+        headers = {
+            'X-Forwarded-Proto': 'https', 'Authorization': f'Token {self.token.key}',
+            **kwargs.pop('headers', {}),
+        }
+
+        async def send():
+            with override_settings(ROOT_URLCONF=AsyncUrlConf):
+                response = await getattr(self.async_client, method)(url, data, headers=headers, **kwargs)
+                if response.streaming:
+                    response.body = b''.join([chunk async for chunk in response.streaming_content])
+                else:
+                    response.body = response.content
+            return response
+        return async_to_sync(send)()
+
+    @override_settings(REQUEST_TIMING={'SERVER_TIMING': True})
+    def test_reads_match_drf_views(self):
+        urls = [
+            '/api/clothing-items/',
+            '/api/clothing-items/?page=2',
+            '/api/clothing-items/?pagination=keyset&page_size=2',
+            f'/api/clothing-items/{self.image_item.pk}/',
+            '/api/outfits/',
+            f'/api/outfits/{self.outfit.pk}/',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.client.get(url, HTTP_HOST='testserver')
+                response = self.async_request('get', url)
+                self.assertEqual(response.status_code, 200, response.body[:300])
+                self.assertEqual(response.body, expected.content)
+                self.assertEqual(response['ETag'], expected['ETag'])
+                self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="[1-9][0-9]* queries", serialize;')
+
+    def test_not_modified_and_fallback(self):
+        url = f'/api/clothing-items/{self.image_item.pk}/'
+        etag = self.async_request('get', url)['ETag']
+        self.assertEqual(self.async_request('get', url, headers={'If-None-Match': etag}).status_code, 304)
+        # Không thuộc đường nhanh: ViewSet DRF xử lý
+        response = self.async_request('get', '/api/clothing-items/?fields=id,name')
+        self.assertEqual(set(json.loads(response.body)['results'][0]), {'id', 'name'})
+        self.assertEqual(self.async_request('get', '/api/clothing-items/999999/').status_code, 404)
+        self.assertEqual(self.async_request('get', url, headers={'Authorization': 'Token wrong'}).status_code, 401)
+
+    def test_upload_and_media(self):
+        response = self.async_request('post', '/api/clothing-items/', {'name': 'Mới', 'image': self.make_image_file()})
+        self.assertEqual(response.status_code, 201)
+        item = ClothingItem.objects.get(pk=json.loads(response.body)['id'])
+        self.assertEqual(item.image.name, self.image_item.image.name)  # Cùng nội dung -> cùng file
+        response = self.async_request(
+            'patch', f'/api/clothing-items/{item.pk}/',
+            encode_multipart(BOUNDARY, {'image': self.make_image_file(color=(0, 0, 200))}),
+            content_type=MULTIPART_CONTENT,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(ClothingItem.objects.get(pk=item.pk).image.name, self.image_item.image.name)
+
+        response = self.async_request('get', self.image_item.image.url)
+        self.assertTrue(response.is_async)
+        with self.image_item.image.open('rb') as f:
+            self.assertEqual(response.body, f.read())
+        response = self.async_request('get', self.image_item.image.url, headers={'Range': 'bytes=0-9'})
+        self.assertEqual((response.status_code, len(response.body)), (206, 10))
+        other_token = Token.objects.create(user=self.other)
+        response = self.async_request('get', self.image_item.image.url, headers={'Authorization': f'Token {other_token.key}'})
+        self.assertEqual(response.status_code, 404)
+
+
+class RequestTimingTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        request_metrics.reset()
+        self.make_items(3)
+
+    def server_timing(self, response):
+        return dict(
+            (entry.split(';')[0], entry) for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_and_metrics(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), override_settings(FAST_READ_PATH=fast, REQUEST_TIMING={'SERVER_TIMING': True}):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get('/api/clothing-items/')
+                timing = self.server_timing(response)
+                self.assertEqual(set(timing), {'db', 'serialize', 'render', 'total'})
+                self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing['db'])
+
+        response = self.client.get('/metrics')  # Ngoài /api/: không đo
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('Server-Timing', response)
+        with override_settings(REQUEST_TIMING={'METRICS_TOKEN': 'scrape'}):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'wardrobe_http_request_duration_seconds_bucket{route="clothingitem-list",method="GET",status="2xx",le="+Inf"} 2',
+            body,
+        )
+        self.assertIn('wardrobe_http_request_phase_seconds_count{route="clothingitem-list",phase="render"} 2', body)
+        self.assertIn('wardrobe_http_response_size_bytes_count{route="clothingitem-list"} 2', body)
+
+    def test_server_timing_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/clothing-items/'))
+        with override_settings(REQUEST_TIMING={'SERVER_TIMING': 'staff'}):
+            self.assertNotIn('Server-Timing', self.client.get('/api/clothing-items/'))
+            self.user.is_staff = True
+            self.user.save(update_fields=['is_staff'])
+            self.assertIn('total', self.server_timing(self.client.get('/api/clothing-items/')))
 
-# Create your tests here.
+    @override_settings(IMAGE_PROCESSING_ASYNC=False)
+    def test_image_phase_and_slow_log(self):
+        with override_settings(REQUEST_TIMING={'SERVER_TIMING': True, 'SLOW_REQUEST_MS': 0, 'SLOW_SAMPLE_RATE': 1}):
+            with self.assertLogs('app.timing', 'WARNING') as logs:
+                response = self.client.post(
+                    '/api/clothing-items/', {'name': 'Ảnh', 'image': self.make_image_file()}, format='multipart'
+                )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('image', self.server_timing(response))
+        self.assertIn('POST /api/clothing-items/ (clothingitem-list)', logs.output[0])
+        self.assertIn('INSERT INTO "app_clothingitem"', logs.output[0])
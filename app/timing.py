@@ -0,0 +1,341 @@
+"""
+Đo thời gian từng request của /api/ (TimingMiddleware trong app/middleware.py).
+
+Mỗi request được đo:
+- db: số query và tổng thời gian chạy query (execute wrapper gắn vào mọi kết nối DB,
+  qua signal connection_created trong app/signals.py),
+- serialize: thời gian lấy `serializer.data` (TimingViewMixin) hoặc ghép payload ở đường
+  nhanh (app/fastpath.py, app/asyncviews.py); gồm cả query phát sinh trong lúc đó,
+- render: thời gian renderer DRF tạo body (TimedJSONRenderer, TimedBrowsableAPIRenderer),
+- image: kiểm tra ảnh/tạo rendition ngay trong request (tasks.process_item_image),
+- total và số byte của response.
+
+Kết quả được cộng vào các histogram theo route (tên URL), xem ở /metrics theo định dạng text của Prometheus. Histogram nằm trong bộ nhớ của từng
+process: với nhiều worker gunicorn, mỗi lần scrape chỉ thấy số liệu của worker trả lời.
+Header Server-Timing (lộ số query và thời gian DB) chỉ được gắn khi bật SERVER_TIMING: True
+cho mọi response, 'staff' chỉ cho user staff.
+
+Một phần SLOW_SAMPLE_RATE request được ghi lại SQL; request nào trong số đó chạy quá
+SLOW_REQUEST_MS thì được ghi log (logger 'app.timing') kèm các câu SQL và thời gian của chúng.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('db', 'serialize', 'render', 'image')
+
+_current = ContextVar('request_timings', default=None)
+
+
+def timing_settings():
+    options = {
+        'ENABLED': True,
+        'PATH_PREFIXES': ('/api/',),
+        'SERVER_TIMING': False,
+        'SLOW_REQUEST_MS': 500,
+        'SLOW_SAMPLE_RATE': 0.1,
+        'MAX_SLOW_QUERIES': 50,
+        'METRICS_TOKEN': None,
+        'DURATION_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        'QUERY_BUCKETS': (0, 1, 2, 3, 5, 10, 20, 50, 100),
+        'SIZE_BUCKETS': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    }
+    options.update(getattr(settings, 'REQUEST_TIMING', {}))
+    return options
+
+
+class RequestTimings:
+    """
+    Số liệu của một request. Dùng chung cho các thread của cùng request (sync_to_async
+    sao chép context), chỉ cộng dồn nên không cần khóa.
+    """
+    def __init__(self, capture_sql=False):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)  # giây, theo phase
+        self.queries = 0
+        self.capture_sql = capture_sql
+        self.sql = []
+        self.active = set()
+
+    def record_query(self, sql, seconds):
+        self.queries += 1
+        self.durations['db'] += seconds
+        if self.capture_sql and len(self.sql) < timing_settings()['MAX_SLOW_QUERIES']:
+            self.sql.append((sql, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    """
+    Bắt đầu đo request hiện tại; trả về (RequestTimings, token cho end_request).
+    """
+    timings = RequestTimings(capture_sql=random.random() < timing_settings()['SLOW_SAMPLE_RATE'])
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Cộng thời gian của khối lệnh vào `phase` của request hiện tại. Khối lồng nhau cùng phase
+    (ví dụ renderer gọi renderer khác) chỉ được tính một lần.
+    """
+    timings = _current.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[phase] += time.perf_counter() - start
+        timings.active.discard(phase)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper của Django: đo mọi query chạy trong lúc có request đang được đo.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(sql, time.perf_counter() - start)
+
+
+class TimingViewMixin:
+    """
+    Mixin cho view DRF: serializer của view được thay bằng lớp con có `.data` tính vào phase
+    serialize (cả ListSerializer khi many=True).
+    """
+    def get_serializer_class(self):
+        return timed_serializer_class(super().get_serializer_class())
+
+
+class TimedDataMixin:
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+_timed_serializer_classes = {}
+
+
+def _timed_class(serializer_class, attrs=None):
+    return type(serializer_class.__name__, (TimedDataMixin, serializer_class), {
+        '__module__': serializer_class.__module__, '__qualname__': serializer_class.__qualname__, **(attrs or {}),
+    })
+
+
+def timed_serializer_class(serializer_class):
+    """
+    Lớp con của `serializer_class` đo `.data`; Meta.list_serializer_class cũng được thay để
+    `serializer_class(..., many=True)` trả về ListSerializer có đo.
+    """
+    timed_class = _timed_serializer_classes.get(serializer_class)
+    if timed_class is None:
+        meta = getattr(serializer_class, 'Meta', None)
+        list_class = getattr(meta, 'list_serializer_class', ListSerializer)
+        timed_meta = type('Meta', (meta,) if meta is not None else (), {'list_serializer_class': _timed_class(list_class)})
+        timed_class = _timed_serializer_classes[serializer_class] = _timed_class(serializer_class, {'Meta': timed_meta})
+    return timed_class
+
+
+class TimedRendererMixin:
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, BrowsableAPIRenderer):
+    pass
+
+
+class Histogram:
+    """
+    Histogram tích lũy kiểu Prometheus (bucket `le`, _sum, _count) theo bộ nhãn.
+    """
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self):
+        with self._lock:
+            return {labels: {**series, 'buckets': list(series['buckets'])} for labels, series in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.collect().items()):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+            bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, series['buckets'] + [series['count']]):
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(pairs + [le])} {count}')
+            lines.append(f'{self.name}_sum{_labels(pairs)} {_number(series["sum"])}')
+            lines.append(f'{self.name}_count{_labels(pairs)} {series["count"]}')
+        return '\n'.join(lines)
+
+
+def _labels(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestMetrics:
+    def __init__(self):
+        options = timing_settings()
+        self.duration = Histogram(
+            'wardrobe_http_request_duration_seconds', 'Thời gian xử lý request.',
+            ('route', 'method', 'status'), options['DURATION_BUCKETS'],
+        )
+        self.phase = Histogram(
+            'wardrobe_http_request_phase_seconds', 'Thời gian theo phase (db, serialize, render, image).',
+            ('route', 'phase'), options['DURATION_BUCKETS'],
+        )
+        self.queries = Histogram(
+            'wardrobe_http_request_db_queries', 'Số query DB mỗi request.', ('route',), options['QUERY_BUCKETS'],
+        )
+        self.size = Histogram(
+            'wardrobe_http_response_size_bytes', 'Số byte body response (trừ response streaming).',
+            ('route',), options['SIZE_BUCKETS'],
+        )
+
+    @property
+    def histograms(self):
+        return [self.duration, self.phase, self.queries, self.size]
+
+    def observe(self, route, method, status_code, timings, total, size):
+        self.duration.observe((route, method, f'{status_code // 100}xx'), total)
+        for phase in PHASES:
+            if phase in timings.durations:
+                self.phase.observe((route, phase), timings.durations[phase])
+        self.queries.observe((route,), timings.queries)
+        if size is not None:
+            self.size.observe((route,), size)
+
+    def exposition(self):
+        return '\n'.join(histogram.exposition() for histogram in self.histograms) + '\n'
+
+    def reset(self):
+        for histogram in self.histograms:
+            histogram.reset()
+
+
+request_metrics = RequestMetrics()
+
+
+def should_time(request):
+    options = timing_settings()
+    return options['ENABLED'] and request.path_info.startswith(tuple(options['PATH_PREFIXES']))
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unmatched'
+
+
+def server_timing_header(timings, total):
+    entries = []
+    for phase in PHASES:
+        if phase in timings.durations:
+            entry = f'{phase};dur={timings.durations[phase] * 1000:.1f}'
+            if phase == 'db':
+                entry += f';desc="{timings.queries} queries"'
+            entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def send_server_timing(request, mode):
+    if mode == 'staff':
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+    return bool(mode)
+
+
+def finish_request(request, response, timings):
+    """
+    Gắn header Server-Timing, cộng vào histogram và ghi log request chậm.
+    """
+    options = timing_settings()
+    total = timings.elapsed()
+    if send_server_timing(request, options['SERVER_TIMING']):
+        response['Server-Timing'] = server_timing_header(timings, total)
+    size = None if response.streaming else len(response.content)
+    route = route_name(request)
+    request_metrics.observe(route, request.method, response.status_code, timings, total, size)
+    if timings.capture_sql and total * 1000 >= options['SLOW_REQUEST_MS']:
+        logger.warning(
+            'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms\n%s',
+            request.method, request.get_full_path(), route, total * 1000, timings.queries,
+            timings.durations['db'] * 1000,
+            '\n'.join(f'  {seconds * 1000:.1f} ms  {sql}' for sql, seconds in timings.sql),
+        )
+
+
+def metrics_view(request):
+    """
+    /metrics cho Prometheus. Cần header `Authorization: Bearer <METRICS_TOKEN>`, hoặc
+    đăng nhập admin (session) khi chưa cấu hình METRICS_TOKEN.
+    """
+    token = timing_settings()['METRICS_TOKEN']
+    if token:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        user = getattr(request, 'user', None)
+        allowed = user is not None and user.is_staff
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(request_metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
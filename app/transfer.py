@@ -0,0 +1,353 @@
+"""
+Sao lưu/chuyển tủ đồ của một user (`/api/export/`, `/api/import/`, lệnh `export_wardrobe`,
+`import_wardrobe`).
+
+- Dữ liệu: NDJSON, mỗi dòng {"type", "data"}. Dòng đầu là header, sau đó lần lượt
+  "clothing_item", "outfit", "outfit_item" (thành viên bộ đồ). Category ghi theo tên vì ID
+  khác nhau giữa các hệ thống, ảnh ghi theo tên file trong storage.
+- Ảnh: một tar, mỗi file ảnh (tên theo hash nội dung, app/storage.py) là một member.
+
+Export đọc DB bằng iterator(chunk_size) và ghi thẳng ra StreamingHttpResponse/file; tar
+được ghép từng header/khối dữ liệu, không dựng cả archive trong bộ nhớ. Import đọc từng
+dòng và ghi theo từng chunk bằng bulk_create. Thứ duy nhất tăng theo kích thước tủ đồ là
+bảng ánh xạ ID cũ -> ID mới (hai số nguyên mỗi dòng).
+
+Nên import ảnh trước: dòng món đồ trỏ tới ảnh chưa có trong storage được tạo không có ảnh.
+Ảnh cũ chưa đặt tên theo hash (chưa chạy `dedup_media`) được ghi vào NDJSON bằng tên theo hash
+(đọc file để tính), đúng với tên mà storage đặt khi import tar.
+"""
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.validators import get_available_image_extensions
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import blobs, recommend, search, stats
+from .bulk import validate_elements
+from .cache import invalidate_user
+from .catalog import category_catalog
+from .membership import OutfitItems
+from .models import ClothingItem, Outfit
+from .serializers import ClothingItemImportSerializer, OutfitImportSerializer
+from .storage import HASH_CHUNK_SIZE, get_image_storage, hash_file
+from .tasks import schedule_bulk_image_processing
+
+FORMAT_VERSION = 1
+ITEM, OUTFIT, MEMBER = 'clothing_item', 'outfit', 'outfit_item'
+# Thứ tự các loại dòng: dòng sau chỉ được tham chiếu tới ID của loại đứng trước
+RECORD_TYPES = (ITEM, OUTFIT, MEMBER)
+TAR_BLOCK = tarfile.BLOCKSIZE
+
+
+def transfer_settings():
+    options = {'CHUNK_SIZE': 500, 'MAX_IMAGE_SIZE': 20 * 1024 * 1024, 'MAX_IMPORT_SIZE': 500 * 1024 * 1024}
+    options.update(getattr(settings, 'WARDROBE_TRANSFER', {}))
+    return options
+
+
+def image_directory():
+    return ClothingItem._meta.get_field('image').upload_to
+
+
+def image_name_pattern():
+    """
+    Tên ảnh theo hash nội dung: `<thư mục>/<2 ký tự đầu>/<sha256>.<đuôi>` (app/storage.py).
+    """
+    return re.compile(re.escape(image_directory()) + r'([0-9a-f]{2})/\1[0-9a-f]{62}\.\w+')
+
+
+# --- Export --------------------------------------------------------------------------------
+
+def export_records(user, chunk_size=None):
+    """
+    Các dòng NDJSON (str, có '\\n') của toàn bộ tủ đồ `user`.
+    """
+    chunk_size = chunk_size or transfer_settings()['CHUNK_SIZE']
+    yield _line('header', {
+        'version': FORMAT_VERSION, 'username': user.username, 'exported_at': timezone.now(),
+    })
+    categories = category_catalog.get().names
+    storage = get_image_storage()
+    pattern = image_name_pattern()
+    items = (
+        ClothingItem.objects.filter(user=user).order_by('pk')
+        .values('id', 'name', 'category_id', 'color', 'brand', 'image', 'notes', 'date_added')
+    )
+    for row in items.iterator(chunk_size=chunk_size):
+        row['category'] = categories.get(row.pop('category_id'))
+        row['image'] = portable_image_name(row['image'], storage, pattern)
+        yield _line(ITEM, row)
+    outfits = Outfit.objects.filter(user=user).order_by('pk').values('id', 'name', 'description', 'created_at')
+    for row in outfits.iterator(chunk_size=chunk_size):
+        yield _line(OUTFIT, row)
+    members = (
+        OutfitItems.objects.filter(outfit__user=user).order_by('outfit_id', 'clothingitem_id')
+        .values_list('outfit_id', 'clothingitem_id')
+    )
+    for outfit_id, item_id in members.iterator(chunk_size=chunk_size):
+        yield _line(MEMBER, {'outfit': outfit_id, 'clothing_item': item_id})
+
+
+def portable_image_name(name, storage, pattern):
+    """
+    Tên theo hash của ảnh `name`; None nếu không có ảnh hoặc file đã mất.
+    """
+    if not name or pattern.fullmatch(name):
+        return name or None
+    try:
+        with storage.open(name, 'rb') as image_file:
+            return storage.content_name(name, hash_file(File(image_file)))
+    except FileNotFoundError:
+        return None
+
+
+def _line(record_type, data):
+    return json.dumps({'type': record_type, 'data': data}, cls=JSONEncoder) + '\n'
+
+
+def export_image_names(user, chunk_size=None):
+    """
+    Tên các file ảnh (không trùng) của user, đọc theo chunk.
+    """
+    names = (
+        ClothingItem.objects.filter(user=user).exclude(image='').exclude(image__isnull=True)
+        .order_by('image').values_list('image', flat=True).distinct()
+    )
+    return names.iterator(chunk_size=chunk_size or transfer_settings()['CHUNK_SIZE'])
+
+
+def export_images(user, storage=None):
+    """
+    Tar (định dạng ustar/pax, không nén) chứa các file ảnh của user, trả về từng khối bytes.
+    File đã mất khỏi storage bị bỏ qua.
+    """
+    storage = storage or get_image_storage()
+    for name in export_image_names(user):
+        try:
+            size = storage.size(name)
+            image_file = storage.open(name, 'rb')
+        except FileNotFoundError:
+            continue
+        with image_file:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = int(storage.get_modified_time(name).timestamp())
+            yield info.tobuf(tarfile.PAX_FORMAT)
+            written = 0
+            while written < size:
+                chunk = image_file.read(min(HASH_CHUNK_SIZE, size - written))
+                if not chunk:  # File bị cắt ngắn trong lúc đọc: vẫn phải đủ số byte đã khai
+                    chunk = tarfile.NUL * (size - written)
+                written += len(chunk)
+                yield chunk
+        if size % TAR_BLOCK:
+            yield tarfile.NUL * (TAR_BLOCK - size % TAR_BLOCK)
+    # Hai khối rỗng đánh dấu hết archive
+    yield tarfile.NUL * (2 * TAR_BLOCK)
+
+
+# --- Import --------------------------------------------------------------------------------
+
+def import_images(fileobj, storage=None):
+    """
+    Lưu các file ảnh trong tar đọc tuần tự từ `fileobj` (body request hoặc file). Storage tự
+    đặt tên theo hash nội dung, nên tên member chỉ dùng để lấy đuôi file. Mỗi file được chép
+    qua file tạm (giữ trong RAM khi nhỏ) vì storage cần đọc lại để tính hash.
+    Member không phải file ảnh (theo đuôi file) bị bỏ qua; file không mở được như ảnh, lớn
+    hơn MAX_IMAGE_SIZE, hoặc tổng kích thước quá MAX_IMPORT_SIZE thì trả 400.
+    File đã lưu được ghi nhận là MediaBlob chưa có tham chiếu: `prune_media` xóa những file
+    không được món đồ nào dùng. Trả về số file đã nhận.
+    """
+    storage = storage or get_image_storage()
+    options = transfer_settings()
+    max_size, max_total = options['MAX_IMAGE_SIZE'], options['MAX_IMPORT_SIZE']
+    extensions = {f'.{extension.lower()}' for extension in get_available_image_extensions()}
+    count = total = 0
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+        for member in archive:
+            if not member.isfile():
+                continue
+            if member.size > max_size:
+                raise ValidationError({'images': f'{member.name}: file larger than {max_size} bytes.'})
+            extension = os.path.splitext(member.name)[1].lower()
+            if extension not in extensions:
+                continue
+            total += member.size
+            if total > max_total:
+                raise ValidationError({'images': f'Archive images larger than {max_total} bytes in total.'})
+            with tempfile.SpooledTemporaryFile(max_size=HASH_CHUNK_SIZE * 16) as buffer:
+                shutil.copyfileobj(archive.extractfile(member), buffer, HASH_CHUNK_SIZE)
+                try:
+                    buffer.seek(0)
+                    Image.open(buffer).verify()
+                except (UnidentifiedImageError, OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+                    raise ValidationError({'images': f'{member.name}: not a valid image.'})
+                name = storage.save(f'{image_directory()}import{extension}', File(buffer))
+            blobs.register(name)
+            count += 1
+    except tarfile.TarError as exc:
+        raise ValidationError({'images': f'Invalid tar archive: {exc}'})
+    return count
+
+
+class WardrobeImporter:
+    """
+    Ghi các dòng export vào tủ đồ của `user` theo từng chunk. Dòng được gom theo loại; khi
+    gặp loại khác hoặc đủ chunk thì ghi phần đang gom (nhờ vậy ID mới của món đồ đã có khi
+    tới các dòng thành viên bộ đồ). Dùng trong một transaction: lỗi ở bất kỳ dòng nào thì
+    không ghi gì.
+
+    bulk_create không chạy signal, nên đếm tham chiếu ảnh, xử lý ảnh, chỉ mục tìm kiếm và
+    thống kê gợi ý được cập nhật trực tiếp như trong app/bulk.py.
+    """
+    def __init__(self, user, chunk_size=None, storage=None):
+        self.user = user
+        self.chunk_size = chunk_size or transfer_settings()['CHUNK_SIZE']
+        self.storage = storage or get_image_storage()
+        self.categories = {name: pk for pk, name in category_catalog.get().names.items()}
+        self.item_ids, self.outfit_ids = {}, {}
+        self.pending, self.pending_type = [], None
+        self.stats = {'clothing_items': 0, 'outfits': 0, 'outfit_items': 0, 'missing_images': 0, 'skipped': 0}
+        self.image_pattern = image_name_pattern()
+
+    def feed(self, lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                record_type, data = record['type'], record['data']
+            except (ValueError, TypeError, KeyError) as exc:
+                raise ValidationError({'line': number, 'detail': f'Invalid record: {exc}'})
+            if record_type == 'header':
+                if data.get('version') != FORMAT_VERSION:
+                    raise ValidationError({'line': number, 'detail': 'Unsupported export version.'})
+                continue
+            if record_type not in RECORD_TYPES or not isinstance(data, dict):
+                raise ValidationError({'line': number, 'detail': f'Unknown record type {record_type!r}.'})
+            if record_type != self.pending_type:
+                self.flush()
+                self.pending_type = record_type
+            self.pending.append((number, data))
+            if len(self.pending) >= self.chunk_size:
+                self.flush()
+        self.flush()
+        invalidate_user(self.user.pk)
+        return self.stats
+
+    def flush(self):
+        if self.pending:
+            {ITEM: self._write_items, OUTFIT: self._write_outfits, MEMBER: self._write_members}[self.pending_type]()
+            self.pending = []
+
+    def _validate(self, serializer_class):
+        numbers = [number for number, _ in self.pending]
+        validated, errors = validate_elements(serializer_class(), [data for _, data in self.pending])
+        if errors:
+            index = min(errors)
+            raise ValidationError({'line': numbers[index], 'detail': errors[index]})
+        return [(data.get('id'), validated[index]) for index, (_, data) in enumerate(self.pending)]
+
+    def _image_name(self, name):
+        if not name:
+            return ''
+        if isinstance(name, str) and self.image_pattern.fullmatch(name) and self.storage.exists(name):
+            return name
+        self.stats['missing_images'] += 1
+        return ''
+
+    def _write_items(self):
+        now = timezone.now()
+        old_ids, items, dated = [], [], []
+        for (old_id, fields), (_, data) in zip(self._validate(ClothingItemImportSerializer), self.pending):
+            date_added = fields.pop('date_added', None)
+            item = ClothingItem(
+                user=self.user, category_id=self.categories.get(data.get('category')),
+                image=self._image_name(data.get('image')), **fields,
+            )
+            if item.image:
+                item.image_status = ClothingItem.IMAGE_PROCESSING
+            item.date_added = item.last_modified = now
+            old_ids.append(old_id)
+            items.append(item)
+            if date_added is not None:
+                dated.append((item, date_added))
+        ClothingItem.objects.bulk_create(items, batch_size=200)
+        # auto_now_add ghi đè date_added khi INSERT: đặt lại ngày trong bản sao lưu
+        for item, date_added in dated:
+            item.date_added = date_added
+        ClothingItem.objects.bulk_update([item for item, _ in dated], ['date_added'], batch_size=200)
+        blobs.acquire_many([item.image.name for item in items])
+        for item in items:
+            item._loaded_image_name = item.image.name or ''
+        stats.apply_item_deltas(self.user.pk, stats.item_deltas(after=[stats.item_values(item) for item in items]))
+        search.index_objects(items)
+        # Xử lý ảnh sau khi transaction commit (worker không thấy được dòng chưa commit)
+        with_image = [item for item in items if item.image]
+        transaction.on_commit(lambda: schedule_bulk_image_processing(with_image))
+        self.item_ids.update((old_id, item.pk) for old_id, item in zip(old_ids, items) if old_id is not None)
+        self.stats['clothing_items'] += len(items)
+
+    def _write_outfits(self):
+        rows = self._validate(OutfitImportSerializer)
+        created = [fields.pop('created_at', None) for _, fields in rows]
+        outfits = Outfit.objects.bulk_create(
+            [Outfit(user=self.user, **fields) for _, fields in rows], batch_size=200
+        )
+        dated = []
+        for outfit, created_at in zip(outfits, created):
+            if created_at is not None:
+                outfit.created_at = created_at
+                dated.append(outfit)
+        Outfit.objects.bulk_update(dated, ['created_at'], batch_size=200)
+        self.outfit_ids.update((old_id, outfit.pk) for (old_id, _), outfit in zip(rows, outfits) if old_id is not None)
+        search.index_objects(outfits)
+        self.stats['outfits'] += len(outfits)
+
+    def _write_members(self):
+        pairs = set()
+        for _, data in self.pending:
+            outfit_id = self.outfit_ids.get(data.get('outfit'))
+            item_id = self.item_ids.get(data.get('clothing_item'))
+            if outfit_id is None or item_id is None:
+                self.stats['skipped'] += 1
+            else:
+                pairs.add((outfit_id, item_id))
+        # Dòng thành viên của một bộ đồ có thể nằm ở hai chunk (hoặc bị lặp): chỉ tính phần mới
+        outfit_ids = {outfit_id for outfit_id, _ in pairs}
+        existing = set(
+            OutfitItems.objects.filter(outfit_id__in=outfit_ids).values_list('outfit_id', 'clothingitem_id')
+        )
+        pairs = sorted(pairs - existing)
+        OutfitItems.objects.bulk_create(
+            [OutfitItems(outfit_id=outfit_id, clothingitem_id=item_id) for outfit_id, item_id in pairs],
+            batch_size=500,
+        )
+        before = {outfit_id: set() for outfit_id in outfit_ids}
+        for outfit_id, item_id in existing:
+            before[outfit_id].add(item_id)
+        after = {outfit_id: set(members) for outfit_id, members in before.items()}
+        for outfit_id, item_id in pairs:
+            after[outfit_id].add(item_id)
+        recommend.apply_deltas(self.user.pk, recommend.membership_deltas(before, after))
+        stats.set_item_counts({outfit_id: len(item_ids) for outfit_id, item_ids in after.items()})
+        self.stats['outfit_items'] += len(pairs)
+
+
+def import_records(user, lines, chunk_size=None):
+    """
+    Import các dòng NDJSON (bytes hoặc str) vào tủ đồ của `user`, trả về số dòng đã ghi theo loại.
+    """
+    with transaction.atomic():
+        return WardrobeImporter(user, chunk_size).feed(lines)
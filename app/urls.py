@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ClothingCategoryViewSet, ClothingItemViewSet, OutfitViewSet,
-    RegisterView, CustomObtainAuthToken
+    RegisterView, CustomObtainAuthToken, ResponseCacheStatsView, SyncView,
+    WardrobeExportView, WardrobeImportView, WardrobeStatsView,
 )
 
 # DefaultRouter tự động tạo các URL pattern cho ViewSets.
@@ -18,7 +20,19 @@ urlpatterns = [
     # Các URL cho authentication
     path('auth/register/', RegisterView.as_view(), name='auth_register'),
     path('auth/login/', CustomObtainAuthToken.as_view(), name='auth_login'),
+    path('cache-stats/', ResponseCacheStatsView.as_view(), name='cache_stats'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('stats/', WardrobeStatsView.as_view(), name='wardrobe_stats'),
+    path('export/', WardrobeExportView.as_view(), name='wardrobe_export'),
+    path('export/images/', WardrobeExportView.as_view(images=True), name='wardrobe_export_images'),
+    path('import/', WardrobeImportView.as_view(), name='wardrobe_import'),
+    path('import/images/', WardrobeImportView.as_view(images=True), name='wardrobe_import_images'),
     # Bạn có thể thêm logout view nếu cần.
     # Với TokenAuthentication, logout thường được xử lý ở client bằng cách xóa token.
     # Nếu dùng session, bạn có thể tạo một view gọi django.contrib.auth.logout.
 ]
+
+if settings.ASYNC_VIEWS:
+    # Dưới ASGI, đọc danh sách/chi tiết món đồ và bộ đồ đi qua view async (app/asyncviews.py)
+    from .asyncviews import urlpatterns as async_urlpatterns
+    urlpatterns = async_urlpatterns + urlpatterns
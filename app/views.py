@@ -1,80 +1,150 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, views
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from .models import ClothingCategory, ClothingItem, Outfit
 from .serializers import (
-    UserSerializer, ClothingCategorySerializer,
-    ClothingItemSerializer, OutfitSerializer
+    UserSerializer, ClothingCategorySerializer, user_summary,
+    ClothingItemListSerializer, ClothingItemSerializer, OutfitItemIdsSerializer,
+    OutfitListSerializer, OutfitSerializer
 )
+from .bulk import bulk_create_items, bulk_delete_items, bulk_update_items, max_bulk_items, overall_status, parse_elements
+from .authentication import get_or_create_token
+from .cache import CachedResponseMixin, cache_stats
+from .catalog import category_catalog
+from .conditional import ConditionalRequestMixin, aggregate_stamp, category_stamp
+from .fastpath import ITEM_COLUMNS, OUTFIT_COLUMNS, FastListMixin, serialize_items, serialize_outfits
+from .media import can_access, serve_file
+from .membership import add_outfit_items, remove_outfit_items, split_owned_item_ids
+from .pagination import KeysetPaginationMixin
+from .passwords import AuthGlobalRateThrottle, AuthRateThrottle
 from .permissions import IsOwnerOrReadOnly, IsAdminOrReadOnly # Import custom permissions
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from .recommend import WardrobeModel, recommend_settings
+from .search import ItemSearch, search_outfits
+from .signals import token_issued
+from .similarity import signature_index, similarity_settings
+from .sparse import SparseFieldsetViewMixin
+from .stats import wardrobe_stats
+from .sync import NDJSONRenderer, SyncToken, stream_changes, sync_page, sync_settings
+from .tasks import schedule_image_processing
+from .timing import TimingViewMixin
+from .transfer import export_images, export_records, import_images, import_records
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.authtoken.models import Token # Cho TokenAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken # View đăng nhập sẵn có
 
 class RegisterView(generics.CreateAPIView):
     """
     View để đăng ký người dùng mới.
-    Không yêu cầu xác thực.
+    Không yêu cầu xác thực. Mật khẩu được băm trên pool giới hạn (app/passwords.py).
     """
     queryset = User.objects.all()
     permission_classes = [AllowAny] # Ai cũng có thể truy cập để đăng ký
+    throttle_classes = [AuthRateThrottle, AuthGlobalRateThrottle]
     serializer_class = UserSerializer
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save() # Serializer's create method handles user creation and password hashing
-        token, created = Token.objects.get_or_create(user=user) # Tạo token cho user mới
-        headers = self.get_success_headers(serializer.data)
+        token = Token.objects.create(user=user) # User mới chưa có token: một INSERT
+        token_issued.send(sender=self.__class__, token=token)
         # Trả về thông tin user (không có password) và token
-        user_data = UserSerializer(user, context=self.get_serializer_context()).data
-        # Loại bỏ password khỏi user_data nếu nó vô tình được thêm vào
-        user_data.pop('password', None)
-
         return Response(
             {
                 'message': 'User registered successfully.',
-                'user': user_data,
+                'user': user_summary(user),
                 'token': token.key
             },
             status=status.HTTP_201_CREATED,
-            headers=headers
         )
 
 class CustomObtainAuthToken(ObtainAuthToken):
     """
     View đăng nhập, trả về token cùng với thông tin user cơ bản.
+    Kiểm tra mật khẩu qua PooledModelBackend; lấy/tạo token trong một query.
     """
+    throttle_classes = [AuthRateThrottle, AuthGlobalRateThrottle]
+
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data,
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
-        # Sử dụng UserSerializer để lấy thông tin user, loại bỏ password
-        user_data = UserSerializer(user, context={'request': request}).data
-        user_data.pop('password', None)
+        token, created = get_or_create_token(user)
+        token_issued.send(sender=self.__class__, token=token)
 
         return Response({
             'token': token.key,
-            'user': user_data
+            'user': user_summary(user)
         })
 
-class ClothingCategoryViewSet(viewsets.ModelViewSet):
+class ClothingCategoryViewSet(TimingViewMixin, ConditionalRequestMixin, viewsets.ModelViewSet):
     """
     API endpoint cho phép xem hoặc sửa các loại quần áo.
+    Đọc (list/retrieve và ETag) từ category_catalog (app/catalog.py), không query DB.
     """
     queryset = ClothingCategory.objects.all()
     serializer_class = ClothingCategorySerializer
     permission_classes = [IsAdminOrReadOnly] # Chỉ admin mới có quyền tạo/sửa/xóa. Người dùng thường chỉ có quyền đọc.
+    write_stamp_field = 'updated_at'
+
+    def catalog_category(self):
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            return None
+        return category_catalog.get().by_id.get(pk)
+
+    def get_validator_stamps(self, queryset, detail):
+        if self.request.method not in SAFE_METHODS:
+            # If-Match của lệnh ghi so với DB, không so với bản trong bộ nhớ có thể đã cũ
+            return [aggregate_stamp(queryset, 'updated_at')]
+        if not detail:
+            return [category_catalog.get().stamp]
+        category = self.catalog_category()
+        return [(category.updated_at, 1) if category is not None else (None, 0)]
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, False, self.list_from_catalog, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, True, self.retrieve_from_catalog, *args, **kwargs)
+
+    def list_from_catalog(self, request, *args, **kwargs):
+        categories = category_catalog.get().categories
+        page = self.paginate_queryset(categories)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(categories, many=True).data)
 
-class ClothingItemViewSet(viewsets.ModelViewSet):
+    def retrieve_from_catalog(self, request, *args, **kwargs):
+        category = self.catalog_category()
+        if category is None:
+            # Có thể vừa được tạo ở worker khác: tra DB như ModelViewSet (404 nếu không có)
+            return viewsets.ModelViewSet.retrieve(self, request, *args, **kwargs)
+        self.check_object_permissions(request, category)
+        return Response(self.get_serializer(category).data)
+
+class ClothingItemViewSet(TimingViewMixin, ConditionalRequestMixin, CachedResponseMixin, KeysetPaginationMixin,
+                          SparseFieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint cho phép người dùng quản lý quần áo của họ.
+    Thêm `?pagination=keyset` để phân trang theo (last_modified, id) thay vì số trang.
+    Thêm `?fields=id,name,thumbnail` để nhận bản gọn (ClothingItemListSerializer, app/sparse.py).
+    Tìm kiếm và facet: /clothing-items/search/?q=... (app/search.py).
     """
     serializer_class = ClothingItemSerializer
+    compact_serializer_class = ClothingItemListSerializer
+    fast_columns = ITEM_COLUMNS
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly] # Yêu cầu đăng nhập và là chủ sở hữu
+    keyset_timestamp_field = 'last_modified'
+    write_stamp_field = 'last_modified'
 
     def get_queryset(self):
         """
@@ -83,14 +153,41 @@ class ClothingItemViewSet(viewsets.ModelViewSet):
         # Đảm bảo user đã được xác thực trước khi truy vấn
         user = self.request.user
         if user and user.is_authenticated:
-            return ClothingItem.objects.filter(user=user)
+            if self.use_compact_serializer():
+                # Bản gọn không lồng category/user: chỉ lấy các cột cần cho field đã chọn
+                columns = self.sparse_columns('user', self.keyset_timestamp_field)
+                return ClothingItem.objects.filter(user=user).only(*columns)
+            # select_related để user_username không phát sinh thêm query cho mỗi dòng;
+            # category_name/category_detail lấy từ category_catalog (app/catalog.py)
+            return ClothingItem.objects.filter(user=user).select_related('user')
         return ClothingItem.objects.none() # Trả về queryset rỗng nếu user chưa xác thực
 
+    def get_validator_stamps(self, queryset, detail):
+        """
+        ETag/Last-Modified: món đồ (last_modified) và category lồng bên trong (category_detail).
+        """
+        return [aggregate_stamp(queryset, 'last_modified'), category_stamp()]
+
+    def fast_serialize_rows(self, rows):
+        """
+        Danh sách đầy đủ ghép từ values() (app/fastpath.py), cùng JSON với ClothingItemSerializer.
+        """
+        return serialize_items(rows, self.request)
+
     def perform_create(self, serializer):
         """
         Tự động gán `user` là người dùng đang đăng nhập khi tạo món đồ mới.
         """
-        serializer.save(user=self.request.user) # user được gán ở đây
+        item = serializer.save(user=self.request.user) # user được gán ở đây
+        # File gốc đã được lưu; kiểm tra ảnh và tạo rendition chạy nền
+        schedule_image_processing(item)
+
+    def perform_update(self, serializer):
+        """
+        Đưa ảnh mới (nếu có) vào hàng đợi xử lý.
+        """
+        item = serializer.save()
+        schedule_image_processing(item)
 
     def get_serializer_context(self):
         """
@@ -98,13 +195,108 @@ class ClothingItemViewSet(viewsets.ModelViewSet):
         """
         return {'request': self.request}
 
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Tạo (POST) hoặc sửa một phần (PATCH, mỗi phần tử có "id") nhiều món đồ một lần.
+        Body: mảng JSON, {"items": [...]}, hoặc multipart với field `items` (chuỗi JSON)
+        và các file ảnh, phần tử tham chiếu file bằng "image": "<tên field file>".
+        Trả về kết quả cho từng phần tử theo thứ tự gửi lên; `?atomic=true` để
+        không ghi gì nếu có phần tử lỗi.
+        """
+        elements = parse_elements(request)
+        atomic = request.query_params.get('atomic') in ('1', 'true')
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            results, _ = bulk_create_items(request.user, elements, self.get_serializer_class(), context, atomic)
+            success = status.HTTP_201_CREATED
+        else:
+            results = bulk_update_items(self.get_queryset(), elements, self.get_serializer_class(), context, atomic)
+            success = status.HTTP_200_OK
+        return Response({'results': results}, status=overall_status(results, success))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Tìm món đồ: `?q=` theo tên, thương hiệu, màu, ghi chú (không cần gõ dấu, khớp tiền tố),
+        lọc thêm bằng `?category=<id>&brand=...&color=...` (lặp lại để chọn nhiều giá trị).
+        Response như danh sách thường (phân trang, `?fields=`) kèm `facets`: số món đồ theo
+        category, brand, color (app/search.py).
+        """
+        search = ItemSearch.from_request(request)
+        response = self.list_response(search.apply(self.get_queryset()))
+        if isinstance(response.data, list):
+            response.data = {'results': response.data}
+        response.data['facets'] = search.facets()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """
+        Các nhóm món đồ có ảnh gần như trùng nhau (app/similarity.py).
+        Response: {"groups": [[<món đồ gọn>, ...], ...]}, nhóm lớn trước.
+        """
+        groups = signature_index(request.user).duplicate_groups()
+        items = self._compact_items({pk for group in groups for pk in group})
+        return Response({'groups': [[items[pk] for pk in group] for group in groups]})
 
-class OutfitViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Các món đồ có ảnh giống ảnh của món đồ này nhất (hình dạng và màu sắc).
+        `?limit=` (mặc định 10). Response: {"results": [{<món đồ gọn>, "distance": 0..1}]}.
+        """
+        item = get_object_or_404(ClothingItem.objects.filter(user=request.user).only('pk', 'user'), pk=pk)
+        self.check_object_permissions(request, item)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), similarity_settings()['MAX_SIMILAR'])
+        except ValueError:
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        similar = signature_index(request.user).similar_items(item.pk, limit)
+        if similar is None:
+            return Response(
+                {'error': 'Image of this clothing item has not been processed yet.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        items = self._compact_items({pk for pk, _ in similar})
+        return Response({'results': [{**items[pk], 'distance': distance} for pk, distance in similar]})
+
+    def _compact_items(self, ids):
+        """
+        {id: bản gọn (ClothingItemListSerializer)} của các món đồ trong `ids`, một query.
+        """
+        queryset = ClothingItem.objects.filter(pk__in=ids).only(*ClothingItemListSerializer.columns_for(None))
+        data = ClothingItemListSerializer(queryset, many=True, context=self.get_serializer_context()).data
+        return {row['id']: row for row in data}
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """
+        Xóa nhiều món đồ. Body: { "ids": [<id>, ...] }
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            return Response({'ids': 'Expected a non-empty list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > max_bulk_items():
+            return Response({'ids': f'At most {max_bulk_items()} ids per request.'}, status=status.HTTP_400_BAD_REQUEST)
+        results = bulk_delete_items(self.get_queryset(), ids)
+        return Response({'results': results}, status=overall_status(results))
+
+
+class OutfitViewSet(TimingViewMixin, ConditionalRequestMixin, CachedResponseMixin, KeysetPaginationMixin,
+                    SparseFieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint cho phép người dùng quản lý các bộ đồ của họ.
+    Thêm `?pagination=keyset` để phân trang theo (updated_at, id) thay vì số trang.
+    Lưới bộ đồ gọn: `?fields=id,name,clothing_items.id,clothing_items.thumbnail`
+    (OutfitListSerializer; `?expand=clothing_items` để lồng món đồ gọn thay vì chỉ ID).
     """
     serializer_class = OutfitSerializer
+    compact_serializer_class = OutfitListSerializer
+    fast_columns = OUTFIT_COLUMNS
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    keyset_timestamp_field = 'updated_at'
+    write_stamp_field = 'updated_at'
 
     def get_queryset(self):
         """
@@ -113,18 +305,56 @@ class OutfitViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user and user.is_authenticated:
-            # prefetch_related để tối ưu query khi lấy clothing_items_details
-            return Outfit.objects.filter(user=user).prefetch_related('clothing_items__category')
+            if self.use_compact_serializer():
+                return self.get_compact_queryset(user)
+            # prefetch_related để tối ưu query khi lấy clothing_items_details.
+            # Các món đồ lồng bên trong cũng cần user (user_username),
+            # nên join luôn trong query prefetch thay vì lazy-load từng món.
+            items_queryset = ClothingItem.objects.select_related('user')
+            return (
+                Outfit.objects.filter(user=user)
+                .select_related('user')
+                .prefetch_related(Prefetch('clothing_items', queryset=items_queryset))
+            )
         return Outfit.objects.none()
 
-    def get_serializer_class(self):
+    def get_compact_queryset(self, user):
+        """
+        Queryset cho bản gọn: chỉ các cột của field đã chọn; món đồ chỉ được prefetch
+        khi cần (chỉ ID, hoặc đúng các cột của món đồ gọn khi expand).
+        """
+        fields, expand = self.sparse_params
+        queryset = Outfit.objects.filter(user=user).only(*self.sparse_columns('user', self.keyset_timestamp_field))
+        if fields is None or 'clothing_items' in fields:
+            if 'clothing_items' in expand:
+                nested = (fields or {}).get('clothing_items') or None
+                columns = ClothingItemListSerializer.columns_for(nested)
+            else:
+                columns = ['id']
+            queryset = queryset.prefetch_related(
+                Prefetch('clothing_items', queryset=ClothingItem.objects.only(*columns))
+            )
+        return queryset
+
+    def get_validator_stamps(self, queryset, detail):
+        """
+        ETag/Last-Modified: bộ đồ, các món đồ lồng trong clothing_items_details và category của chúng.
+        """
+        if detail:
+            items = ClothingItem.objects.filter(outfits__in=queryset.values('pk'))
+        else:
+            items = ClothingItem.objects.filter(user=self.request.user)
+        return [
+            aggregate_stamp(queryset, 'updated_at'),
+            aggregate_stamp(items, 'last_modified'),
+            category_stamp(),
+        ]
+
+    def fast_serialize_rows(self, rows):
         """
-        Sử dụng serializer khác nhau cho các action khác nhau nếu cần.
-        Ví dụ, một serializer đơn giản hơn cho list view.
+        Danh sách đầy đủ ghép từ values() (app/fastpath.py), cùng JSON với OutfitSerializer.
         """
-        # if self.action == 'list':
-        #     return OutfitListSerializer # Một serializer khác nếu có
-        return OutfitSerializer # Mặc định
+        return serialize_outfits(rows, self.request)
 
     def get_serializer_context(self):
         """
@@ -142,7 +372,77 @@ class OutfitViewSet(viewsets.ModelViewSet):
         Serializer đã được cấu hình để xử lý `clothing_items` dựa trên ID.
         """
         # user đã được truyền vào context, serializer sẽ sử dụng nó
-        serializer.save() # Không cần truyền user ở đây nữa vì serializer sẽ tự lấy từ context
+        outfit = serializer.save() # Không cần truyền user ở đây nữa vì serializer sẽ tự lấy từ context
+        serializer.instance = self._refetch(outfit)
+
+    def perform_update(self, serializer):
+        outfit = serializer.save()
+        serializer.instance = self._refetch(outfit)
+
+    def _refetch(self, outfit):
+        """
+        Lấy lại outfit qua get_queryset() (có prefetch) sau khi ghi, để serialize
+        clothing_items_details với số query cố định thay vì lazy-load từng món đồ.
+        """
+        return self.get_queryset().get(pk=outfit.pk)
+
+    def _outfit_response(self, outfit):
+        """
+        Serialize lại outfit sau khi thay đổi danh sách món đồ.
+        """
+        serializer = self.get_serializer(self._refetch(outfit))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def _get_outfit_for_membership(self):
+        """
+        Outfit (đã check permission IsOwner) mà không prefetch các món đồ: các action
+        thêm/bớt chỉ đọc bảng trung gian cho đúng những ID được gửi lên.
+        """
+        outfit = get_object_or_404(Outfit.objects.filter(user=self.request.user), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, outfit)
+        return outfit
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Tìm bộ đồ theo tên và mô tả: `?q=` (không cần gõ dấu, khớp tiền tố).
+        Response như danh sách thường (phân trang, `?fields=`/`?expand=`).
+        """
+        queryset = search_outfits(self.get_queryset(), request.user, request.query_params.get('q', ''))
+        return self.list_response(queryset)
+
+    @action(detail=False, methods=['get'])
+    def recommend(self, request):
+        """
+        Gợi ý bộ đồ từ các món đồ hay được mặc cùng nhau (app/recommend.py).
+        `?item=<id>`: bắt đầu từ món đồ này; `?count=` số gợi ý; `?size=` số món tối đa mỗi bộ.
+        Response: {"results": [{"clothing_items": [<id>, ...], "score", "clothing_items_details"}]}
+        """
+        options = recommend_settings()
+        try:
+            count = min(max(int(request.query_params.get('count', 5)), 1), options['MAX_SUGGESTIONS'])
+            size = min(max(int(request.query_params.get('size', options['DEFAULT_SIZE'])), 2), options['MAX_SIZE'])
+            seed_id = request.query_params.get('item')
+            seed_id = int(seed_id) if seed_id else None
+        except ValueError:
+            return Response({'error': 'count, size and item must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = WardrobeModel(request.user)
+        if seed_id is not None and model.index_of(seed_id) is None:
+            return Response({'error': 'Clothing item not found or does not belong to you.'}, status=status.HTTP_404_NOT_FOUND)
+        suggestions = model.recommend(count, size, seed_id)
+
+        ids = {pk for item_ids, _ in suggestions for pk in item_ids}
+        items = ClothingItem.objects.filter(pk__in=ids).select_related('user').in_bulk()
+        context = {'request': request}
+        return Response({'results': [
+            {
+                'clothing_items': item_ids,
+                'score': score,
+                'clothing_items_details': ClothingItemSerializer([items[pk] for pk in item_ids], many=True, context=context).data,
+            }
+            for item_ids, score in suggestions
+        ]})
 
     # Các action tùy chỉnh `add_clothing_item` và `remove_clothing_item` có thể hữu ích
     # nhưng với cách serializer hiện tại xử lý ManyToManyField (gửi list ID),
@@ -155,7 +455,7 @@ class OutfitViewSet(viewsets.ModelViewSet):
         Action tùy chỉnh để thêm một món đồ vào bộ đồ.
         Gửi body: { "clothing_item_id": <id> }
         """
-        outfit = self.get_object() # Lấy outfit hiện tại (đã check permission IsOwner)
+        outfit = self._get_outfit_for_membership()
         clothing_item_id = request.data.get('clothing_item_id')
 
         if not clothing_item_id:
@@ -163,17 +463,17 @@ class OutfitViewSet(viewsets.ModelViewSet):
 
         try:
             # Đảm bảo item thuộc về user hiện tại
-            clothing_item = ClothingItem.objects.get(id=clothing_item_id, user=request.user)
-        except ClothingItem.DoesNotExist:
+            owned, _ = split_owned_item_ids(request.user, [int(clothing_item_id)])
+        except (TypeError, ValueError):
+            owned = []
+        if not owned:
             return Response({'error': 'Clothing item not found or does not belong to you.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if clothing_item in outfit.clothing_items.all():
+        if not add_outfit_items(outfit, owned):
              return Response({'message': 'Clothing item already in this outfit.'}, status=status.HTTP_200_OK)
 
-        outfit.clothing_items.add(clothing_item)
         # Trả về outfit đã cập nhật
-        serializer = self.get_serializer(outfit)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self._outfit_response(outfit)
 
     @action(detail=True, methods=['post'], url_path='remove-item', permission_classes=[IsAuthenticated, IsOwnerOrReadOnly])
     def remove_clothing_item_from_outfit(self, request, pk=None):
@@ -181,21 +481,176 @@ class OutfitViewSet(viewsets.ModelViewSet):
         Action tùy chỉnh để xóa một món đồ khỏi bộ đồ.
         Gửi body: { "clothing_item_id": <id> }
         """
-        outfit = self.get_object()
+        outfit = self._get_outfit_for_membership()
         clothing_item_id = request.data.get('clothing_item_id')
 
         if not clothing_item_id:
             return Response({'error': 'clothing_item_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Không cần check user ở đây vì nếu item không thuộc outfit của user thì nó sẽ không bị remove
-            clothing_item = ClothingItem.objects.get(id=clothing_item_id)
-        except ClothingItem.DoesNotExist:
+            clothing_item_id = int(clothing_item_id)
+        except (TypeError, ValueError):
             return Response({'error': 'Clothing item not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        if clothing_item not in outfit.clothing_items.all():
+        # Không cần check user ở đây vì bộ đồ của user chỉ chứa món đồ của user đó
+        if not remove_outfit_items(outfit, [clothing_item_id]):
+            if not ClothingItem.objects.filter(pk=clothing_item_id).exists():
+                return Response({'error': 'Clothing item not found.'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Clothing item is not in this outfit.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        outfit.clothing_items.remove(clothing_item)
-        serializer = self.get_serializer(outfit)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return self._outfit_response(outfit)
+
+    @action(detail=True, methods=['post'], url_path='add-items', permission_classes=[IsAuthenticated, IsOwnerOrReadOnly])
+    def add_clothing_items_to_outfit(self, request, pk=None):
+        """
+        Thêm nhiều món đồ vào bộ đồ. Gửi body: { "clothing_item_ids": [<id>, ...] }
+        Món đồ đã có trong bộ đồ được bỏ qua; có ID không thuộc user thì không thêm gì (400).
+        """
+        outfit = self._get_outfit_for_membership()
+        serializer = OutfitItemIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        owned, invalid = split_owned_item_ids(request.user, serializer.validated_data['clothing_item_ids'])
+        if invalid:
+            return Response(
+                {'error': 'Clothing items not found or do not belong to you.', 'invalid_ids': invalid},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        add_outfit_items(outfit, owned)
+        return self._outfit_response(outfit)
+
+    @action(detail=True, methods=['post'], url_path='remove-items', permission_classes=[IsAuthenticated, IsOwnerOrReadOnly])
+    def remove_clothing_items_from_outfit(self, request, pk=None):
+        """
+        Bỏ nhiều món đồ khỏi bộ đồ. Gửi body: { "clothing_item_ids": [<id>, ...] }
+        ID không nằm trong bộ đồ được bỏ qua.
+        """
+        outfit = self._get_outfit_for_membership()
+        serializer = OutfitItemIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        remove_outfit_items(outfit, serializer.validated_data['clothing_item_ids'])
+        return self._outfit_response(outfit)
+
+
+class ResponseCacheStatsView(views.APIView):
+    """
+    Số hit/miss của cache response theo endpoint (trong worker hiện tại). Chỉ admin.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats.snapshot())
+
+
+class WardrobeStatsView(views.APIView):
+    """
+    Thống kê tủ đồ của user hiện tại (app/stats.py):
+    {"total_items", "categories": [{"id", "name", "count"}], "colors"/"brands": [{"value", "count"}]},
+    mỗi danh sách theo số món đồ giảm dần.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(wardrobe_stats(request.user))
+
+
+class SyncView(views.APIView):
+    """
+    Đồng bộ theo thay đổi cho client offline (app/sync.py).
+
+    GET /api/sync/                -> lần đầu: toàn bộ dữ liệu của user
+    GET /api/sync/?since=<token>  -> chỉ những gì thay đổi kể từ token
+
+    Response: {"categories": [...], "clothing_items": [...], "outfits": [...],
+    "deleted": [{"model", "id"}], "since": <token>, "has_more": bool, "next": <url>}.
+    Khi has_more=true, gọi tiếp `next` (hoặc ?since=<since>); khi false, lưu `since`
+    cho lần đồng bộ sau. `outfits[].clothing_items` là danh sách ID thành viên đầy đủ;
+    món đồ bị xóa cũng phải được client bỏ khỏi các bộ đồ.
+
+    `?format=ndjson` (hoặc Accept: application/x-ndjson) stream toàn bộ thay đổi,
+    mỗi dòng một bản ghi {"type", "data"}, dòng cuối {"type": "token", "since"}.
+    Token quá hạn (tombstone đã bị dọn) trả 410: client cần đồng bộ lại từ đầu.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+    def get(self, request):
+        token = SyncToken.decode(request.query_params.get('since'))
+        if token.is_expired():
+            return Response({'detail': 'Sync token expired, full sync required.'}, status=status.HTTP_410_GONE)
+        context = {'request': request}
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                stream_changes(request.user, token, context), content_type=NDJSONRenderer.media_type
+            )
+
+        options = sync_settings()
+        try:
+            page_size = min(int(request.query_params.get('page_size', options['PAGE_SIZE'])), options['MAX_PAGE_SIZE'])
+        except ValueError:
+            page_size = options['PAGE_SIZE']
+        page_size = max(page_size, 1)
+        data, next_token, has_more = sync_page(request.user, token, page_size, context)
+        since = next_token.encode()
+        next_url = replace_query_param(request.build_absolute_uri(), 'since', since) if has_more else None
+        return Response({**data, 'since': since, 'has_more': has_more, 'next': next_url})
+
+
+class WardrobeExportView(views.APIView):
+    """
+    Sao lưu tủ đồ của user hiện tại (app/transfer.py), stream không giới hạn kích thước.
+
+    GET /api/export/         -> NDJSON: món đồ, bộ đồ, thành viên bộ đồ
+    GET /api/export/images/  -> tar các file ảnh
+    """
+    permission_classes = [IsAuthenticated]
+    images = False
+
+    def get(self, request):
+        if self.images:
+            response = StreamingHttpResponse(export_images(request.user), content_type='application/x-tar')
+            filename = f'{request.user.username}-images.tar'
+        else:
+            response = StreamingHttpResponse(export_records(request.user), content_type=NDJSONRenderer.media_type)
+            filename = f'{request.user.username}-wardrobe.ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class WardrobeImportView(views.APIView):
+    """
+    Nạp bản sao lưu vào tủ đồ của user hiện tại. Body được đọc tuần tự, không qua parser.
+
+    POST /api/import/images/  body: tar ảnh (gửi trước) -> {"images": <số file>}
+    POST /api/import/         body: NDJSON export -> số món đồ/bộ đồ/thành viên đã tạo,
+                              số ảnh không tìm thấy (`missing_images`) và dòng thành viên bị bỏ (`skipped`)
+    Dòng NDJSON lỗi trả 400 kèm số dòng, không dữ liệu nào được ghi.
+    """
+    permission_classes = [IsAuthenticated]
+    images = False
+
+    def post(self, request):
+        stream = request.stream
+        if stream is None:
+            return Response({'detail': 'Empty body.'}, status=status.HTTP_400_BAD_REQUEST)
+        if self.images:
+            return Response({'images': import_images(stream)}, status=status.HTTP_201_CREATED)
+        return Response(import_records(request.user, stream), status=status.HTTP_201_CREATED)
+
+
+class MediaView(views.APIView):
+    """
+    File ảnh dưới MEDIA_URL khi không chạy DEBUG (app/media.py): chỉ chủ món đồ dùng ảnh
+    đó (hoặc staff) được tải, xác thực bằng token như các API khác. File không thuộc user
+    trả 404 như file không tồn tại.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Body là file, không qua renderer: Accept của thẻ <img> (image/webp,image/*) không
+        # được trả 406; lỗi 401/404 dùng renderer đầu tiên
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, path):
+        if not can_access(request.user, path):
+            raise Http404
+        return serve_file(request, path)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myapp.settings')
+# Chạy dưới ASGI (uvicorn) thì dùng các view async cho đường đọc và ảnh (app/asyncviews.py)
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
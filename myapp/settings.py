@@ -45,8 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.TimingMiddleware', # Server-Timing, /metrics, log request chậm cho /api/ (app/timing.py)
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware', # Thêm Whitenoise middleware
+    'app.middleware.WhiteNoiseMiddleware', # Whitenoise, chạy được cả dưới ASGI (app/middleware.py)
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -150,19 +151,173 @@ if MEDIA_ROOT_RENDER_DISK_PATH:
 else:
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media') # Default cho local dev
 
+# Phục vụ MEDIA_URL khi DEBUG=False (app/media.py). OFFLOAD: 'x-accel-redirect' để Nginx gửi file
+# từ location internal ACCEL_REDIRECT_PREFIX (alias tới MEDIA_ROOT), 'x-sendfile' cho Apache/lighttpd,
+# trống thì Django tự gửi. MAX_AGE: thời gian cache (giây) của file không đặt tên theo hash.
+MEDIA_SERVING = {
+    'OFFLOAD': os.environ.get('MEDIA_OFFLOAD') or None,
+    'ACCEL_REDIRECT_PREFIX': os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/'),
+    'MAX_AGE': 0,
+}
+
+# Xử lý ảnh upload (kiểm tra, tạo rendition) chạy nền bằng `python manage.py process_images`.
+# Đặt IMAGE_PROCESSING_ASYNC=False để xử lý ngay trong request (tiện khi dev nếu không chạy worker).
+IMAGE_PROCESSING_ASYNC = os.environ.get('IMAGE_PROCESSING_ASYNC', 'True').lower() == 'true'
+
+# Upload handler tính hash SHA-256 ngay khi nhận file, dùng cho ContentAddressedStorage (app/storage.py)
+FILE_UPLOAD_HANDLERS = [
+    'app.uploadhandlers.HashingMemoryFileUploadHandler',
+    'app.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Số phần tử tối đa trong một request /clothing-items/bulk/ (app/bulk.py).
+# Request bulk multipart gửi một file ảnh cho mỗi phần tử nên nâng giới hạn số file theo.
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '500'))
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_MAX_ITEMS
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework settings (giữ nguyên cấu hình của bạn)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication có cache, không tra DB cho mỗi request (app/authentication.py)
+        'app.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Như mặc định của DRF, có đo thời gian render (app/timing.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.timing.TimedJSONRenderer',
+        'app.timing.TimedBrowsableAPIRenderer',
+    ],
+}
+
+# Cache backend: Redis nếu có REDIS_URL, thư mục file nếu có CACHE_DIR, còn lại bộ nhớ trong process.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_DIR = os.environ.get('CACHE_DIR')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+elif CACHE_DIR:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_DIR}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Cache response theo user (app/cache.py). Mặc định chỉ bật khi cache dùng chung giữa các worker
+# (Redis/file), vì với LocMemCache mỗi worker gunicorn chỉ thấy việc invalidate của chính nó.
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', str(bool(REDIS_URL or CACHE_DIR))).lower() == 'true',
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Bảng category giữ trong bộ nhớ của mỗi process (app/catalog.py). Lưu/xóa category tăng số phiên bản trong
+# cache VERSION_CACHE_ALIAS (phải dùng chung giữa các worker, None nếu không có) để các worker khác nạp lại;
+# MAX_AGE (giây) giới hạn thời gian một bản được dùng khi không có cache dùng chung.
+CATEGORY_CATALOG = {
+    'VERSION_CACHE_ALIAS': 'default' if REDIS_URL or CACHE_DIR else None,
+    'MAX_AGE': 60,
+}
+
+# Đo từng request /api/ (app/timing.py): histogram theo route ở /metrics (Prometheus, cần header
+# "Authorization: Bearer <METRICS_TOKEN>" hoặc đăng nhập admin). Một phần SLOW_SAMPLE_RATE request được giữ
+# lại SQL và ghi log nếu chạy quá SLOW_REQUEST_MS. Header Server-Timing tắt mặc định; SERVER_TIMING_HEADER=true
+# gắn cho mọi response, =staff chỉ cho user staff.
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING_ENABLED', 'True').lower() == 'true',
+    'SERVER_TIMING': {'true': True, 'staff': 'staff'}.get(os.environ.get('SERVER_TIMING_HEADER', '').lower(), False),
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', '500')),
+    'SLOW_SAMPLE_RATE': float(os.environ.get('SLOW_REQUEST_SAMPLE_RATE', '0.1')),
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN') or None,
+}
+
+# Cache token -> user cho CachedTokenAuthentication.
+# SHARED_CACHE_ALIAS: tên một cache trong CACHES dùng chung giữa các worker (Redis/Memcached), None để tắt.
+# TTL (giây) của LRU trong process; None: 60 khi có SHARED_CACHE_ALIAS, tắt khi không có. Bật LRU mà không
+# có tầng dùng chung chỉ an toàn với một process: ở các worker khác, token bị xóa hay user bị khóa/bỏ quyền
+# vẫn xác thực được tới TTL giây.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': int(os.environ['TOKEN_AUTH_TTL']) if os.environ.get('TOKEN_AUTH_TTL') else None,
+    'SHARED_CACHE_ALIAS': os.environ.get('TOKEN_AUTH_SHARED_CACHE') or None,
+    'SHARED_TTL': 300,
+}
+
+# Đăng nhập/đăng ký (app/passwords.py): băm mật khẩu trên pool giới hạn (EXECUTOR 'thread' hoặc 'process',
+# MAX_WORKERS phép băm cùng lúc mỗi process). Quá MAX_PENDING request chờ QUEUE_TIMEOUT giây thì trả 503.
+# RATE (ví dụ '10/min') giới hạn số lần đăng nhập/đăng ký của mỗi IP, GLOBAL_RATE (ví dụ '20/s') là trần
+# chung cho mọi client; UPGRADE_HASHES bật việc băm lại mật khẩu theo tham số mới của hasher khi đăng nhập
+# (Django mặc định luôn làm, tốn thêm một lần băm).
+AUTH_HASHING = {
+    'EXECUTOR': os.environ.get('AUTH_HASHING_EXECUTOR', 'thread'),
+    'MAX_WORKERS': int(os.environ.get('AUTH_HASHING_WORKERS', '2')),
+    'MAX_PENDING': 16,
+    'QUEUE_TIMEOUT': 2.0,
+    'RATE': os.environ.get('AUTH_RATE') or None,
+    'GLOBAL_RATE': os.environ.get('AUTH_GLOBAL_RATE') or None,
+    'UPGRADE_HASHES': os.environ.get('AUTH_UPGRADE_HASHES', 'False').lower() == 'true',
+}
+AUTHENTICATION_BACKENDS = ['app.passwords.PooledModelBackend']
+
+# Danh sách món đồ/bộ đồ được ghép thẳng từ values() thay vì qua serializer DRF (app/fastpath.py).
+FAST_READ_PATH = os.environ.get('FAST_READ_PATH', 'True').lower() == 'true'
+
+# View async cho đọc món đồ/bộ đồ, upload và /media/ (app/asyncviews.py). myapp/asgi.py bật sẵn khi chạy
+# dưới uvicorn (`gunicorn -k uvicorn.workers.UvicornWorker myapp.asgi`); deploy WSGI giữ các view DRF sync.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() == 'true'
+
+# Đồng bộ theo thay đổi /api/sync/ (app/sync.py). Tombstone cũ hơn TOMBSTONE_RETENTION_DAYS bị
+# `python manage.py prune_tombstones` xóa; token cũ hơn mốc đó nhận 410 và phải đồng bộ lại từ đầu.
+SYNC = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'OVERLAP_SECONDS': 5,
+    'TOMBSTONE_RETENTION_DAYS': int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', '90')),
+}
+
+# Tìm kiếm /api/clothing-items/search/, /api/outfits/search/ (app/search.py).
+# FACET_LIMIT: số giá trị tối đa mỗi facet, MAX_TERMS: số từ tối đa lấy từ `q`.
+SEARCH = {
+    'FACET_LIMIT': 20,
+    'MAX_TERMS': 8,
+}
+
+# Gợi ý bộ đồ /api/outfits/recommend/ (app/recommend.py). FEATURE_WEIGHT: trọng số của điểm theo
+# category/màu/thương hiệu so với điểm đồng xuất hiện; MAX_FEATURES giới hạn số đặc trưng mỗi user.
+RECOMMEND = {
+    'MAX_SUGGESTIONS': 10,
+    'DEFAULT_SIZE': 4,
+    'MAX_SIZE': 8,
+    'FEATURE_WEIGHT': 0.5,
+    'MAX_FEATURES': 256,
+}
+
+# Ảnh trùng/giống nhau /api/clothing-items/duplicates/, /api/clothing-items/<id>/similar/ (app/similarity.py).
+# DUPLICATE_DISTANCE: số bit pHash/dHash tối đa được lệch để coi là trùng, DUPLICATE_COLOR_DISTANCE:
+# độ lệch histogram màu tối đa (0..1); HASH_WEIGHT: trọng số của pHash so với histogram màu khi xếp hạng ảnh giống;
+# MAX_BUCKET_REPRESENTATIVES: số ảnh đại diện tối đa được so trong một nhóm cùng giá trị dải pHash;
+# SIMILAR_BANDS: số dải pHash dùng chọn ứng viên cho ảnh giống; INDEX_CACHE_SIZE: số user giữ chỉ mục
+# trong bộ nhớ mỗi process (chỉ khi RESPONSE_CACHE bật).
+IMAGE_SIMILARITY = {
+    'DUPLICATE_DISTANCE': 5,
+    'DUPLICATE_COLOR_DISTANCE': 0.15,
+    'HASH_WEIGHT': 0.6,
+    'MAX_SIMILAR': 50,
+    'MAX_BUCKET_REPRESENTATIVES': 64,
+    'SIMILAR_BANDS': 8,
+    'INDEX_CACHE_SIZE': 256,
+}
+
+# Sao lưu/chuyển tủ đồ /api/export/, /api/import/ (app/transfer.py). CHUNK_SIZE: số dòng đọc/ghi
+# mỗi lượt, MAX_IMAGE_SIZE: kích thước tối đa (byte) của một file ảnh trong tar import,
+# MAX_IMPORT_SIZE: tổng kích thước ảnh tối đa của một lần import.
+WARDROBE_TRANSFER = {
+    'CHUNK_SIZE': 500,
+    'MAX_IMAGE_SIZE': 20 * 1024 * 1024,
+    'MAX_IMPORT_SIZE': 500 * 1024 * 1024,
 }
 
 # CORS settings
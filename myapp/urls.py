@@ -1,19 +1,35 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings # Cho media files
 from django.conf.urls.static import static # Cho media files
 
+from app.timing import metrics_view
+from app.views import MediaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Bao gồm các URL của app 'app' (nơi chứa models, views API) dưới prefix 'api/'
     path('api/', include('app.urls')),
+    # Histogram thời gian request cho Prometheus (app/timing.py)
+    path('metrics', metrics_view, name='metrics'),
     # Bạn có thể thêm các URL khác cho project ở đây
 ]
 
 # Cấu hình để phục vụ media files (ví dụ: ảnh upload qua ImageField)
 # trong quá trình development (DEBUG=True).
-# Trong production, bạn nên dùng Nginx hoặc một web server khác để phục vụ media files.
+# Trong production, MediaView kiểm tra quyền theo user, hỗ trợ Range/ETag và có thể
+# chuyển việc gửi file cho Nginx (X-Accel-Redirect), xem MEDIA_SERVING trong settings.
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    if settings.ASYNC_VIEWS:
+        from app.asyncviews import media_view
+    else:
+        media_view = MediaView.as_view()
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', media_view, name='media'),
+    ]
     # urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) # Cho static files nếu cần
     
\ No newline at end of file